@@ -0,0 +1,51 @@
+"""
+Compares requests/sec and tail latency of the sync (threadpool) and async
+(AsyncEngine) request paths at high concurrency.
+
+Each virtual client alternates between adding a post and reading the first page
+of its user's posts, so reads regularly miss the cache and reach the database.
+
+Usage:
+    python -m benchmarks.async_vs_sync --concurrency 200 --duration 15
+"""
+import argparse
+import asyncio
+import json
+
+import httpx
+
+from benchmarks.common import run_load, serve, signup, sqlite_env, temporary_directory
+
+
+async def _scenario(base_url: str, concurrency: int, duration: float, users: int) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        headers = [await signup(client, f"bench{index}@example.com") for index in range(users)]
+
+    async def step(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        auth = headers[index % users]
+        step.counter[index] = step.counter.get(index, 0) + 1
+        if step.counter[index] % 2:
+            return await client.post("/posts/add", json={"text": "benchmark post " * 20}, headers=auth)
+        return await client.get("/posts/get", params={"limit": 20}, headers=auth)
+
+    step.counter = {}
+    result = await run_load(base_url, concurrency, duration, step)
+    return result.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--users", type=int, default=10)
+    args = parser.parse_args()
+
+    report = {}
+    for mode, async_mode in (("sync", "false"), ("async", "true")):
+        with temporary_directory() as directory, serve(sqlite_env(directory, ASYNC_MODE=async_mode)) as base_url:
+            report[mode] = asyncio.run(_scenario(base_url, args.concurrency, args.duration, args.users))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
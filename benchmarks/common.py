@@ -0,0 +1,276 @@
+import asyncio
+import json
+import os
+import platform
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+# Repository root, used as the working directory of benchmarked servers
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: list, pct: float) -> float:
+    """
+    Returns the pct-th percentile (0-100) of the given values using nearest-rank.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+@dataclass
+class LoadResult:
+    """
+    Aggregated outcome of a load run.
+
+    Attributes:
+        elapsed (float): Wall-clock duration of the run in seconds.
+        latencies (list): Latency of every successful request in seconds.
+        errors (int): Number of failed requests (transport errors or 5xx).
+        queries (list): SQL statements per request, from the Server-Timing header when present.
+    """
+    elapsed: float = 0.0
+    latencies: list = field(default_factory=list)
+    errors: int = 0
+    queries: list = field(default_factory=list)
+
+    @property
+    def rps(self) -> float:
+        return len(self.latencies) / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> dict:
+        """
+        Returns the run as a JSON-serializable dict with latencies in milliseconds.
+        """
+        summary = {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "rps": round(self.rps, 1),
+            "p50_ms": round(percentile(self.latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(self.latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(self.latencies, 99) * 1000, 2),
+        }
+        if self.queries:
+            summary["queries_per_request"] = round(sum(self.queries) / len(self.queries), 2)
+        return summary
+
+    def record(self, response: Optional[httpx.Response], latency: float):
+        """
+        Accounts one request; a missing response or a 5xx status counts as an error.
+        """
+        if response is None or response.status_code >= 500:
+            self.errors += 1
+            return
+        self.latencies.append(latency)
+        queries = query_count(response)
+        if queries is not None:
+            self.queries.append(queries)
+
+
+# Query count reported by the application's Server-Timing header (see core.middleware)
+_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def query_count(response: httpx.Response) -> Optional[int]:
+    """
+    Returns the number of SQL statements a response reported in its
+    Server-Timing header, or None when metrics are disabled on the server.
+    """
+    match = _QUERIES.search(response.headers.get("server-timing", ""))
+    return int(match.group(1)) if match else None
+
+
+def free_port() -> int:
+    """
+    Returns a TCP port that is currently free on localhost.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def sqlite_env(directory: str, **extra) -> dict:
+    """
+    Builds the environment for a server backed by a fresh SQLite file in `directory`.
+    """
+    path = os.path.join(directory, "bench.db")
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{path}",
+        "ASYNC_DATABASE_URL": f"sqlite+aiosqlite:///{path}",
+    })
+    env.update({key: str(value) for key, value in extra.items()})
+    return env
+
+
+@contextmanager
+def serve(env: dict, args: Optional[list] = None, startup_timeout: float = 30.0):
+    """
+    Runs the application under uvicorn in a subprocess and yields its base URL.
+
+    Args:
+        env (dict): Environment of the server process.
+        args (Optional[list]): Extra uvicorn command-line arguments.
+        startup_timeout (float): Seconds to wait for the server to answer.
+    """
+    port = free_port()
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+               "--log-level", "warning", *(args or [])]
+    process = subprocess.Popen(command, cwd=ROOT, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            try:
+                if httpx.get(f"{base_url}/openapi.json", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("Benchmark server failed to start")
+            time.sleep(0.1)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+@contextmanager
+def temporary_directory():
+    """
+    Yields a scratch directory that is removed afterwards.
+    """
+    with tempfile.TemporaryDirectory(prefix="mvc-bench-") as directory:
+        yield directory
+
+
+async def signup(client: httpx.AsyncClient, email: str, password: str = "benchmark-password") -> dict:
+    """
+    Registers a user and returns the Authorization header for it.
+    """
+    response = await client.post("/auth/signup", json={"email": email, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def run_load(
+        base_url: str,
+        concurrency: int,
+        duration: float,
+        step: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]],
+) -> LoadResult:
+    """
+    Runs `concurrency` virtual clients in a closed loop for `duration` seconds.
+
+    Args:
+        base_url (str): Server under test.
+        concurrency (int): Number of concurrent virtual clients.
+        duration (float): Length of the run in seconds.
+        step: Coroutine issuing one request for the given client index.
+
+    Returns:
+        LoadResult: Latencies and error count of the run.
+    """
+    result = LoadResult()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker(index: int):
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await step(client, index)
+                except httpx.HTTPError:
+                    response = None
+                result.record(response, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(index) for index in range(concurrency)))
+        result.elapsed = time.perf_counter() - started
+    return result
+
+
+# Metrics compared against baselines, and whether a larger value is better
+HIGHER_IS_BETTER = {"rps": True, "ops_per_s": True}
+LOWER_IS_BETTER = {"p50_ms", "p95_ms", "p99_ms", "us_per_op", "queries_per_request", "errors"}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_baseline(report: dict, path: str):
+    """
+    Writes a benchmark report to `path` as a JSON baseline, with the commit and
+    machine it was measured on.
+    """
+    document = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": report,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(document, file, indent=2)
+        file.write("\n")
+
+
+def compare_to_baseline(report: dict, path: str, tolerance_pct: float) -> list:
+    """
+    Compares a report with a baseline saved by `save_baseline`.
+
+    Every metric present in both, at any nesting depth, is compared; a metric
+    is a regression when it is worse than the baseline by more than `tolerance_pct`.
+
+    Args:
+        report (dict): Results of the current run.
+        path (str): Baseline file.
+        tolerance_pct (float): Allowed relative change in percent.
+
+    Returns:
+        list: One line per regression, empty if there is none.
+    """
+    with open(path) as file:
+        baseline = json.load(file)["results"]
+
+    regressions = []
+
+    def walk(current: dict, previous: dict, prefix: str):
+        for key, value in current.items():
+            if key not in previous:
+                continue
+            name = f"{prefix}{key}"
+            if isinstance(value, dict) and isinstance(previous[key], dict):
+                walk(value, previous[key], f"{name}.")
+            elif isinstance(value, (int, float)) and isinstance(previous[key], (int, float)):
+                old = previous[key]
+                if key in HIGHER_IS_BETTER:
+                    worse = old > 0 and value < old * (1 - tolerance_pct / 100)
+                elif key in LOWER_IS_BETTER:
+                    worse = value > old * (1 + tolerance_pct / 100) and value - old > 1e-9
+                else:
+                    continue
+                if worse:
+                    regressions.append(f"{name}: {old} -> {value}")
+
+    walk(report, baseline, "")
+    return regressions
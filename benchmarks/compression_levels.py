@@ -0,0 +1,104 @@
+"""
+Compares the CPU cost of response compression with the bytes it saves, for
+every codec available in this process and a range of levels, on a page of
+posts serialized the way /posts/get serializes it.
+
+For each codec and level it reports the compression ratio, the CPU time to
+compress and to decompress one page, and the ratio when the same page is
+streamed in chunks with a flush after each (as CompressionMiddleware does for
+streamed responses). Use it to pick RESPONSE_COMPRESSION_LEVELS (paid on every
+uncached response) and RESPONSE_CACHE_COMPRESSION_LEVELS (paid once per
+cached page). Brotli and zstd are measured only when installed.
+
+Usage:
+    python -m benchmarks.compression_levels --posts 100 --size 1024
+"""
+import argparse
+import json
+import random
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from core.compression import Compressor, available_codecs, brotli, compress, stdlib_zstd, zstandard
+
+LEVELS = {
+    "gzip": (1, 3, 5, 6, 9),
+    "br": (1, 4, 6, 9, 11),
+    "zstd": (1, 3, 6, 10, 15, 19),
+}
+
+WORDS = (
+    "request response cache database session index query latency throughput "
+    "worker pool token user post page cursor commit rollback schema column "
+    "the a of and to in is it that for on with as was at by this be"
+).split()
+
+
+def _page(posts: int, size: int) -> bytes:
+    rng = random.Random(42)
+
+    def text(length: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(length // 5))[:length]
+
+    created = datetime(2024, 1, 1)
+    items = [
+        {"id": 100000 - n, "text": text(rng.randint(size // 4, size)),
+         "created_at": (created - timedelta(minutes=n)).isoformat()}
+        for n in range(posts)
+    ]
+    return json.dumps(items, separators=(",", ":")).encode()
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "gzip":
+        return zlib.decompress(data, 31)
+    if codec == "br":
+        return brotli.decompress(data)
+    if stdlib_zstd is not None:
+        return stdlib_zstd.decompress(data)
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def _cpu_ms(function, repeat: int) -> float:
+    started = time.process_time()
+    for _ in range(repeat):
+        function()
+    return round((time.process_time() - started) * 1000 / repeat, 3)
+
+
+def _streamed_size(body: bytes, codec: str, level: int, chunk: int) -> int:
+    compressor = Compressor(codec, level)
+    chunks = [body[offset:offset + chunk] for offset in range(0, len(body), chunk)]
+    output = [compressor.flush(part) for part in chunks[:-1]]
+    output.append(compressor.finish(chunks[-1]))
+    return sum(map(len, output))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=100, help="Posts on the page")
+    parser.add_argument("--size", type=int, default=1024, help="Largest post text, in characters")
+    parser.add_argument("--chunk", type=int, default=16384, help="Bytes per flushed chunk when streaming")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed repetitions per measurement")
+    args = parser.parse_args()
+
+    body = _page(args.posts, args.size)
+    report = {"page_bytes": len(body), "codecs": {}}
+    for codec in available_codecs():
+        results = report["codecs"][codec] = {}
+        for level in LEVELS[codec]:
+            encoded = compress(body, codec, level)
+            assert _decompress(encoded, codec) == body
+            results[str(level)] = {
+                "bytes": len(encoded),
+                "ratio": round(len(body) / len(encoded), 2),
+                "compress_cpu_ms": _cpu_ms(lambda: compress(body, codec, level), args.repeat),
+                "decompress_cpu_ms": _cpu_ms(lambda: _decompress(encoded, codec), args.repeat),
+                "streamed_ratio": round(len(body) / _streamed_size(body, codec, level, args.chunk), 2),
+            }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
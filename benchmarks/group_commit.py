@@ -0,0 +1,58 @@
+"""
+Compares write throughput and tail latency of /posts/add with and without
+group commit (POSTS_GROUP_COMMIT).
+
+Every virtual client only adds posts, spread over a few users, so each request
+is one commit without group commit. SQLite serializes writers much like a busy
+MySQL primary pays one fsync per transaction, which is what group commit
+amortizes; absolute numbers are only meaningful against the same backend.
+
+Usage:
+    python -m benchmarks.group_commit --concurrency 64 --duration 15
+    python -m benchmarks.group_commit --async-mode --window-ms 5
+"""
+import argparse
+import asyncio
+import json
+
+import httpx
+
+from benchmarks.common import run_load, serve, signup, sqlite_env, temporary_directory
+
+
+async def _scenario(base_url: str, concurrency: int, duration: float, users: int) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        headers = [await signup(client, f"bench{index}@example.com") for index in range(users)]
+
+    async def step(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        return await client.post("/posts/add", json={"text": "benchmark post " * 20}, headers=headers[index % users])
+
+    result = await run_load(base_url, concurrency, duration, step)
+    return result.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=100)
+    parser.add_argument("--async-mode", action="store_true")
+    args = parser.parse_args()
+
+    report = {}
+    for mode, group_commit in (("per_request", "false"), ("group_commit", "true")):
+        with temporary_directory() as directory, serve(sqlite_env(
+            directory,
+            ASYNC_MODE=str(args.async_mode).lower(),
+            POSTS_GROUP_COMMIT=group_commit,
+            POSTS_GROUP_COMMIT_WINDOW_MS=args.window_ms,
+            POSTS_GROUP_COMMIT_MAX_BATCH=args.max_batch,
+        )) as base_url:
+            report[mode] = asyncio.run(_scenario(base_url, args.concurrency, args.duration, args.users))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
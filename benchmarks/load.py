@@ -0,0 +1,167 @@
+"""
+HTTP load generator replaying the flows of mvc-backend.postman_collection.json.
+
+Every virtual client repeats the collection's main flow, signup -> login ->
+add -> get -> delete, as a new user each time. Request bodies come from the
+collection, with a unique e-mail per signup and the post ID returned by "add"
+substituted into "delete". With --payload-tests the collection's payload tests
+(an empty post and a ~1 MB post) are sent after "add" as well.
+
+The report gives, per step and overall, requests per second, p50/p95/p99
+latency and SQL queries per request (from the Server-Timing header).
+
+By default the application is started locally against a fresh SQLite
+database; --url targets a running server instead.
+
+Usage:
+    python -m benchmarks.load --concurrency 50 --duration 30
+    python -m benchmarks.load --save benchmarks/baselines/load.json
+    python -m benchmarks.load --compare benchmarks/baselines/load.json --tolerance 10
+    python -m benchmarks.load --url http://localhost:8000
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from contextlib import nullcontext
+from urllib.parse import urlparse
+
+import httpx
+
+from benchmarks.common import (
+    ROOT, LoadResult, compare_to_baseline, save_baseline, serve, sqlite_env, temporary_directory,
+)
+
+COLLECTION = os.path.join(ROOT, "mvc-backend.postman_collection.json")
+FLOW = ("signup", "login", "add", "get", "delete/{post_id}")
+PAYLOAD_TESTS = ("payload test 1", "payload test 2")
+
+
+def load_requests(path: str) -> dict:
+    """
+    Reads the requests of a Postman v2.1 collection, by name.
+
+    Returns:
+        dict: (method, path, JSON body or None) per request name.
+    """
+    with open(path, encoding="utf-8") as file:
+        collection = json.load(file)
+
+    requests = {}
+
+    def walk(items: list):
+        for item in items:
+            if "item" in item:
+                walk(item["item"])
+                continue
+            request = item["request"]
+            url = request["url"]["raw"] if isinstance(request["url"], dict) else request["url"]
+            raw = request.get("body", {}).get("raw", "")
+            body = json.loads(raw) if raw.strip() and request["method"] in ("POST", "PUT", "PATCH") else None
+            requests[item["name"]] = (request["method"], urlparse(url).path, body)
+
+    walk(collection["item"])
+    return requests
+
+
+async def run_flows(base_url: str, concurrency: int, duration: float, payload_tests: bool) -> dict:
+    """
+    Runs `concurrency` virtual clients repeating the collection's flow for `duration` seconds.
+
+    Returns:
+        dict: Summary per step, and of all requests together.
+    """
+    requests = load_requests(COLLECTION)
+    steps = {name: LoadResult() for name in FLOW + (PAYLOAD_TESTS if payload_tests else ())}
+    users = itertools.count()
+    run_id = int(time.time())
+
+    async def send(client: httpx.AsyncClient, name: str, headers: dict = None, body: dict = None, path: str = None):
+        method, default_path, default_body = requests[name]
+        started = time.perf_counter()
+        try:
+            response = await client.request(
+                method, path or default_path, json=body if body is not None else default_body, headers=headers,
+            )
+        except httpx.HTTPError:
+            response = None
+        steps[name].record(response, time.perf_counter() - started)
+        return response
+
+    async def flow(client: httpx.AsyncClient):
+        credentials = dict(requests["signup"][2], email=f"load-{run_id}-{next(users)}@example.com")
+        if await send(client, "signup", body=credentials) is None:
+            return
+        response = await send(client, "login", body=credentials)
+        if response is None or response.status_code != 200:
+            return
+        auth = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        response = await send(client, "add", headers=auth)
+        if payload_tests:
+            for name in PAYLOAD_TESTS:
+                await send(client, name, headers=auth)
+        await send(client, "get", headers=auth)
+        if response is not None and response.status_code == 200:
+            path = requests["delete/{post_id}"][1].rsplit("/", 1)[0] + f"/{response.json()['post_id']}"
+            await send(client, "delete/{post_id}", headers=auth, body={}, path=path)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                await flow(client)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    total = LoadResult(elapsed=elapsed)
+    for result in steps.values():
+        result.elapsed = elapsed
+        total.latencies += result.latencies
+        total.errors += result.errors
+        total.queries += result.queries
+    report = {name: result.summary() for name, result in steps.items()}
+    report["total"] = total.summary()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--payload-tests", action="store_true", help="Also send the collection's payload tests")
+    parser.add_argument("--url", help="Benchmark a running server instead of starting one")
+    parser.add_argument("--async-mode", action="store_true", help="Start the server with ASYNC_MODE enabled")
+    parser.add_argument("--bcrypt-rounds", type=int, default=10, help="bcrypt cost of a locally started server")
+    parser.add_argument("--save", help="Write the results as a JSON baseline to this path")
+    parser.add_argument("--compare", help="Compare the results with a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args()
+
+    with (nullcontext() if args.url else temporary_directory()) as directory:
+        if args.url:
+            server = nullcontext(args.url)
+        else:
+            env = sqlite_env(directory, ASYNC_MODE=str(args.async_mode).lower(), BCRYPT_ROUNDS=args.bcrypt_rounds)
+            server = serve(env)
+        with server as base_url:
+            report = asyncio.run(run_flows(base_url, args.concurrency, args.duration, args.payload_tests))
+
+    print(json.dumps(report, indent=2))
+    if args.save:
+        save_baseline(report, args.save)
+    if args.compare:
+        regressions = compare_to_baseline(report, args.compare, args.tolerance)
+        for line in regressions:
+            print(f"Regression: {line}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
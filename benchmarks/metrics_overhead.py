@@ -0,0 +1,62 @@
+"""
+Measures the overhead of the metrics subsystem (request middleware, query
+hooks and Server-Timing headers) by running the same load with METRICS_ENABLED
+on and off.
+
+The load reads cached pages of posts, the cheapest authenticated request, so
+the fixed per-request cost of instrumentation weighs as much as it ever can.
+Runs alternate between the two settings to even out machine noise.
+
+Usage:
+    python -m benchmarks.metrics_overhead --concurrency 32 --duration 10 --rounds 3
+"""
+import argparse
+import asyncio
+import json
+
+import httpx
+
+from benchmarks.common import run_load, serve, signup, sqlite_env, temporary_directory
+
+
+async def _scenario(base_url: str, concurrency: int, duration: float) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        headers = await signup(client, "bench@example.com")
+        for index in range(20):
+            await client.post("/posts/add", json={"text": f"benchmark post {index}"}, headers=headers)
+
+    async def step(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        return await client.get("/posts/get", params={"limit": 20}, headers=headers)
+
+    result = await run_load(base_url, concurrency, duration, step)
+    return result.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    runs = {"enabled": [], "disabled": []}
+    for _ in range(args.rounds):
+        for label, enabled in (("disabled", "false"), ("enabled", "true")):
+            with temporary_directory() as directory, serve(sqlite_env(directory, METRICS_ENABLED=enabled)) as base_url:
+                runs[label].append(asyncio.run(_scenario(base_url, args.concurrency, args.duration)))
+
+    report = {}
+    for label, results in runs.items():
+        report[label] = {
+            "rps": round(sum(result["rps"] for result in results) / len(results), 1),
+            "p50_ms": round(sum(result["p50_ms"] for result in results) / len(results), 2),
+            "p99_ms": round(sum(result["p99_ms"] for result in results) / len(results), 2),
+        }
+    report["throughput_overhead_pct"] = round(
+        (1 - report["enabled"]["rps"] / report["disabled"]["rps"]) * 100, 2
+    ) if report["disabled"]["rps"] else None
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
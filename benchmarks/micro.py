@@ -0,0 +1,145 @@
+"""
+Micro-benchmarks of the hot functions of `core.auth`, `core.cache` and
+`services.post_service`, run in-process against a temporary SQLite database.
+
+Each benchmark is repeated for about --seconds; the report gives operations
+per second, microseconds per operation and, for database-backed functions,
+SQL statements per operation.
+
+Usage:
+    python -m benchmarks.micro
+    python -m benchmarks.micro --save benchmarks/baselines/micro.json
+    python -m benchmarks.micro --compare benchmarks/baselines/micro.json --tolerance 15
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from benchmarks.common import compare_to_baseline, save_baseline, temporary_directory
+
+
+def measure(fn, seconds: float, min_runs: int = 3) -> dict:
+    """
+    Calls `fn` repeatedly for about `seconds` and returns its throughput.
+    """
+    from core.metrics import RequestStats, request_stats
+
+    stats = RequestStats()
+    token = request_stats.set(stats)  # Counts the queries issued by fn
+    try:
+        runs = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        while runs < min_runs or time.perf_counter() < deadline:
+            fn()
+            runs += 1
+        elapsed = time.perf_counter() - started
+    finally:
+        request_stats.reset(token)
+    result = {"ops_per_s": round(runs / elapsed, 1), "us_per_op": round(elapsed / runs * 1e6, 2)}
+    if stats.db_queries:
+        result["queries_per_op"] = round(stats.db_queries / runs, 2)
+    return result
+
+
+def run(seconds: float, bcrypt_rounds: int) -> dict:
+    """
+    Runs every micro-benchmark; the application must be importable at this point.
+    """
+    from core.auth import create_access_token, decode_token, get_token_user_id, principal_cache
+    from core.cache import SimpleCache
+    from core.database import init_db, new_session
+    from core.hashing import PasswordHasher
+    from models.user_model import User
+    from schemas.post_schema import PostCreate
+    from services import post_service
+
+    init_db()
+    with new_session() as db:
+        user = User(email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        db.expunge(user)
+        for index in range(100):
+            post_service.add_post(user, PostCreate(text=f"benchmark post {index} " * 10), db)
+
+    report = {}
+
+    # Password hashing, inline (the pool only adds parallelism, not speed)
+    hasher = PasswordHasher(rounds=bcrypt_rounds, pool_size=0)
+    hashed = hasher.hash("benchmark-password")
+    report["auth.hash_password"] = measure(lambda: hasher.hash("benchmark-password"), seconds, min_runs=1)
+    report["auth.verify_password"] = measure(
+        lambda: hasher.verify_and_update("benchmark-password", hashed), seconds, min_runs=1
+    )
+
+    # JWT handling
+    token = create_access_token({"user_id": user.id})
+    report["auth.create_access_token"] = measure(lambda: create_access_token({"user_id": user.id}), seconds)
+    report["auth.decode_token"] = measure(lambda: decode_token(token), seconds)
+    get_token_user_id(token)
+    report["auth.get_token_user_id_cached"] = measure(lambda: get_token_user_id(token), seconds)
+    principal_cache.payloads.clear()
+
+    # Cache primitives
+    local = SimpleCache(ttl_seconds=300, max_entries=10000)
+    page = ["value"] * 50
+    keys = [(group, "page", index) for group in range(100) for index in range(10)]
+    local_counter = iter(range(10 ** 12))
+    report["cache.set"] = measure(lambda: local.set(keys[next(local_counter) % len(keys)], page), seconds)
+    report["cache.get_hit"] = measure(lambda: local.get(keys[next(local_counter) % len(keys)]), seconds)
+    report["cache.get_miss"] = measure(lambda: local.get(("missing", next(local_counter))), seconds)
+    local.close()
+
+    # Post service, with the application's own cache
+    cursor = post_service.encode_cursor(SimpleNamespace(created_at=datetime.now(), id=1))
+    report["posts.decode_cursor"] = measure(lambda: post_service.decode_cursor(cursor), seconds)
+
+    with new_session() as db:
+        def page_miss():
+            post_service.cache.invalidate(user.id)
+            post_service.get_user_posts(user, db, 50)
+
+        report["posts.get_user_posts_miss"] = measure(page_miss, seconds)
+        post_service.get_user_posts(user, db, 50)
+        report["posts.get_user_posts_hit"] = measure(lambda: post_service.get_user_posts(user, db, 50), seconds)
+        posts_page = post_service.get_user_posts(user, db, 50)
+        report["posts.render_page"] = measure(lambda: post_service.render_page(posts_page), seconds)
+        report["posts.add_post"] = measure(
+            lambda: post_service.add_post(user, PostCreate(text="benchmark post"), db), seconds
+        )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=1.0, help="Approximate duration of each benchmark")
+    parser.add_argument("--bcrypt-rounds", type=int, default=10)
+    parser.add_argument("--save", help="Write the results as a JSON baseline to this path")
+    parser.add_argument("--compare", help="Compare the results with a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=15.0, help="Allowed regression in percent")
+    args = parser.parse_args()
+
+    with temporary_directory() as directory:
+        # The application reads its configuration at import time
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'micro.db')}"
+        os.environ.setdefault("CACHE_BACKEND", "local")
+        report = run(args.seconds, args.bcrypt_rounds)
+
+    print(json.dumps(report, indent=2))
+    if args.save:
+        save_baseline(report, args.save)
+    if args.compare:
+        regressions = compare_to_baseline(report, args.compare, args.tolerance)
+        for line in regressions:
+            print(f"Regression: {line}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
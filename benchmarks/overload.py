@@ -0,0 +1,71 @@
+"""
+Compares behaviour under overload with and without admission control
+(ADMISSION_CONTROL).
+
+Virtual clients mix bcrypt-heavy logins with reads of their posts, at a
+concurrency well above what the server can serve. Without admission control
+every request queues and latency grows with the load; with it, excess
+requests get a fast 503 and the admitted ones keep their latency. Shed
+requests are counted as errors; `goodput` is the rate of successful requests.
+
+Usage:
+    python -m benchmarks.overload --concurrency 200 --duration 15
+    python -m benchmarks.overload --bcrypt-rounds 10 --login-share 0.2
+"""
+import argparse
+import asyncio
+import json
+import random
+
+import httpx
+
+from benchmarks.common import run_load, serve, signup, sqlite_env, temporary_directory
+
+PASSWORD = "benchmark-password"
+
+
+async def _scenario(base_url: str, concurrency: int, duration: float, users: int, login_share: float) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        headers = [await signup(client, f"bench{index}@example.com", PASSWORD) for index in range(users)]
+        for auth in headers:
+            await client.post("/posts/add", json={"text": "benchmark post " * 20}, headers=auth)
+
+    async def step(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        if random.random() < login_share:
+            credentials = {"email": f"bench{index % users}@example.com", "password": PASSWORD}
+            return await client.post("/auth/login", json=credentials)
+        return await client.get("/posts/get", params={"limit": 20}, headers=headers[index % users])
+
+    result = await run_load(base_url, concurrency, duration, step)
+    summary = result.summary()
+    summary["goodput"] = summary.pop("rps")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--login-share", type=float, default=0.1)
+    parser.add_argument("--bcrypt-rounds", type=int, default=10)
+    parser.add_argument("--async-mode", action="store_true")
+    args = parser.parse_args()
+
+    report = {}
+    for mode, enabled in (("unlimited", "false"), ("admission_control", "true")):
+        env = dict(
+            ASYNC_MODE=str(args.async_mode).lower(),
+            ADMISSION_CONTROL=enabled,
+            BCRYPT_ROUNDS=args.bcrypt_rounds,
+            POSTS_ADD_RATE=0,
+        )
+        with temporary_directory() as directory, serve(sqlite_env(directory, **env)) as base_url:
+            report[mode] = asyncio.run(
+                _scenario(base_url, args.concurrency, args.duration, args.users, args.login_share)
+            )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Compares the production entry point (serve.py) with launching uvicorn directly:
+throughput and latency of authenticated /posts/get reads, and the memory of
+every server process once the load has run.
+
+Configurations:
+    uvicorn           `uvicorn main:app`, the previous launch command (one process)
+    uvicorn_workers   `uvicorn main:app --workers N` (each worker imports the app itself)
+    serve             `python serve.py --workers N` (app imported once, workers forked)
+    serve_pure        serve.py with the asyncio loop and h11, measured only when
+                      uvloop or httptools is installed, to isolate their effect
+
+Memory is read from /proc/<pid>/smaps_rollup (Linux): RSS counts shared pages
+in every process using them, PSS splits them between those processes and
+private is what a process would free on exit. Per-worker values are averaged;
+the total PSS covers every process of the server, including helpers such as
+the password hashing pool of each worker.
+
+Usage:
+    python -m benchmarks.server --workers 4 --concurrency 64 --duration 10
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Optional
+
+import httpx
+
+from benchmarks.common import ROOT, free_port, run_load, signup, sqlite_env, temporary_directory
+
+# smaps_rollup fields reported, in kB
+MEMORY_FIELDS = ("Rss", "Pss", "Private_Clean", "Private_Dirty")
+
+
+def _commands(workers: int) -> dict:
+    # Command of each configuration, and whether it runs a supervisor forking the workers
+    uvicorn = [sys.executable, "-m", "uvicorn", "main:app", "--log-level", "warning", "--no-access-log"]
+    serve = [sys.executable, "serve.py", "--log-level", "warning", "--no-access-log", "--workers", str(workers)]
+    commands = {
+        "uvicorn": (uvicorn, False),
+        "uvicorn_workers": ([*uvicorn, "--workers", str(workers)], workers > 1),  # One worker runs unsupervised
+        "serve": (serve, True),
+    }
+    if importlib.util.find_spec("uvloop") or importlib.util.find_spec("httptools"):
+        commands["serve_pure"] = ([*serve, "--loop", "asyncio", "--http", "h11"], True)
+    return commands
+
+
+def _children(pid: int) -> list[int]:
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as file:
+                children += map(int, file.read().split())
+    except OSError:
+        pass
+    return children
+
+
+def _descendants(pid: int) -> list[int]:
+    children = _children(pid)
+    return children + [grandchild for child in children for grandchild in _descendants(child)]
+
+
+def _memory(pid: int) -> Optional[dict]:
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as file:
+            fields = dict(line.split(":", 1) for line in file if ":" in line)
+    except OSError:
+        return None
+    values = {name: int(fields[name].split()[0]) for name in MEMORY_FIELDS if name in fields}
+    return {
+        "rss_mb": round(values.get("Rss", 0) / 1024, 1),
+        "pss_mb": round(values.get("Pss", 0) / 1024, 1),
+        "private_mb": round((values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)) / 1024, 1),
+    }
+
+
+def _is_helper(pid: int) -> bool:
+    # multiprocessing's resource tracker, started next to uvicorn's spawned workers
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as file:
+            return b"resource_tracker" in file.read()
+    except OSError:
+        return True
+
+
+def _process_memory(pid: int, supervised: bool) -> dict:
+    workers = [child for child in _children(pid) if not _is_helper(child)] if supervised else [pid]
+    measured = [memory for memory in map(_memory, workers) if memory is not None]
+    everything = [memory for memory in map(_memory, [pid, *_descendants(pid)]) if memory is not None]
+    report = {
+        "workers": len(measured),
+        "worker": {key: round(sum(memory[key] for memory in measured) / len(measured), 1) for key in measured[0]},
+        "processes": len(everything),
+        "total_pss_mb": round(sum(memory["pss_mb"] for memory in everything), 1),
+    }
+    if supervised:
+        report["master"] = _memory(pid)
+    return report
+
+
+def _start(command: list, port: int, env: dict, timeout: float = 60.0) -> subprocess.Popen:
+    process = subprocess.Popen([*command, "--port", str(port)], cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/openapi.json", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError("Benchmark server failed to start")
+        time.sleep(0.1)
+
+
+async def _seed(base_url: str, users: int, posts: int) -> list[dict]:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        headers = [await signup(client, f"server{n}@example.com") for n in range(users)]
+        for user_headers in headers:
+            for n in range(posts):
+                response = await client.post("/posts/add", json={"text": f"post {n} " * 20}, headers=user_headers)
+                response.raise_for_status()
+    return headers
+
+
+async def _measure(base_url: str, headers: list[dict], args: argparse.Namespace) -> dict:
+    async def step(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        return await client.get("/posts/get", headers=headers[index % len(headers)])
+
+    await run_load(base_url, args.concurrency, min(2.0, args.duration), step)  # Warm up every worker
+    return (await run_load(base_url, args.concurrency, args.duration, step)).summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--posts", type=int, default=20, help="Posts per user")
+    parser.add_argument("--async-mode", action="store_true")
+    args = parser.parse_args()
+
+    report = {"workers": args.workers, "configurations": {}}
+    for name, (command, supervised) in _commands(args.workers).items():
+        with temporary_directory() as directory:
+            env = sqlite_env(directory, ASYNC_MODE=str(args.async_mode).lower(), BCRYPT_ROUNDS=4)
+            # Workers started together on an empty database would race to create the schema
+            subprocess.run([sys.executable, "-c", "from core.database import init_db; init_db()"],
+                           cwd=ROOT, env=env, stdout=subprocess.DEVNULL, check=True)
+            port = free_port()
+            process = _start(command, port, env)
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                headers = asyncio.run(_seed(base_url, args.users, args.posts))
+                load = asyncio.run(_measure(base_url, headers, args))
+                report["configurations"][name] = {**load, "memory": _process_memory(process.pid, supervised)}
+            finally:
+                process.terminate()
+                process.wait(timeout=60)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
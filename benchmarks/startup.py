@@ -0,0 +1,96 @@
+"""
+Measures how long a freshly started server takes to answer its first requests.
+
+For each run a new uvicorn process is started and polled until it answers;
+then one user signs up and reads their posts. The first run of every mode
+starts on an empty database (schema DDL runs), the following runs on the
+database left by the previous run (the schema fingerprint is current).
+
+Reported per mode, in milliseconds:
+    ready_ms          process start until the first HTTP response
+    first_signup_ms   first /auth/signup (lazy imports of passlib and jose)
+    first_read_ms     first authenticated /posts/get
+
+Usage:
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --pool-warmup 5 --async-mode
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import ROOT, free_port, sqlite_env, temporary_directory
+
+
+def _boot(env: dict, timeout: float = 60.0) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=base_url, timeout=10) as client:
+            while True:
+                try:
+                    client.get("/metrics/pool")
+                    break
+                except httpx.TransportError:
+                    if process.poll() is not None or time.perf_counter() - started > timeout:
+                        raise RuntimeError("Benchmark server failed to start")
+                    time.sleep(0.005)
+            ready = time.perf_counter()
+
+            response = client.post("/auth/signup", json={"email": f"boot{port}@example.com", "password": "benchmark"})
+            response.raise_for_status()
+            signed_up = time.perf_counter()
+
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            client.get("/posts/get", headers=headers).raise_for_status()
+            read = time.perf_counter()
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return {
+        "ready_ms": (ready - started) * 1000,
+        "first_signup_ms": (signed_up - ready) * 1000,
+        "first_read_ms": (read - signed_up) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--pool-warmup", type=int, default=0)
+    parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    parser.add_argument("--async-mode", action="store_true")
+    args = parser.parse_args()
+
+    report = {}
+    for mode in ("fingerprint", "always"):
+        with temporary_directory() as directory:
+            env = sqlite_env(
+                directory,
+                ASYNC_MODE=str(args.async_mode).lower(),
+                BCRYPT_ROUNDS=args.bcrypt_rounds,
+                DB_SCHEMA_CHECK=mode,
+                DB_POOL_WARMUP=args.pool_warmup,
+            )
+            runs = [_boot(env) for _ in range(args.runs)]
+        report[f"schema_check_{mode}"] = {
+            "empty_database": {key: round(value, 1) for key, value in runs[0].items()},
+            "existing_database": {
+                key: round(statistics.median(run[key] for run in runs[1:]), 1) for key in runs[0]
+            } if len(runs) > 1 else None,
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
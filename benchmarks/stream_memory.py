@@ -0,0 +1,89 @@
+"""
+Measures how the peak memory of streaming a user's posts as NDJSON grows with
+the number of posts, compared with materializing the whole result as one JSON
+array (what a non-streaming listing of every post would do).
+
+Peak Python heap usage is measured with tracemalloc against a temporary SQLite
+database. Like the other benchmarks, it is run by hand and nothing runs it
+automatically; it exits with status 1 if the streaming peak grows by more than
+--tolerance between the smallest and the largest row count.
+
+Usage:
+    python -m benchmarks.stream_memory --counts 1000 10000 50000
+"""
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+
+from benchmarks.common import temporary_directory
+
+
+def _peak(consume) -> int:
+    tracemalloc.start()
+    try:
+        consume()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--size", type=int, default=1024, help="Characters per post")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Allowed growth factor of the streaming peak")
+    args = parser.parse_args()
+
+    with temporary_directory() as directory:
+        # The application reads its database URL at import time
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'stream.db')}"
+        from sqlalchemy import select
+        from core.database import init_db, new_session
+        from models.post_model import Post
+        from models.user_model import User
+        from services.post_service import (
+            insert_posts, post_row, posts_adapter, stream_user_posts, user_posts_stream_statement,
+        )
+
+        init_db()
+        with new_session() as db:
+            user = User(email="bench@example.com", hashed_password="x")
+            db.add(user)
+            db.commit()
+            user_id = user.id
+
+        def stream():
+            for _ in stream_user_posts(user_posts_stream_statement(user_id), user_id):
+                pass
+
+        def materialize():
+            with new_session() as db:
+                rows = db.execute(select(Post.id, Post.text, Post.created_at).where(Post.user_id == user_id)).all()
+                posts_adapter.dump_json(posts_adapter.validate_python(rows, from_attributes=True))
+
+        report = {}
+        inserted = 0
+        for count in sorted(args.counts):
+            with new_session() as db:
+                while inserted < count:
+                    batch = min(1000, count - inserted)
+                    insert_posts(db, [post_row(user_id, f"{inserted + index} " + "x" * args.size)
+                                      for index in range(batch)])
+                    inserted += batch
+                db.commit()
+            report[count] = {
+                "stream_peak_kb": _peak(stream) // 1024,
+                "materialized_peak_kb": _peak(materialize) // 1024,
+            }
+
+    print(json.dumps(report, indent=2))
+    peaks = [report[count]["stream_peak_kb"] for count in sorted(report)]
+    if peaks[-1] > peaks[0] * args.tolerance:
+        print(f"Streaming peak grew from {peaks[0]} KB to {peaks[-1]} KB", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Measures the effect of post text compression on database size and read
+throughput, with compression on and off, against a temporary SQLite file.
+
+Reads are timed twice: loading full posts (text decompressed) and loading
+only post metadata, which leaves the deferred text column unread. The models
+are imported from the application, so DATABASE_URL must point to a database
+whose driver is installed (any SQLite URL will do; it is not used).
+
+Usage:
+    python -m benchmarks.text_compression --posts 5000 --size 8192
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, undefer
+
+from benchmarks.common import temporary_directory
+from core.database import Base
+from models.post_model import Post
+from models.types import CompressedText
+from models.user_model import User
+
+WORDS = (
+    "request response cache database session index query latency throughput "
+    "worker pool token user post page cursor commit rollback schema column"
+).split()
+
+
+def _text(size: int, rng: random.Random) -> str:
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+
+def _run(directory: str, compressed: bool, posts: int, size: int, reads: int) -> dict:
+    CompressedText.enabled = compressed
+    path = os.path.join(directory, f"posts-{'on' if compressed else 'off'}.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    rng = random.Random(42)
+
+    with Session(engine) as db:
+        user = User(email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add_all(Post(text=_text(size, rng), user_id=user.id) for _ in range(posts))
+        db.commit()
+        user_id = user.id
+
+    def timed(statement) -> float:
+        started = time.perf_counter()
+        for _ in range(reads):
+            with Session(engine) as db:
+                rows = db.scalars(statement).all()
+                for post in rows:
+                    post.id  # Touch the loaded attributes only
+        return round(reads * len(rows) / (time.perf_counter() - started), 1)
+
+    page = select(Post).where(Post.user_id == user_id).order_by(Post.id.desc()).limit(100)
+    report = {
+        "db_bytes": os.path.getsize(path),
+        "full_posts_per_s": timed(page.options(undefer(Post.text))),
+        "metadata_posts_per_s": timed(page),
+    }
+    engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--size", type=int, default=8192, help="Characters per post")
+    parser.add_argument("--reads", type=int, default=200, help="Pages of 100 posts read per measurement")
+    args = parser.parse_args()
+
+    report = {}
+    with temporary_directory() as directory:
+        for label, compressed in (("uncompressed", False), ("compressed", True)):
+            report[label] = _run(directory, compressed, args.posts, args.size, args.reads)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
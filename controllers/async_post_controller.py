@@ -0,0 +1,203 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from core.auth import get_current_user_async
+from core.admission import enforce_rate_limit, posts_add_limiter
+from core.config import settings
+from core.database import get_async_db
+from controllers.post_controller import (
+    NDJSON, etag_headers, matching_encoding, not_modified_response, rendered_codec, rendered_response, summary_response,
+)
+from models.user_model import User
+from schemas.post_schema import PostBatchCreate, PostBatchDelete, PostCreate, PostOut, PostSearchResult
+from services.async_post_service import (
+    add_post_async, add_posts_async, get_post_async, get_posts_version_async, get_user_post_summaries_async,
+    get_user_posts_async, get_user_posts_rendered_async, delete_post_async, delete_posts_async, search_posts_async,
+    stream_user_posts_async,
+)
+from services.post_service import page_encoding, page_etag, parse_fields, user_posts_stream_statement
+
+# Async variant of the post routes, mounted instead of
+# controllers.post_controller when ASYNC_MODE is enabled
+router = APIRouter()
+
+
+@router.post("/add")
+async def create_post(
+        post_data: PostCreate,
+        current_user: User = Depends(get_current_user_async),
+        db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Endpoint to create a new post.
+
+    :param post_data: Data required to create a post
+    :param current_user: User creating the post (from JWT token)
+    :param db: Async SQLAlchemy session
+    :return: ID of the newly created post
+    """
+    enforce_rate_limit(posts_add_limiter, current_user.id, "/posts/add")
+    post_id = await add_post_async(current_user, post_data, db)
+    return {"post_id": post_id}
+
+
+@router.post("/add_batch")
+async def create_posts(
+        batch: PostBatchCreate,
+        current_user: User = Depends(get_current_user_async),
+        db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Endpoint to create several posts with one multi-row insert.
+
+    :param batch: Posts to create (at most POSTS_BATCH_MAX_ITEMS)
+    :param current_user: User creating the posts (from JWT token)
+    :param db: Async SQLAlchemy session
+    :return: ID of each created post, by position in the request
+    """
+    return {"results": await add_posts_async(current_user, batch, db)}
+
+
+@router.get("/get", response_model=list[PostOut])
+async def read_posts(
+        request: Request,
+        response: Response,
+        limit: int = Query(settings.POSTS_PAGE_DEFAULT_LIMIT, ge=1, le=settings.POSTS_PAGE_MAX_LIMIT),
+        after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+        fields: Optional[str] = Query(
+            None, description="Comma-separated fields, e.g. id,created_at,preview; omit text to list summaries only"
+        ),
+        current_user: User = Depends(get_current_user_async),
+        db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Endpoint to retrieve one page of posts belonging to the authenticated user, newest first.
+    When more posts exist, the cursor of the next page is returned in the X-Next-Cursor header.
+    With `fields` not including text, summaries are listed without reading any post text.
+    With `Accept: application/x-ndjson`, all posts from the cursor on are streamed instead,
+    one JSON object per line, ignoring `limit`.
+    Pages carry an ETag; a request whose If-None-Match still matches is answered
+    with 304 Not Modified from the user's posts version alone, without reading any post.
+
+    :param request: Incoming request, used for Accept-Encoding and conditional request headers
+    :param response: Response object used to attach the pagination and validation headers
+    :param limit: Maximum number of posts to return
+    :param after: Opaque cursor of the page to continue from
+    :param fields: Fields to return for each post; all PostOut fields when omitted
+    :param current_user: The current logged-in user
+    :param db: Async SQLAlchemy session
+    :return: List of user's posts on the requested page
+    """
+    summary_fields = parse_fields(fields)
+    if NDJSON in request.headers.get("accept", ""):
+        statement = user_posts_stream_statement(current_user.id, after, summary_fields)
+        return StreamingResponse(stream_user_posts_async(statement, current_user.id, summary_fields), media_type=NDJSON)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = page_etag(current_user.id, await get_posts_version_async(current_user, db), limit, after, summary_fields)
+        encoding = matching_encoding(if_none_match, etag)
+        if encoding is not None:
+            return not_modified_response(etag, encoding)
+
+    if summary_fields is not None:
+        page = await get_user_post_summaries_async(current_user, db, limit, after)
+        etag = page_etag(current_user.id, page.version, limit, after, summary_fields)
+        return summary_response(page, summary_fields, etag)
+
+    if settings.POSTS_CACHE_MODE == "rendered":
+        rendered = await get_user_posts_rendered_async(current_user, db, limit, after)
+        etag = page_etag(current_user.id, rendered.version, limit, after, None)
+        codec = rendered_codec(rendered, request)
+        if codec is not None and codec not in rendered.encodings:
+            # The first request for a codec compresses the page, off the event loop
+            await run_in_threadpool(page_encoding, rendered, codec)
+        return rendered_response(rendered, request, etag)
+
+    page = await get_user_posts_async(current_user, db, limit, after)
+    response.headers.update(etag_headers(page_etag(current_user.id, page.version, limit, after, None)))
+    if page.next_cursor is not None:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return page.items
+
+
+@router.get("/search", response_model=list[PostSearchResult])
+async def find_posts(
+        response: Response,
+        q: str = Query(..., min_length=1, max_length=256, description="Words to look for in the posts"),
+        limit: int = Query(settings.POSTS_PAGE_DEFAULT_LIMIT, ge=1, le=settings.POSTS_PAGE_MAX_LIMIT),
+        after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+        current_user: User = Depends(get_current_user_async),
+        db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Async variant of the post search endpoint.
+
+    :param response: Response object used to attach the pagination header
+    :param q: Search query; posts containing any of its words match
+    :param limit: Maximum number of results to return
+    :param after: Opaque cursor of the page to continue from
+    :param current_user: The current logged-in user
+    :param db: Async SQLAlchemy session
+    :return: Matching posts on the requested page
+    """
+    page = await search_posts_async(current_user, q, db, limit, after)
+    if page.next_cursor is not None:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return page.items
+
+
+@router.delete("/delete/{post_id}")
+async def remove_post(
+        post_id: int,
+        current_user: User = Depends(get_current_user_async),
+        db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Endpoint to delete a post by its ID, if it belongs to the current user.
+
+    :param post_id: ID of the post to delete
+    :param current_user: The current logged-in user
+    :param db: Async SQLAlchemy session
+    :return: Success confirmation message
+    """
+    await delete_post_async(current_user, post_id, db)
+    return {"detail": "Post deleted"}
+
+
+@router.post("/delete_batch")
+async def remove_posts(
+        batch: PostBatchDelete,
+        current_user: User = Depends(get_current_user_async),
+        db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Endpoint to delete several posts of the current user with a single DELETE.
+    Posts that do not exist or belong to another user are reported as not deleted.
+
+    :param batch: IDs of the posts to delete (at most POSTS_BATCH_MAX_ITEMS)
+    :param current_user: The current logged-in user
+    :param db: Async SQLAlchemy session
+    :return: Whether each requested post was deleted
+    """
+    return {"results": await delete_posts_async(current_user, batch, db)}
+
+
+# Registered last, so that the fixed paths above take precedence over the parameter
+@router.get("/{post_id}", response_model=PostOut)
+async def read_post(
+        post_id: int,
+        current_user: User = Depends(get_current_user_async),
+        db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Endpoint to retrieve one post of the current user with its full text.
+
+    :param post_id: ID of the post
+    :param current_user: The current logged-in user
+    :param db: Async SQLAlchemy session
+    :return: The post
+    """
+    return await get_post_async(current_user, post_id, db)
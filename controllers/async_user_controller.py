@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import get_async_db
+from schemas.user_schema import UserCreate, UserLogin
+from services.async_user_service import register_user_async, login_user_async
+
+# Async variant of the authentication routes, mounted instead of
+# controllers.user_controller when ASYNC_MODE is enabled
+router = APIRouter()
+
+
+@router.post("/signup")
+async def signup(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Endpoint for registering a new user account.
+
+    :param user_data: User registration data including email, password, etc.
+    :param db: Async SQLAlchemy session used to interact with the database
+    :return: A dictionary containing a generated access token
+    """
+    token = await register_user_async(user_data, db)
+    return {"access_token": token}
+
+
+@router.post("/login")
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    """
+    Endpoint for logging in an existing user.
+
+    :param user_data: Login credentials (email and password)
+    :param db: Async SQLAlchemy session used to retrieve and verify user data
+    :return: A dictionary containing a generated access token if credentials are valid
+    """
+    token = await login_user_async(user_data, db)
+    return {"access_token": token}
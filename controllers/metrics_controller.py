@@ -0,0 +1,134 @@
+from dataclasses import fields
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from core.auth import principal_cache
+from core.cache import CacheStats, cache
+from core.config import settings
+from core.database import async_engine, async_replicas, engine, replicas
+from core.metrics import registry
+from core.pool import pool_status
+from core.profiling import verify_token
+from core.slow_queries import slow_query_log
+from services.search_service import MemorySearchBackend, search_backend
+
+# Initialize API router for operational metrics
+router = APIRouter()
+
+# CacheStats fields that only grow; the others describe current occupancy
+CACHE_COUNTERS = {
+    "hits", "misses", "sets", "evictions", "expirations", "invalidations", "rejections", "stale_hits", "coalesced",
+    "refreshes",
+}
+
+# Pool status fields exported to Prometheus, with their metric type
+POOL_METRICS = {
+    "size": "gauge",
+    "checked_out": "gauge",
+    "checked_in": "gauge",
+    "overflow": "gauge",
+    "peak_checked_out": "gauge",
+    "checkouts": "counter",
+    "timeouts": "counter",
+    "wait_seconds_total": "counter",
+    "wait_seconds_max": "gauge",
+}
+
+
+def _engines() -> dict:
+    engines = {"sync": engine}
+    if async_engine is not None:
+        engines["async"] = async_engine
+    for prefix, replica_set in (("replica", replicas), ("async_replica", async_replicas)):
+        for index, replica in enumerate(replica_set.engines if replica_set is not None else ()):
+            engines[f"{prefix}{index}"] = replica
+    return engines
+
+
+def _collect_caches():
+    """
+    Exports the counters of the posts cache and of the principal caches.
+    """
+    caches = {"posts": cache, "principal_payloads": principal_cache.payloads, "principal_users": principal_cache.users}
+    stats = {name: backend.stats() for name, backend in caches.items()}
+    for field in fields(CacheStats):
+        counter = field.name in CACHE_COUNTERS
+        yield (
+            f"cache_{field.name}_total" if counter else f"cache_{field.name}",
+            "counter" if counter else "gauge",
+            f"Cache {field.name}, see core.cache.CacheStats.",
+            [({"cache": name}, getattr(value, field.name)) for name, value in stats.items()],
+        )
+
+
+def _collect_pools():
+    """
+    Exports the state and checkout counters of the connection pools.
+    """
+    statuses = {name: pool_status(target.pool) for name, target in _engines().items()}
+    for key, kind in POOL_METRICS.items():
+        samples = [({"engine": name}, status[key]) for name, status in statuses.items() if key in status]
+        if samples:
+            name = f"db_pool_{key}" if kind == "gauge" or key.endswith("_total") else f"db_pool_{key}_total"
+            yield name, kind, f"Connection pool {key.replace('_', ' ')}, see /metrics/pool.", samples
+
+
+def _collect_search():
+    """
+    Exports the occupancy of the in-process search index.
+    """
+    if not isinstance(search_backend, MemorySearchBackend):
+        return
+    index = search_backend.index
+    yield "search_index_users", "gauge", "Users whose search index is held in memory.", [({}, len(index))]
+    yield "search_index_postings", "gauge", "Postings held by the search index.", [({}, index.size)]
+    yield "search_index_evictions_total", "counter", "Users evicted from the search index.", [({}, index.evictions)]
+
+
+registry.register_collector(_collect_caches)
+registry.register_collector(_collect_pools)
+registry.register_collector(_collect_search)
+
+
+@router.get("", response_class=PlainTextResponse)
+def read_metrics():
+    """
+    Endpoint exposing this worker's metrics in the Prometheus text format.
+
+    :return: Request, query, cache and pool metrics
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/pool")
+def read_pool_metrics():
+    """
+    Endpoint reporting the state of this worker's database connection pools:
+    configured size, connections in use and in overflow, and checkout wait times.
+
+    :return: Status of the sync pool, and of the async pool in async mode
+    """
+    return {name: pool_status(target.pool) for name, target in _engines().items()}
+
+
+def require_profile_token(x_profile: Optional[str] = Header(None)):
+    """
+    Dependency admitting only requests carrying a valid X-Profile token (see core.profiling).
+
+    :param x_profile: Token signed with PROFILE_SECRET
+    :raises HTTPException: If the token is missing, invalid or expired, or PROFILE_SECRET is not set (status code 403)
+    """
+    if x_profile is None or not verify_token(settings.PROFILE_SECRET, x_profile):
+        raise HTTPException(status_code=403, detail="A valid X-Profile token is required")
+
+
+@router.get("/slow-queries", dependencies=[Depends(require_profile_token)])
+def read_slow_queries():
+    """
+    Endpoint listing the latest statements slower than SLOW_QUERY_MS on this
+    worker, with their parameters, route and EXPLAIN output. Requires an
+    X-Profile token, as statements reveal the schema and data access patterns.
+
+    :return: Slow statements, newest first; empty when the slow query log is disabled
+    """
+    return slow_query_log.recent() if slow_query_log is not None else []
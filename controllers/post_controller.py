@@ -1,27 +1,28 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from core.auth import get_current_user
-from core.database import SessionLocal
+from core.admission import enforce_rate_limit, posts_add_limiter
+from core.compression import encoded_etag, negotiate
+from core.config import settings
+from core.database import get_db
 from models.post_model import Post
 from models.user_model import User
-from schemas.post_schema import PostCreate, PostOut
-from services.post_service import add_post, get_user_posts, delete_post
+from schemas.post_schema import PostBatchCreate, PostBatchDelete, PostCreate, PostOut, PostSearchResult
+from services.post_service import (
+    PostPage, RenderedPage, add_post, add_posts, get_post, get_posts_version, get_user_post_summaries, get_user_posts,
+    get_user_posts_rendered, delete_post, delete_posts, page_codecs, page_encoding, page_etag, parse_fields,
+    stream_user_posts, summaries_adapter, user_posts_stream_statement,
+)
+from services.search_service import search_posts
 from functools import lru_cache
 
 # Initialize API router for post-related routes
 router = APIRouter()
 
-
-def get_db():
-    """
-    Dependency function that provides a scoped SQLAlchemy session.
-    Ensures the session is properly closed after the request ends.
-    """
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Media type of the streaming variant of /get, selected with the Accept header
+NDJSON = "application/x-ndjson"
 
 
 @lru_cache(maxsize=128)
@@ -37,6 +38,108 @@ def get_cached_posts(db: Session):
     return posts
 
 
+def matching_encoding(if_none_match: str, etag: str) -> Optional[str]:
+    """
+    Matches an If-None-Match header against an entity tag, using the weak
+    comparison HTTP prescribes for it. Tags of compressed representations
+    (see `core.compression.encoded_etag`) match the tag they were derived from.
+
+    :param if_none_match: The If-None-Match header of the request
+    :param etag: The current entity tag of the resource
+    :return: None if the client does not hold the current representation; otherwise
+        the content coding of the one it holds ("" when uncompressed)
+    """
+    current = etag.removeprefix("W/").strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return ""
+        tag, _, encoding = candidate.removeprefix("W/").strip('"').partition("-")
+        if tag == current:
+            return encoding
+    return None
+
+
+def etag_headers(etag: str) -> dict:
+    """
+    Headers validating a page of posts: its entity tag, and a Cache-Control that
+    keeps shared caches from storing it and makes clients revalidate it on every use.
+
+    :param etag: The page's entity tag
+    :return: Response headers
+    """
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def not_modified_response(etag: str, encoding: str) -> Response:
+    """
+    Builds the empty 304 answer to a conditional request for an unchanged page.
+    It carries the tag the 200 response carried, i.e. the encoded tag of a
+    compressed representation, so the client keeps the validator it stored.
+
+    :param etag: The page's entity tag
+    :param encoding: Content coding of the representation the client holds, "" if none
+    :return: Response with status 304 Not Modified
+    """
+    if encoding:
+        etag = encoded_etag(etag, encoding)
+    return Response(status_code=304, headers={**etag_headers(etag), "Vary": "Accept-Encoding"})
+
+
+def rendered_codec(rendered: RenderedPage, request: Request) -> Optional[str]:
+    """
+    Negotiates the codec a pre-serialized page is sent in, if any.
+
+    :param rendered: The cached page body
+    :param request: Incoming request, used for Accept-Encoding negotiation
+    :return: The codec, or None to send the body uncompressed
+    """
+    return negotiate(request.headers.get("accept-encoding", ""), page_codecs(rendered))
+
+
+def rendered_response(rendered: RenderedPage, request: Request, etag: Optional[str] = None) -> Response:
+    """
+    Builds a raw response from a pre-serialized page, bypassing response_model
+    validation and JSON encoding. The page is compressed with the codec the
+    client prefers once, then the cached copy is sent as is, so later hits
+    spend no CPU on compression.
+
+    :param rendered: The cached page body
+    :param request: Incoming request, used for Accept-Encoding negotiation
+    :param etag: Entity tag of the page, if it is to be validated
+    :return: Response carrying the page body and pagination header
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    if etag is not None:
+        headers.update(etag_headers(etag))
+    if rendered.next_cursor is not None:
+        headers["X-Next-Cursor"] = rendered.next_cursor
+    body = rendered.body
+    codec = rendered_codec(rendered, request)
+    if codec is not None:
+        body = page_encoding(rendered, codec)
+        headers["Content-Encoding"] = codec
+        if etag is not None:
+            headers["ETag"] = encoded_etag(etag, codec)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def summary_response(page: PostPage, fields: frozenset, etag: Optional[str] = None) -> Response:
+    """
+    Builds a raw response from a page of post summaries, keeping only the requested fields.
+
+    :param page: Page of PostSummary items
+    :param fields: Names of the fields to include in each item
+    :param etag: Entity tag of the page, if it is to be validated
+    :return: Response carrying the summaries and pagination header
+    """
+    headers = etag_headers(etag) if etag is not None else {}
+    if page.next_cursor is not None:
+        headers["X-Next-Cursor"] = page.next_cursor
+    body = summaries_adapter.dump_json(page.items, include={"__all__": set(fields)})
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.post("/add")
 def create_post(
         post_data: PostCreate,
@@ -51,23 +154,114 @@ def create_post(
     :param db: SQLAlchemy session
     :return: ID of the newly created post
     """
+    enforce_rate_limit(posts_add_limiter, current_user.id, "/posts/add")
     post_id = add_post(current_user, post_data, db)
     return {"post_id": post_id}
 
 
+@router.post("/add_batch")
+def create_posts(
+        batch: PostBatchCreate,
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db),
+):
+    """
+    Endpoint to create several posts with one multi-row insert.
+
+    :param batch: Posts to create (at most POSTS_BATCH_MAX_ITEMS)
+    :param current_user: User creating the posts (from JWT token)
+    :param db: SQLAlchemy session
+    :return: ID of each created post, by position in the request
+    """
+    return {"results": add_posts(current_user, batch, db)}
+
+
 @router.get("/get", response_model=list[PostOut])
 def read_posts(
+        request: Request,
+        response: Response,
+        limit: int = Query(settings.POSTS_PAGE_DEFAULT_LIMIT, ge=1, le=settings.POSTS_PAGE_MAX_LIMIT),
+        after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+        fields: Optional[str] = Query(
+            None, description="Comma-separated fields, e.g. id,created_at,preview; omit text to list summaries only"
+        ),
         current_user: User = Depends(get_current_user),
         db: Session = Depends(get_db),
 ):
     """
-    Endpoint to retrieve all posts belonging to the authenticated user.
+    Endpoint to retrieve one page of posts belonging to the authenticated user, newest first.
+    When more posts exist, the cursor of the next page is returned in the X-Next-Cursor header.
+    With `fields` not including text, summaries are listed without reading any post text.
+    With `Accept: application/x-ndjson`, all posts from the cursor on are streamed instead,
+    one JSON object per line, ignoring `limit`.
+    Pages carry an ETag; a request whose If-None-Match still matches is answered
+    with 304 Not Modified from the user's posts version alone, without reading any post.
 
+    :param request: Incoming request, used for Accept-Encoding and conditional request headers
+    :param response: Response object used to attach the pagination and validation headers
+    :param limit: Maximum number of posts to return
+    :param after: Opaque cursor of the page to continue from
+    :param fields: Fields to return for each post; all PostOut fields when omitted
     :param current_user: The current logged-in user
     :param db: SQLAlchemy session
-    :return: List of user's posts
+    :return: List of user's posts on the requested page
     """
-    return get_user_posts(current_user, db)
+    summary_fields = parse_fields(fields)
+    if NDJSON in request.headers.get("accept", ""):
+        statement = user_posts_stream_statement(current_user.id, after, summary_fields)
+        return StreamingResponse(stream_user_posts(statement, current_user.id, summary_fields), media_type=NDJSON)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = page_etag(current_user.id, get_posts_version(current_user, db), limit, after, summary_fields)
+        encoding = matching_encoding(if_none_match, etag)
+        if encoding is not None:
+            return not_modified_response(etag, encoding)
+
+    if summary_fields is not None:
+        page = get_user_post_summaries(current_user, db, limit, after)
+        etag = page_etag(current_user.id, page.version, limit, after, summary_fields)
+        return summary_response(page, summary_fields, etag)
+
+    if settings.POSTS_CACHE_MODE == "rendered":
+        rendered = get_user_posts_rendered(current_user, db, limit, after)
+        etag = page_etag(current_user.id, rendered.version, limit, after, None)
+        return rendered_response(rendered, request, etag)
+
+    page = get_user_posts(current_user, db, limit, after)
+    response.headers.update(etag_headers(page_etag(current_user.id, page.version, limit, after, None)))
+    if page.next_cursor is not None:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return page.items
+
+
+@router.get("/search", response_model=list[PostSearchResult])
+def find_posts(
+        response: Response,
+        q: str = Query(..., min_length=1, max_length=256, description="Words to look for in the posts"),
+        limit: int = Query(settings.POSTS_PAGE_DEFAULT_LIMIT, ge=1, le=settings.POSTS_PAGE_MAX_LIMIT),
+        after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db),
+):
+    """
+    Endpoint to search the authenticated user's posts, best match first.
+    Results carry the post summary and a relevance score; the full text of a
+    post is available from /posts/{post_id}. When more results exist, the
+    cursor of the next page is returned in the X-Next-Cursor header.
+
+    :param response: Response object used to attach the pagination header
+    :param q: Search query; posts containing any of its words match
+    :param limit: Maximum number of results to return
+    :param after: Opaque cursor of the page to continue from
+    :param current_user: The current logged-in user
+    :param db: SQLAlchemy session
+    :return: Matching posts on the requested page
+    """
+    page = search_posts(current_user, q, db, limit, after)
+    if page.next_cursor is not None:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return page.items
 
 
 @router.delete("/delete/{post_id}")
@@ -86,3 +280,39 @@ def remove_post(
     """
     delete_post(current_user, post_id, db)
     return {"detail": "Post deleted"}
+
+
+@router.post("/delete_batch")
+def remove_posts(
+        batch: PostBatchDelete,
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db),
+):
+    """
+    Endpoint to delete several posts of the current user with a single DELETE.
+    Posts that do not exist or belong to another user are reported as not deleted.
+
+    :param batch: IDs of the posts to delete (at most POSTS_BATCH_MAX_ITEMS)
+    :param current_user: The current logged-in user
+    :param db: SQLAlchemy session
+    :return: Whether each requested post was deleted
+    """
+    return {"results": delete_posts(current_user, batch, db)}
+
+
+# Registered last, so that the fixed paths above take precedence over the parameter
+@router.get("/{post_id}", response_model=PostOut)
+def read_post(
+        post_id: int,
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db),
+):
+    """
+    Endpoint to retrieve one post of the current user with its full text.
+
+    :param post_id: ID of the post
+    :param current_user: The current logged-in user
+    :param db: SQLAlchemy session
+    :return: The post
+    """
+    return get_post(current_user, post_id, db)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from core.database import SessionLocal
+from core.database import get_db
 from schemas.user_schema import UserCreate, UserLogin
 from services.user_service import register_user, login_user
 
@@ -8,20 +8,6 @@ from services.user_service import register_user, login_user
 router = APIRouter()
 
 
-def get_db():
-    """
-    Dependency function that provides a SQLAlchemy database session.
-    This ensures that the session is properly closed after the request is completed.
-
-    :return: Generator yielding a scoped database session
-    """
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.post("/signup")
 def signup(user_data: UserCreate, db: Session = Depends(get_db)):
     """
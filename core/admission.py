@@ -0,0 +1,291 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from threading import Lock
+from typing import Hashable, Optional
+from fastapi import HTTPException
+from core.config import settings
+from core.metrics import (
+    admission_admitted, admission_in_flight, admission_queue_wait, admission_queued, admission_rejected, rate_limited,
+)
+
+
+class Rejected(Exception):
+    """
+    A request was not admitted.
+
+    Attributes:
+        reason (str): "queue_full", "deadline" (the estimated wait exceeds the
+            queue timeout) or "timeout" (the request waited the full timeout).
+        retry_after (int): Seconds the client should wait before retrying.
+    """
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    Admits at most `limit` concurrent requests; up to `queue_limit` more wait
+    in FIFO order for at most `queue_timeout` seconds.
+
+    A request is rejected on arrival, rather than after waiting, when the queue
+    is full or when its estimated wait already exceeds the timeout. The wait is
+    estimated from the number of requests ahead of it and a moving average of
+    recent service times. Must be used from a single event loop.
+
+    Attributes:
+        name (str): Label of the limiter in metrics.
+        limit (int): Requests handled concurrently.
+        queue_limit (int): Requests allowed to wait for a slot.
+        queue_timeout (float): Longest time a request may wait, in seconds.
+        active (int): Requests currently admitted.
+        service_seconds (float): Moving average of the time requests hold a slot.
+    """
+
+    # Weight of the latest observation in the service-time moving average
+    SMOOTHING = 0.1
+
+    def __init__(self, name: str, limit: int, queue_limit: int, queue_timeout: float):
+        """
+        Initializes the limiter.
+
+        Args:
+            name (str): Label of the limiter in metrics.
+            limit (int): Requests handled concurrently.
+            queue_limit (int): Requests allowed to wait for a slot.
+            queue_timeout (float): Longest time a request may wait, in seconds.
+        """
+        self.name = name
+        self.limit = max(1, limit)
+        self.queue_limit = queue_limit
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiters: deque[asyncio.Future] = deque()
+        self.service_seconds = 0.0
+
+    def estimated_wait(self, position: int) -> float:
+        """
+        Estimates how long a request at `position` in the queue (0 = first) waits for a slot.
+        """
+        return (position + 1) * self.service_seconds / self.limit
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self.estimated_wait(len(self.waiters))))
+
+    async def acquire(self) -> float:
+        """
+        Waits for a slot.
+
+        Returns:
+            float: Time spent waiting, in seconds.
+
+        Raises:
+            Rejected: If the request is not admitted.
+        """
+        if self.active < self.limit and not self.waiters:
+            self._admit(0.0)
+            return 0.0
+
+        position = len(self.waiters)
+        if position >= self.queue_limit:
+            raise self._reject("queue_full")
+        if self.estimated_wait(position) > self.queue_timeout:
+            raise self._reject("deadline")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        admission_queued.inc(self.name)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the timeout fired; give it back
+                self._release_slot()
+            raise self._reject("timeout")
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            raise
+        finally:
+            admission_queued.dec(self.name)
+            if not waiter.done():
+                waiter.cancel()
+                self.waiters.remove(waiter)
+        waited = time.perf_counter() - started
+        # The slot itself was taken over from the releasing request in `_release_slot`
+        admission_admitted.inc(self.name)
+        admission_queue_wait.observe(waited, self.name)
+        return waited
+
+    def release(self, service_seconds: float):
+        """
+        Frees the slot of a finished request and hands it to the next waiter.
+
+        Args:
+            service_seconds (float): How long the request held its slot.
+        """
+        self.service_seconds += self.SMOOTHING * (service_seconds - self.service_seconds)
+        self._release_slot()
+
+    def _admit(self, waited: float):
+        self.active += 1
+        admission_in_flight.inc(self.name)
+        admission_admitted.inc(self.name)
+        admission_queue_wait.observe(waited, self.name)
+
+    def _release_slot(self):
+        # Pass the slot directly to the oldest live waiter, keeping `active` unchanged
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+        admission_in_flight.dec(self.name)
+
+    def _reject(self, reason: str) -> Rejected:
+        admission_rejected.inc(self.name, reason)
+        return Rejected(reason, self._retry_after())
+
+
+def parse_limits(spec: str) -> dict[str, int]:
+    """
+    Parses a comma-separated list of ``path_prefix=limit`` pairs.
+
+    Args:
+        spec (str): E.g. "/auth/signup=4,/auth/login=4,/posts=15".
+
+    Returns:
+        dict[str, int]: Concurrency limit by path prefix.
+
+    Raises:
+        ValueError: If an entry is not of the form prefix=limit.
+    """
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, separator, limit = entry.partition("=")
+        if not separator or not prefix.startswith("/"):
+            raise ValueError(f"Invalid admission limit {entry!r}; expected /path/prefix=limit")
+        limits[prefix.rstrip("/") or "/"] = int(limit)
+    return limits
+
+
+class AdmissionController:
+    """
+    Maps request paths to their concurrency limiter, by longest matching prefix.
+    Paths matching no prefix are not limited.
+    """
+
+    def __init__(self, limits: dict[str, int], queue_limit: int, queue_timeout: float):
+        """
+        Initializes one limiter per prefix.
+
+        Args:
+            limits (dict[str, int]): Concurrency limit by path prefix, see `parse_limits`.
+            queue_limit (int): Requests allowed to wait for a slot, per limiter.
+            queue_timeout (float): Longest time a request may wait, in seconds.
+        """
+        self.limiters = {
+            prefix: ConcurrencyLimiter(prefix, limit, queue_limit, queue_timeout)
+            for prefix, limit in sorted(limits.items(), key=lambda item: -len(item[0]))
+        }
+
+    def limiter_for(self, path: str) -> Optional[ConcurrencyLimiter]:
+        """
+        Returns the limiter of the longest prefix matching `path` on a segment boundary.
+        """
+        for prefix, limiter in self.limiters.items():
+            if path == prefix or path.startswith(prefix if prefix.endswith("/") else prefix + "/"):
+                return limiter
+        return None
+
+
+class TokenBucketLimiter:
+    """
+    Per-key token buckets: each key may perform `burst` operations at once
+    and `rate` operations per second on average. Buckets are kept per process
+    for the `max_keys` most recently seen keys; an evicted key starts again
+    with a full bucket. Thread-safe.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        burst (int): Capacity of a bucket.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 100000):
+        """
+        Initializes the limiter.
+
+        Args:
+            rate (float): Tokens added per second.
+            burst (int): Capacity of a bucket.
+            max_keys (int): Buckets kept before the least recently used are dropped.
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_keys = max_keys
+        self.buckets: OrderedDict = OrderedDict()
+        self.lock = Lock()
+
+    def acquire(self, key, cost: float = 1.0) -> float:
+        """
+        Takes `cost` tokens from the key's bucket, if available.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the seconds until they will be available.
+        """
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / self.rate
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return wait
+
+
+def enforce_rate_limit(limiter: Optional[TokenBucketLimiter], key: Hashable, route: str):
+    """
+    Takes one token for `key`, rejecting the request when its bucket is empty.
+
+    Args:
+        limiter (Optional[TokenBucketLimiter]): The route's limiter; None when the limit is disabled.
+        key (Hashable): Whose bucket to use, e.g. a user ID.
+        route (str): Route label for the rate_limited_total counter.
+
+    Raises:
+        HTTPException: If the bucket is empty (status code 429, with Retry-After).
+    """
+    if limiter is None:
+        return
+    wait = limiter.acquire(key)
+    if wait:
+        rate_limited.inc(route)
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests, slow down",
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
+
+
+# Per-user limit of /posts/add, applied by each worker process separately
+posts_add_limiter = (
+    TokenBucketLimiter(settings.POSTS_ADD_RATE, settings.POSTS_ADD_BURST) if settings.POSTS_ADD_RATE > 0 else None
+)
+
+# Concurrency limits of the route groups, used by core.middleware.AdmissionMiddleware
+admission = AdmissionController(
+    parse_limits(settings.ADMISSION_LIMITS),
+    queue_limit=settings.ADMISSION_QUEUE_LIMIT,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+)
@@ -1,36 +1,96 @@
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+import logging
+from typing import TYPE_CHECKING, Optional
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
+from core.cache import PrincipalCache
 from core.config import settings
-from core.database import SessionLocal
+from core.database import get_db, get_async_db
+from core.hashing import PasswordHasher, calibrate_bcrypt_rounds
 from models.user_model import User
 
+# Only the async routes use it; core.database imports the asyncio extension in async mode alone
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
 # Security configuration
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
-# Password hashing context using bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt hashing runs on a bounded process pool; the cost is final once
+# calibrate_password_hashing() has run
+password_hasher = PasswordHasher(
+    rounds=settings.BCRYPT_ROUNDS or 12,
+    pool_size=settings.HASH_POOL_SIZE,
+    queue_limit=settings.HASH_QUEUE_LIMIT,
+)
 
 # HTTPBearer is used for token-based authentication
 security = HTTPBearer()
 
+# Verified token payloads and authenticated users, so that authenticated
+# requests need no extra database round trip on a cache hit
+principal_cache = PrincipalCache(
+    max_entries=settings.PRINCIPAL_CACHE_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+# Whether the bcrypt cost has been fixed in this process (or in the serve.py master before the fork)
+_rounds_fixed = False
+
+
+def calibrate_password_hashing():
+    """
+    Fixes the bcrypt cost, once per process tree.
+
+    When BCRYPT_ROUNDS is not set, the cost is calibrated so that one hash takes
+    about BCRYPT_TARGET_MS on this machine. serve.py calls this in the master
+    before forking, so all workers share one measurement instead of each timing
+    bcrypt at startup (possibly under load) and picking a different cost.
+    """
+    global _rounds_fixed
+    if _rounds_fixed:
+        return
+    if not settings.BCRYPT_ROUNDS:
+        password_hasher.rounds = calibrate_bcrypt_rounds(
+            settings.BCRYPT_TARGET_MS, min_rounds=settings.BCRYPT_MIN_ROUNDS
+        )
+    _rounds_fixed = True
+
+
+def configure_password_hashing():
+    """
+    Fixes the bcrypt cost (see `calibrate_password_hashing`) and starts the
+    hashing process pool. Called once at application startup.
+    """
+    calibrate_password_hashing()
+    password_hasher.start()
+    logger.info(
+        "Password hashing: bcrypt rounds=%s, pool size=%s, queue limit=%s",
+        password_hasher.rounds, password_hasher.pool_size, password_hasher.queue_limit,
+    )
+
 
 def get_password_hash(password: str) -> str:
     """
-    Hashes a plain-text password using bcrypt.
+    Hashes a plain-text password using bcrypt on the hashing pool.
 
     Args:
         password (str): The plain password to hash.
 
+    Raises:
+        HTTPException: If the hashing pool is saturated (status code 503).
+
     Returns:
         str: A hashed password.
     """
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -41,10 +101,45 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         plain_password (str): The original password in plain text.
         hashed_password (str): The hashed password stored in the DB.
 
+    Raises:
+        HTTPException: If the hashing pool is saturated (status code 503).
+
     Returns:
         bool: True if match, False otherwise.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.verify_and_update(plain_password, hashed_password)[0]
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """
+    Verifies a password and, when the stored hash uses a lower bcrypt cost
+    than the configured one, returns a replacement hash.
+
+    Args:
+        plain_password (str): The original password in plain text.
+        hashed_password (str): The hashed password stored in the DB.
+
+    Raises:
+        HTTPException: If the hashing pool is saturated (status code 503).
+
+    Returns:
+        tuple[bool, Optional[str]]: Whether the password matches, and the new hash or None.
+    """
+    return password_hasher.verify_and_update(plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Awaitable variant of `get_password_hash` for the async routes.
+    """
+    return await password_hasher.hash_async(password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """
+    Awaitable variant of `verify_and_update_password` for the async routes.
+    """
+    return await password_hasher.verify_and_update_async(plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
@@ -62,6 +157,8 @@ def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
+    # python-jose is imported on first use; it is not needed to serve startup or anonymous requests
+    from jose import jwt
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
@@ -78,36 +175,152 @@ def decode_token(token: str) -> dict:
     Returns:
         dict: Decoded token payload.
     """
+    from jose import JWTError, jwt
     try:
         return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
+def get_token_user_id(token: str) -> int:
+    """
+    Returns the user id carried by a token, decoding and verifying it only
+    when its payload is not in the principal cache yet.
+
+    Args:
+        token (str): The JWT bearer token.
+
+    Raises:
+        HTTPException: If the token is invalid, expired or has no user id.
+
+    Returns:
+        int: The id of the user the token was issued to.
+    """
+    payload = principal_cache.get_payload(token)
+    if payload is None:
+        payload = decode_token(token)
+        principal_cache.set_payload(token, payload)
+
+    user_id = payload.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    return user_id
+
+
+def invalidate_principal(user_id: int):
+    """
+    Drops a user from the principal cache. Called automatically after a commit
+    that deletes a user or changes its password; can also be called directly.
+
+    Args:
+        user_id (int): The id of the user whose cached principal is stale.
+    """
+    principal_cache.invalidate(user_id)
+
+
+@event.listens_for(User, "after_update")
+def _track_password_change(mapper, connection, target: User):
+    """
+    Remembers users whose password changed in this flush, to be evicted from
+    the principal cache once the transaction commits.
+    """
+    if inspect(target).attrs.hashed_password.history.has_changes():
+        inspect(target).session.info.setdefault("stale_principals", set()).add(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _track_user_deletion(mapper, connection, target: User):
+    """
+    Remembers users deleted in this flush, to be evicted from the principal
+    cache once the transaction commits.
+    """
+    inspect(target).session.info.setdefault("stale_principals", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_stale_principals(session: Session):
+    """
+    Evicts principals changed by the committed transaction.
+    """
+    for user_id in session.info.pop("stale_principals", ()):
+        invalidate_principal(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_stale_principals(session: Session):
+    """
+    Discards pending evictions of a transaction that was rolled back.
+    """
+    session.info.pop("stale_principals", None)
+
+
 def get_current_user(
         credentials: HTTPAuthorizationCredentials = Depends(security),
-        db: Session = Depends(lambda: SessionLocal())
+        db: Session = Depends(get_db)
 ) -> User:
     """
     Dependency function that retrieves the current authenticated user.
 
+    The user is served from the principal cache when possible, so a cache hit
+    costs no database query. On a miss it is loaded through the request's own
+    session (shared with the route via `get_db`) and detached before caching,
+    so commits made by the route do not expire it.
+
     Args:
         credentials (HTTPAuthorizationCredentials): Extracted token from Authorization header.
-        db (Session): SQLAlchemy session dependency.
+        db (Session): SQLAlchemy session dependency, shared with the route.
 
     Raises:
         HTTPException: If token is invalid or user is not found.
 
     Returns:
-        User: The authenticated user object from the database.
+        User: The authenticated user object, detached from any session.
     """
-    payload = decode_token(credentials.credentials)
-    user_id = payload.get("user_id")
-    if not user_id:
-        raise HTTPException(status_code=401, detail="Invalid token payload")
+    user_id = get_token_user_id(credentials.credentials)
+    db.info["user_id"] = user_id  # Lets the session keep this user's reads on the primary after a write
+
+    user = principal_cache.get_user(user_id)
+    if user is not None:
+        return user
+
+    user = db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    db.expunge(user)
+    principal_cache.set_user(user_id, user)
+    return user
+
+
+async def get_current_user_async(
+        credentials: HTTPAuthorizationCredentials = Depends(security),
+        db: "AsyncSession" = Depends(get_async_db)
+) -> User:
+    """
+    Async counterpart of `get_current_user`, used by the async routes.
+    Shares the principal cache with the sync dependency.
+
+    Args:
+        credentials (HTTPAuthorizationCredentials): Extracted token from Authorization header.
+        db (AsyncSession): Async SQLAlchemy session dependency, shared with the route.
+
+    Raises:
+        HTTPException: If token is invalid or user is not found.
+
+    Returns:
+        User: The authenticated user object, detached from any session.
+    """
+    user_id = get_token_user_id(credentials.credentials)
+    db.info["user_id"] = user_id
+
+    user = principal_cache.get_user(user_id)
+    if user is not None:
+        return user
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
+    db.expunge(user)
+    principal_cache.set_user(user_id, user)
     return user
@@ -1,39 +1,678 @@
+import asyncio
+import hashlib
+import logging
+import os
+import pickle
+import random
+import subprocess
+import sys
 import time
-from threading import Lock
-from typing import Any, Optional
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from threading import Event, Lock, Thread
+from typing import Any, Awaitable, Callable, Hashable, Optional
 
+from core.config import settings
+from core.resp import RespClient, RespError
 
-class SimpleCache:
+logger = logging.getLogger(__name__)
+
+
+def approximate_size(value: Any, _seen: Optional[set] = None) -> int:
+    """
+    Estimates the memory held by a cached value, in bytes.
+
+    Containers are walked recursively and ORM instances are measured through
+    their loaded attributes (SQLAlchemy's own instance state is skipped), so a
+    cached page of posts is accounted roughly by the size of its texts.
+    Shared objects are counted once.
+
+    Args:
+        value (Any): The value to measure.
+
+    Returns:
+        int: Approximate size in bytes.
+    """
+    seen = _seen if _seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, bytearray, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        return size + sum(approximate_size(k, seen) + approximate_size(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(approximate_size(item, seen) for item in value)
+    attributes = getattr(value, "__dict__", None)
+    if attributes:
+        return size + sum(
+            approximate_size(item, seen) for name, item in attributes.items() if not name.startswith("_sa_")
+        )
+    return size
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters of a cache since it was created, plus its current occupancy.
+
+    Attributes:
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that found nothing or an expired entry.
+        sets (int): Values stored.
+        evictions (int): Entries dropped to respect the size limits.
+        expirations (int): Entries dropped because their TTL elapsed.
+        invalidations (int): Entries dropped by `invalidate`.
+        rejections (int): Values not stored because they alone exceed a shard's byte budget.
+        stale_hits (int): Expired values served while they were refreshed in the background.
+        coalesced (int): Misses that waited for a load already in flight instead of loading again.
+        refreshes (int): Background refreshes of stale values completed.
+        entries (int): Entries currently cached.
+        bytes (int): Approximate bytes currently cached.
+    """
+    hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    rejections: int = 0
+    stale_hits: int = 0
+    coalesced: int = 0
+    refreshes: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+    def __add__(self, other: "CacheStats") -> "CacheStats":
+        return CacheStats(*(getattr(self, f.name) + getattr(other, f.name) for f in fields(self)))
+
+
+class _Call:
+    """
+    Outcome of one call shared through a `SingleFlight`.
+    """
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time across threads. Callers arriving
+    while a call for their key is running wait for it and share its result,
+    or its exception, instead of running the call again.
+
+    Attributes:
+        shared (int): Callers that received the outcome of another caller's call.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.calls: dict[Hashable, _Call] = {}
+        self.shared = 0
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        """
+        Calls `function`, unless a call for `key` is already running, and returns its result.
+
+        Raises:
+            Exception: Whatever the shared call raised.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+            else:
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight:
     """
-    A thread-safe in-memory cache with a time-to-live (TTL) expiration mechanism.
+    Event loop counterpart of `SingleFlight`. The first caller awaits the call
+    itself; if it is cancelled midway, a waiting caller takes over and calls again.
 
     Attributes:
-        ttl (int): Time-to-live in seconds for each cached entry.
-        store (dict): Internal dictionary to hold cached items and their timestamps.
-        lock (Lock): Thread lock to ensure safe concurrent access.
+        shared (int): Callers that received the outcome of another caller's call.
     """
 
-    def __init__(self, ttl_seconds: int = 300):
+    def __init__(self):
+        self.calls: dict[Hashable, asyncio.Future] = {}
+        self.shared = 0
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Awaits `function()`, unless a call for `key` is already running, and returns its result.
+
+        Raises:
+            Exception: Whatever the shared call raised.
+        """
+        while (future := self.calls.get(key)) is not None:
+            self.shared += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise  # This caller was cancelled, not the shared call
+
+        future = asyncio.get_running_loop().create_future()
+        self.calls[key] = future
+        try:
+            result = await function()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # Mark it retrieved, in case nobody was waiting
+            raise
+        finally:
+            del self.calls[key]
+        future.set_result(result)
+        return result
+
+
+_refresh_executor: Optional[ThreadPoolExecutor] = None
+_refresh_executor_pid: Optional[int] = None
+
+
+def refresh_executor() -> ThreadPoolExecutor:
+    """
+    Returns the thread pool running background refreshes of stale cache
+    entries, created on first use in each process (a forked child gets its own).
+    """
+    global _refresh_executor, _refresh_executor_pid
+    if _refresh_executor_pid != os.getpid():
+        _refresh_executor_pid = os.getpid()
+        _refresh_executor = ThreadPoolExecutor(settings.CACHE_REFRESH_WORKERS, thread_name_prefix="cache-refresh")
+    return _refresh_executor
+
+
+class CacheBackend(ABC):
+    """
+    Interface shared by every cache backend.
+
+    Keys that are tuples are grouped by their first element, and invalidating
+    a group key drops every entry of the group, on every worker sharing the backend.
+
+    On top of the backend primitives, `get_or_load` and `get_or_load_async`
+    protect the database from cache stampedes: concurrent misses of one key
+    share a single load, and recently expired values can be served while they
+    are refreshed in the background.
+
+    Attributes:
+        ttl (float): Default time-to-live in seconds of an entry.
+        ttl_jitter (float): Fraction by which each entry's TTL is randomly shortened,
+            so entries stored together do not all expire together.
+        stale_seconds (float): How long after expiry a value may still be served by
+            `get_or_load` while it is refreshed; 0 disables stale-while-revalidate.
+    """
+
+    ttl: float
+    ttl_jitter: float = 0.0
+    stale_seconds: float = 0.0
+
+    def __init__(self):
+        self.flights = SingleFlight()
+        self.async_flights = AsyncSingleFlight()
+        self.refreshing: set = set()
+        self.refreshes = 0
+        self.refresh_lock = Lock()
+        self.refresh_tasks: set = set()
+
+    @abstractmethod
+    def get(self, key: Any) -> Optional[Any]:
+        """
+        Returns the cached value for a key, or None.
+        """
+
+    @abstractmethod
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None):
+        """
+        Stores a value, optionally with a TTL overriding the backend default.
+        """
+
+    @abstractmethod
+    def invalidate(self, key: Any):
+        """
+        Removes a key and every entry grouped under it.
+        """
+
+    @abstractmethod
+    def clear(self):
+        """
+        Removes every entry visible to this process.
+        """
+
+    @abstractmethod
+    def stats(self) -> CacheStats:
         """
-        Initializes the cache with a given TTL for items.
+        Returns the backend's counters.
+        """
+
+    def close(self):
+        """
+        Releases background threads and connections.
+        """
+
+    def lookup(self, key: Any) -> Optional[tuple[Any, bool]]:
+        """
+        Returns the cached value of a key and whether it is still fresh; a value
+        that is not fresh expired less than `stale_seconds` ago. Backends that do
+        not keep expired values only return fresh ones.
+        """
+        value = self.get(key)
+        return None if value is None else (value, True)
+
+    def generation(self, key: Any) -> Hashable:
+        """
+        Returns a token that changes whenever the key's group is invalidated.
+        Backends that do not track invalidations return None.
+        """
+        return None
+
+    def set_if_current(self, key: Any, value: Any, generation: Hashable, ttl: Optional[float] = None) -> bool:
+        """
+        Stores a value unless the key's group was invalidated since `generation`
+        was read, i.e. unless the value may predate a write.
+
+        Returns:
+            bool: True if the value was stored.
+        """
+        if self.generation(key) != generation:
+            return False
+        self.set(key, value, ttl)
+        return True
+
+    def patch(self, group: Any, key: Any, update: Callable[[Any], Optional[Any]]):
+        """
+        Invalidates a group, except that the cached value of `key` (a member of
+        the group) is replaced by `update(value)` instead of being dropped.
+
+        Backends that cannot apply the update atomically invalidate the whole
+        group, which is always correct, only slower.
 
         Args:
-            ttl_seconds (int): Time-to-live in seconds for each item (default is 300).
+            group (Any): The group key, e.g. a user ID.
+            key (Any): The member to update in place.
+            update (Callable[[Any], Optional[Any]]): Returns the new value, or
+                None to drop the entry. Must be quick and must not use the cache.
         """
-        self.ttl = ttl_seconds
-        self.store = {}
+        self.invalidate(group)
+
+    def jittered(self, ttl: float) -> float:
+        """
+        Shortens a TTL by a random fraction of up to `ttl_jitter`, never lengthening it.
+        """
+        return ttl * (1 - random.random() * self.ttl_jitter) if self.ttl_jitter else ttl
+
+    def get_or_load(
+            self,
+            key: Any,
+            load: Callable[[], Any],
+            refresh: Optional[Callable[[], Any]] = None,
+            ttl: Optional[float] = None,
+    ) -> Any:
+        """
+        Returns the cached value of a key, loading and caching it on a miss.
+
+        Concurrent misses of a key share one call of `load`. The value is
+        cached only if the key's group was not invalidated during the load, and
+        callers arriving after an invalidation start a new load rather than
+        joining one that may have read the data before the write.
+
+        With `refresh`, a value that expired less than `stale_seconds` ago is
+        returned immediately while `refresh` reloads it on a background thread.
+        Invalidated values are dropped, never served stale.
+
+        Args:
+            key (Any): The cache key.
+            load (Callable[[], Any]): Loads the value in the calling thread.
+            refresh (Optional[Callable[[], Any]]): Loads the value on a background thread;
+                it must not use request-scoped resources such as the request's session.
+            ttl (Optional[float]): Time-to-live in seconds overriding the cache default.
+
+        Returns:
+            Any: The cached or loaded value.
+        """
+        found = self.lookup(key)
+        if found is not None:
+            value, fresh = found
+            if fresh:
+                return value
+            if refresh is not None:
+                self._refresh(key, refresh, ttl)
+                return value
+        generation = self.generation(key)
+        return self.flights.do((key, generation), lambda: self._load(key, load, generation, ttl))
+
+    async def get_or_load_async(
+            self,
+            key: Any,
+            load: Callable[[], Awaitable[Any]],
+            refresh: Optional[Callable[[], Awaitable[Any]]] = None,
+            ttl: Optional[float] = None,
+    ) -> Any:
+        """
+        Event loop counterpart of `get_or_load`: `load` and `refresh` are
+        coroutine functions, and the refresh runs as a background task.
+        """
+        found = self.lookup(key)
+        if found is not None:
+            value, fresh = found
+            if fresh:
+                return value
+            if refresh is not None:
+                self._refresh_async(key, refresh, ttl)
+                return value
+        generation = self.generation(key)
+        return await self.async_flights.do((key, generation), lambda: self._load_async(key, load, generation, ttl))
+
+    def _load(self, key: Any, load: Callable[[], Any], generation: Hashable, ttl: Optional[float]) -> Any:
+        value = load()
+        if value is not None:
+            self.set_if_current(key, value, generation, ttl)
+        return value
+
+    async def _load_async(self, key: Any, load: Callable[[], Awaitable[Any]], generation: Hashable, ttl) -> Any:
+        value = await load()
+        if value is not None:
+            self.set_if_current(key, value, generation, ttl)
+        return value
+
+    def _claim_refresh(self, key: Any) -> bool:
+        # One background refresh per key at a time, however many requests see it stale
+        with self.refresh_lock:
+            if key in self.refreshing:
+                return False
+            self.refreshing.add(key)
+            return True
+
+    def _refresh_done(self, key: Any, error: Optional[BaseException]):
+        with self.refresh_lock:
+            self.refreshing.discard(key)
+            if error is None:
+                self.refreshes += 1
+        if error is not None:
+            logger.warning("Background refresh of cache key %r failed: %s", key, error)
+
+    def _refresh(self, key: Any, refresh: Callable[[], Any], ttl: Optional[float]):
+        if not self._claim_refresh(key):
+            return
+        generation = self.generation(key)
+
+        def run():
+            try:
+                self.flights.do((key, generation), lambda: self._load(key, refresh, generation, ttl))
+            except Exception as exc:
+                self._refresh_done(key, exc)
+            else:
+                self._refresh_done(key, None)
+
+        refresh_executor().submit(run)
+
+    def _refresh_async(self, key: Any, refresh: Callable[[], Awaitable[Any]], ttl: Optional[float]):
+        if not self._claim_refresh(key):
+            return
+        generation = self.generation(key)
+
+        async def run():
+            try:
+                await self.async_flights.do((key, generation), lambda: self._load_async(key, refresh, generation, ttl))
+            except Exception as exc:
+                self._refresh_done(key, exc)
+            else:
+                self._refresh_done(key, None)
+
+        # Tasks are only weakly referenced by the loop; keep them until they finish
+        task = asyncio.get_running_loop().create_task(run())
+        self.refresh_tasks.add(task)
+        task.add_done_callback(self.refresh_tasks.discard)
+
+    def loading_stats(self) -> CacheStats:
+        """
+        Returns the counters of `get_or_load`: coalesced misses and completed refreshes.
+        """
+        with self.refresh_lock:
+            refreshes = self.refreshes
+        return CacheStats(coalesced=self.flights.shared + self.async_flights.shared, refreshes=refreshes)
+
+
+class _Shard:
+    """
+    One independently locked LRU segment of a `SimpleCache`.
+    Entries are (value, expires_at, size) tuples kept in recency order.
+
+    `generations` counts invalidations per group. It is cleared when it grows
+    past `max_entries` groups, and `epoch` is advanced instead, so every
+    generation read before the reset is outdated.
+    """
+
+    __slots__ = ("lock", "entries", "groups", "stats", "max_entries", "max_bytes", "generations", "epoch")
+
+    def __init__(self, max_entries: int, max_bytes: int):
         self.lock = Lock()
+        self.entries = OrderedDict()
+        self.groups = {}
+        self.stats = CacheStats()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.generations = {}
+        self.epoch = 0
+
+    def advance(self, group: Any):
+        """
+        Records an invalidation of a group. Must be called with the lock held.
+        """
+        self.generations[group] = self.generations.get(group, 0) + 1
+        if len(self.generations) > self.max_entries:
+            self.generations.clear()
+            self.epoch += 1
+
+    def discard(self, key: Any, group: Any) -> bool:
+        """
+        Removes one entry and its group membership. Must be called with the lock held.
+        """
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        self.stats.entries -= 1
+        self.stats.bytes -= entry[2]
+        members = self.groups.get(group)
+        if members is not None:
+            members.discard(key)
+            if not members:
+                del self.groups[group]
+        return True
+
+
+class SimpleCache(CacheBackend):
+    """
+    A thread-safe, bounded in-memory cache with a time-to-live (TTL) expiration mechanism.
+
+    Entries are spread over independently locked shards, each evicting least
+    recently used entries once it exceeds its share of `max_entries` or of
+    `max_bytes` (sizes are estimated with `approximate_size`). A background
+    thread removes expired entries, so memory is reclaimed even for keys that
+    are never read again.
+
+    Keys that are tuples are grouped by their first element, so several entries
+    (for example every cached page of one user's posts) can be dropped with a
+    single ``invalidate`` call on the group key. A group always lives in one shard.
+
+    Expired entries are kept for another `stale_seconds`, during which `get`
+    treats them as misses but `get_or_load` may serve them while refreshing.
+
+    Attributes:
+        ttl (int): Default time-to-live in seconds for each cached entry.
+        ttl_jitter (float): Fraction by which each entry's TTL is randomly shortened.
+        stale_seconds (float): How long expired entries stay available to `get_or_load`.
+        max_entries (int): Maximum number of entries across all shards.
+        max_bytes (int): Maximum approximate bytes across all shards; 0 disables the byte limit.
+        sweep_interval (float): Seconds between background expiry sweeps; 0 disables the sweeper.
+    """
+
+    def __init__(
+            self,
+            ttl_seconds: int = 300,
+            max_entries: int = 10000,
+            max_bytes: int = 0,
+            shards: int = 16,
+            sweep_interval: float = 30.0,
+            ttl_jitter: float = 0.0,
+            stale_seconds: float = 0.0,
+    ):
+        """
+        Initializes the cache with a given TTL and size limits.
+
+        Args:
+            ttl_seconds (int): Default time-to-live in seconds for each item (default is 300).
+            max_entries (int): Maximum number of entries across all shards.
+            max_bytes (int): Maximum approximate bytes across all shards; 0 disables the byte limit.
+            shards (int): Number of independently locked shards.
+            sweep_interval (float): Seconds between background expiry sweeps; 0 disables the sweeper.
+            ttl_jitter (float): Fraction by which each entry's TTL is randomly shortened.
+            stale_seconds (float): How long expired entries stay available to `get_or_load`.
+        """
+        super().__init__()
+        self.ttl = ttl_seconds
+        self.ttl_jitter = ttl_jitter
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        count = max(1, shards)
+        self.shards = [
+            _Shard(max(1, -(-max_entries // count)), -(-max_bytes // count) if max_bytes else 0)
+            for _ in range(count)
+        ]
+        self._sweeper: Optional[Thread] = None
+        self._sweeper_pid: Optional[int] = None
+        self._stopped = Event()
 
-    def set(self, key: Any, value: Any):
+    @staticmethod
+    def _group_of(key: Any) -> Any:
+        """
+        Returns the group a key belongs to: the first element of a tuple key,
+        or the key itself otherwise.
+        """
+        return key[0] if isinstance(key, tuple) and key else key
+
+    def _shard_for(self, group: Any) -> _Shard:
+        return self.shards[hash(group) % len(self.shards)]
+
+    def _ensure_sweeper(self):
+        """
+        Starts the background sweeper on first use, and again in a forked child,
+        where the parent's thread does not exist.
+        """
+        if not self.sweep_interval or self._sweeper_pid == os.getpid():
+            return
+        self._sweeper_pid = os.getpid()
+        self._sweeper = Thread(target=self._sweep_loop, name="cache-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def _sweep_loop(self):
+        while not self._stopped.wait(self.sweep_interval):
+            self.sweep()
+
+    def sweep(self) -> int:
+        """
+        Removes every expired entry. Runs periodically on the sweeper thread.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        removed = 0
+        for shard in self.shards:
+            now = time.time()
+            with shard.lock:
+                expired = [key for key, entry in shard.entries.items() if entry[1] + self.stale_seconds <= now]
+                for key in expired:
+                    shard.discard(key, self._group_of(key))
+                shard.stats.expirations += len(expired)
+            removed += len(expired)
+        return removed
+
+    def close(self):
+        """
+        Stops the background sweeper.
+        """
+        self._stopped.set()
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None):
         """
         Stores a value in the cache under the given key.
 
         Args:
             key (Any): The key under which the value is stored.
             value (Any): The value to be cached.
+            ttl (Optional[float]): Time-to-live in seconds overriding the cache default.
         """
-        with self.lock:
-            self.store[key] = (value, time.time())
+        self._store(key, value, ttl, None)
+
+    def set_if_current(self, key: Any, value: Any, generation: Hashable, ttl: Optional[float] = None) -> bool:
+        """
+        Stores a value unless the key's group was invalidated since `generation`
+        was read; the check and the store happen atomically.
+
+        Returns:
+            bool: True if the value was stored.
+        """
+        return self._store(key, value, ttl, generation)
+
+    def _store(self, key: Any, value: Any, ttl: Optional[float], generation: Optional[Hashable]) -> bool:
+        self._ensure_sweeper()
+        group = self._group_of(key)
+        shard = self._shard_for(group)
+        size = approximate_size(value)
+        expires_at = time.time() + self.jittered(self.ttl if ttl is None else ttl)
+        with shard.lock:
+            if generation is not None and (shard.epoch, shard.generations.get(group, 0)) != generation:
+                return False
+            shard.discard(key, group)
+            return self._insert(shard, key, group, value, expires_at, size)
+
+    def _insert(self, shard: _Shard, key: Any, group: Any, value: Any, expires_at: float, size: int) -> bool:
+        # Must be called with the shard lock held and `key` absent from the shard
+        if shard.max_bytes and size > shard.max_bytes:
+            shard.stats.rejections += 1
+            return False
+        shard.entries[key] = (value, expires_at, size)
+        shard.groups.setdefault(group, set()).add(key)
+        shard.stats.sets += 1
+        shard.stats.entries += 1
+        shard.stats.bytes += size
+        # Evict least recently used entries until the shard fits its budget again
+        while shard.stats.entries > shard.max_entries or (shard.max_bytes and shard.stats.bytes > shard.max_bytes):
+            oldest = next(iter(shard.entries))
+            shard.discard(oldest, self._group_of(oldest))
+            shard.stats.evictions += 1
+        return True
 
     def get(self, key: Any) -> Optional[Any]:
         """
@@ -45,31 +684,492 @@ class SimpleCache:
         Returns:
             Optional[Any]: The cached value if present and not expired, otherwise None.
         """
-        with self.lock:
-            item = self.store.get(key)
-            if not item:
+        found = self._lookup(key, allow_stale=False)
+        return found[0] if found is not None else None
+
+    def lookup(self, key: Any) -> Optional[tuple[Any, bool]]:
+        """
+        Returns a cached value and whether it is fresh, including values that
+        expired less than `stale_seconds` ago.
+        """
+        return self._lookup(key, allow_stale=True)
+
+    def _lookup(self, key: Any, allow_stale: bool) -> Optional[tuple[Any, bool]]:
+        group = self._group_of(key)
+        shard = self._shard_for(group)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is None:
+                shard.stats.misses += 1
                 return None
 
-            value, timestamp = item
             # Check if the item is still valid based on TTL
-            if time.time() - timestamp < self.ttl:
-                return value
-            else:
-                # Expired item is removed from cache
-                del self.store[key]
-                return None
+            now = time.time()
+            if now < entry[1]:
+                shard.entries.move_to_end(key)
+                shard.stats.hits += 1
+                return entry[0], True
+
+            # Within the stale window the entry is kept for stale-while-revalidate
+            if now < entry[1] + self.stale_seconds:
+                if not allow_stale:
+                    shard.stats.misses += 1
+                    return None
+                shard.entries.move_to_end(key)
+                shard.stats.stale_hits += 1
+                return entry[0], False
+
+            # Expired item is removed from cache
+            shard.discard(key, group)
+            shard.stats.expirations += 1
+            shard.stats.misses += 1
+            return None
+
+    def generation(self, key: Any) -> Hashable:
+        """
+        Returns the invalidation count of the key's group, with its shard's epoch.
+        """
+        group = self._group_of(key)
+        shard = self._shard_for(group)
+        with shard.lock:
+            return shard.epoch, shard.generations.get(group, 0)
 
     def invalidate(self, key: Any):
         """
-        Removes a key-value pair from the cache if it exists.
+        Removes a key-value pair from the cache if it exists, together with
+        every entry grouped under it (e.g. all cached pages of a user).
 
         Args:
-            key (Any): The key to remove from the cache.
+            key (Any): The key (or group key) to remove from the cache.
+        """
+        group = self._group_of(key)
+        shard = self._shard_for(group)
+        with shard.lock:
+            removed = shard.discard(key, group)
+            for member in list(shard.groups.get(key, ())):
+                removed += shard.discard(member, key)
+            shard.stats.invalidations += removed
+            # Loads that started before now must not store what they read
+            shard.advance(group)
+
+    def patch(self, group: Any, key: Any, update: Callable[[Any], Optional[Any]]):
+        """
+        Invalidates a group, except that the fresh cached value of `key` is
+        replaced by `update(value)` (or dropped if it returns None). Both happen
+        under the shard lock, so concurrent patches of one group apply one after
+        the other, each to the result of the previous one, and loads that started
+        before the patch do not overwrite it. The entry keeps its expiry time.
+
+        Args:
+            group (Any): The group key, e.g. a user ID.
+            key (Any): The member to update in place; must belong to `group`.
+            update (Callable[[Any], Optional[Any]]): Returns the new value, or
+                None to drop the entry. Must be quick and must not use the cache.
+        """
+        shard = self._shard_for(group)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            removed = shard.discard(group, group)
+            for member in list(shard.groups.get(group, ())):
+                removed += shard.discard(member, group)
+            shard.advance(group)
+            updated = None
+            if entry is not None and time.time() < entry[1]:
+                updated = update(entry[0])
+            if updated is None:
+                shard.stats.invalidations += removed
+                return
+            shard.stats.invalidations += removed - 1
+            self._insert(shard, key, group, updated, entry[1], approximate_size(updated))
+
+    def clear(self):
+        """
+        Removes every entry. Counters other than occupancy are kept.
+        """
+        for shard in self.shards:
+            with shard.lock:
+                shard.entries.clear()
+                shard.groups.clear()
+                shard.stats.entries = 0
+                shard.stats.bytes = 0
+                shard.generations.clear()
+                shard.epoch += 1
+
+    def stats(self) -> CacheStats:
+        """
+        Returns the counters and occupancy summed over all shards.
+        """
+        total = self.loading_stats()
+        for shard in self.shards:
+            with shard.lock:
+                total = total + shard.stats
+        return total
+
+
+class RemoteCache(CacheBackend):
+    """
+    A cache shared by several worker processes through a Redis-protocol server.
+
+    Values are pickled into the shared store, and every worker keeps a small
+    in-process near cache in front of it so hot pages are not deserialized on
+    each request. Invalidations are published on a channel; a subscriber thread
+    in every worker drops the same group from its near cache as soon as the
+    message arrives. If the subscription is lost, the near cache is cleared
+    because messages may have been missed.
+
+    Each group has a version in the shared store: a random token replaced by
+    every invalidation. Values are stored with the version read before they
+    were loaded, and a read only accepts a value whose version is still current
+    (both are fetched in one MGET). A value loaded before another worker's
+    write can therefore still be stored, but it is never served. A group whose
+    version was evicted gets a new one, so eviction also invalidates it.
+
+    The server must be trusted: values are unpickled as they are read.
+
+    Loads through `get_or_load` are coalesced per worker. Expired values are
+    not kept, so there is no stale-while-revalidate.
+
+    Attributes:
+        ttl (float): Default time-to-live in seconds of shared entries.
+        near (SimpleCache): Per-process near cache.
+        client (RespClient): Connection pool to the shared server.
+    """
+
+    def __init__(
+            self,
+            url: str,
+            ttl_seconds: float,
+            near: SimpleCache,
+            namespace: str = "mvc",
+            server_command: Optional[list] = None,
+            ttl_jitter: float = 0.0,
+    ):
+        """
+        Initializes the backend; connections are opened lazily.
+
+        Args:
+            url (str): Server URL, e.g. ``redis://localhost:6379/0`` or ``unix:///tmp/mvc-cache.sock``.
+            ttl_seconds (float): Default time-to-live in seconds of shared entries.
+            near (SimpleCache): Per-process near cache; its TTL bounds the staleness of a missed broadcast.
+            namespace (str): Prefix of every key and channel, so several apps can share a server.
+            server_command (Optional[list]): Command starting the server when it is not reachable.
+            ttl_jitter (float): Fraction by which each shared entry's TTL is randomly shortened.
+        """
+        super().__init__()
+        self.ttl = ttl_seconds
+        self.ttl_jitter = ttl_jitter
+        self.near = near
+        self.client = RespClient(url)
+        self.namespace = namespace
+        self.channel = f"{namespace}:invalidate"
+        self.server_command = server_command
+        self.counters = CacheStats()
+        self.lock = Lock()
+        self._subscriber_pid: Optional[int] = None
+        self._stopped = Event()
+
+    def _key(self, key: Any) -> str:
+        return f"{self.namespace}:k:{key!r}"
+
+    def _version_key(self, group: Any) -> str:
+        return f"{self.namespace}:v:{group!r}"
+
+    def _count(self, **increments):
+        with self.lock:
+            for name, value in increments.items():
+                setattr(self.counters, name, getattr(self.counters, name) + value)
+
+    def _execute(self, *commands: tuple) -> list:
+        """
+        Runs commands on the server, starting it first if this backend owns it.
+        """
+        try:
+            replies = self.client.execute(*commands)
+        except (FileNotFoundError, ConnectionRefusedError):
+            if not self.server_command:
+                raise
+            self._start_server()
+            replies = self.client.execute(*commands)
+        self._ensure_subscriber()
+        return replies
+
+    def _start_server(self):
+        """
+        Launches the local cache server and waits until it accepts connections.
+        Concurrent launches by several workers are harmless: the server holds a
+        lock per socket path and redundant instances exit immediately.
+        """
+        subprocess.Popen(
+            self.server_command,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            start_new_session=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 5.0
+        while True:
+            try:
+                self.client.connect(timeout=1.0).close()
+                return
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def _ensure_subscriber(self):
+        """
+        Starts the invalidation subscriber on first use, and again in a forked child.
+        """
+        if self._subscriber_pid == os.getpid():
+            return
+        self._subscriber_pid = os.getpid()
+        Thread(target=self._subscribe_loop, name="cache-invalidation", daemon=True).start()
+
+    def _subscribe_loop(self):
+        backoff = 0.1
+        while not self._stopped.is_set():
+            try:
+                connection = self.client.connect(timeout=None)
+                try:
+                    connection.send(("SUBSCRIBE", self.channel))
+                    connection.read_reply()  # Subscription confirmation
+                    backoff = 0.1
+                    while not self._stopped.is_set():
+                        kind, _, payload = connection.read_reply()
+                        if kind == b"message":
+                            self.near.invalidate(pickle.loads(payload))
+                finally:
+                    connection.close()
+            except Exception as exc:
+                if self._stopped.is_set():
+                    return
+                # Broadcasts may have been missed while disconnected
+                self.near.clear()
+                logger.warning("Cache invalidation subscriber disconnected: %s", exc)
+                self._stopped.wait(backoff)
+                backoff = min(backoff * 2, 5.0)
+
+    def get(self, key: Any) -> Optional[Any]:
+        """
+        Returns a value from the near cache, or from the shared server on a near miss.
+        Server errors are logged and treated as misses.
+        """
+        value = self.near.get(key)
+        if value is not None:
+            self._count(hits=1)
+            return value
+        near_generation = self.near.generation(key)
+        try:
+            version, payload = self._execute(
+                ("MGET", self._version_key(SimpleCache._group_of(key)), self._key(key)),
+            )[0]
+        except (OSError, RespError) as exc:
+            logger.warning("Shared cache read failed: %s", exc)
+            version = payload = None
+        if version is None or payload is None:
+            self._count(misses=1)
+            return None
+        stored_version, value = pickle.loads(payload)
+        if stored_version != version:
+            # Stored before the group's latest invalidation
+            self._count(misses=1)
+            return None
+        self.near.set_if_current(key, value, near_generation, ttl=min(self.near.ttl, self.ttl))
+        self._count(hits=1)
+        return value
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None):
+        """
+        Stores a value in the near cache and in the shared server, as a value of
+        the group's current version.
         """
+        self.set_if_current(key, value, self.generation(key), ttl)
+
+    def generation(self, key: Any) -> Hashable:
+        """
+        Returns the near cache's invalidation count of the key's group and the
+        group's version in the shared server, creating the version if it has none.
+        The version is None when the server cannot be reached.
+        """
+        version_key = self._version_key(SimpleCache._group_of(key))
+        try:
+            version = self._execute(("SET", version_key, os.urandom(8), "NX"), ("GET", version_key))[1]
+        except (OSError, RespError) as exc:
+            logger.warning("Shared cache read failed: %s", exc)
+            version = None
+        return self.near.generation(key), version
+
+    def set_if_current(self, key: Any, value: Any, generation: Hashable, ttl: Optional[float] = None) -> bool:
+        """
+        Stores a value read while the key's group had `generation`. The shared
+        server keeps it even if the group was invalidated since, but only serves
+        it while that version is current; the near cache skips it right away.
+        """
+        near_generation, version = generation
+        if version is None or self.near.generation(key) != near_generation:
+            return False
+        ttl = self.ttl if ttl is None else ttl
+        ttl_ms = max(1, int(self.jittered(ttl) * 1000))
+        payload = pickle.dumps((version, value), protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            self._execute(("SET", self._key(key), payload, "PX", ttl_ms))
+            self._count(sets=1)
+        except (OSError, RespError) as exc:
+            logger.warning("Shared cache write failed: %s", exc)
+            return False
+        return self.near.set_if_current(key, value, near_generation, ttl=min(self.near.ttl, ttl))
+
+    def invalidate(self, key: Any):
+        """
+        Gives the key's group a new version in the shared server, which makes
+        every value stored under the previous one unreadable, then broadcasts
+        the invalidation so every worker drops it from its near cache.
+        """
+        self.near.invalidate(key)
+        try:
+            self._execute(
+                ("SET", self._version_key(SimpleCache._group_of(key)), os.urandom(8)),
+                ("DEL", self._key(key)),
+                ("PUBLISH", self.channel, pickle.dumps(key)),
+            )
+            self._count(invalidations=1)
+        except (OSError, RespError) as exc:
+            logger.error("Shared cache invalidation failed, entries may stay stale: %s", exc)
+
+    def clear(self):
+        """
+        Clears this worker's near cache. The shared store is left untouched.
+        """
+        self.near.clear()
+
+    def stats(self) -> CacheStats:
+        """
+        Returns hit/miss/set/invalidation counters of this worker, with the
+        near cache's occupancy and evictions.
+        """
+        near = self.near.stats()
         with self.lock:
-            if key in self.store:
-                del self.store[key]
+            counters = CacheStats(**vars(self.counters)) + self.loading_stats()
+        counters.entries, counters.bytes = near.entries, near.bytes
+        counters.evictions, counters.expirations = near.evictions, near.expirations
+        return counters
+
+    def close(self):
+        self._stopped.set()
+        self.near.close()
+
+
+class PrincipalCache:
+    """
+    A bounded, thread-safe cache of authenticated principals.
+
+    Two caches are kept: decoded JWT payloads keyed by a SHA-256 digest of the
+    whole token (so the raw bearer token is never held in memory), and user
+    objects keyed by user id. Both are limited in size and entry lifetime;
+    a payload never outlives the token's own `exp` claim.
+
+    Attributes:
+        payloads (SimpleCache): Verified token payloads by token digest.
+        users (SimpleCache): Detached user objects by user id.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: int = 60):
+        """
+        Initializes an empty principal cache.
+
+        Args:
+            max_entries (int): Maximum number of entries in each cache.
+            ttl_seconds (int): Time-to-live in seconds for each entry.
+        """
+        self.payloads = SimpleCache(ttl_seconds=ttl_seconds, max_entries=max_entries, shards=4)
+        self.users = SimpleCache(ttl_seconds=ttl_seconds, max_entries=max_entries, shards=4)
+
+    @staticmethod
+    def token_digest(token: str) -> str:
+        """
+        Returns the digest under which a token's payload is cached.
+        """
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get_payload(self, token: str) -> Optional[dict]:
+        """
+        Returns the cached decoded payload of a token, if any.
+        """
+        return self.payloads.get(self.token_digest(token))
+
+    def set_payload(self, token: str, payload: dict):
+        """
+        Caches the decoded payload of a token that has been verified.
+        """
+        ttl = self.payloads.ttl
+        if isinstance(payload.get("exp"), (int, float)):
+            ttl = min(ttl, payload["exp"] - time.time())
+        if ttl > 0:
+            self.payloads.set(self.token_digest(token), payload, ttl=ttl)
+
+    def get_user(self, user_id: int) -> Optional[Any]:
+        """
+        Returns the cached user object for a user id, if any.
+        """
+        return self.users.get(user_id)
+
+    def set_user(self, user_id: int, user: Any):
+        """
+        Caches a user object. It must be detached from any session.
+        """
+        self.users.set(user_id, user)
+
+    def invalidate(self, user_id: int):
+        """
+        Drops a cached user, e.g. after it was deleted or its password changed.
+        Cached payloads of that user's tokens are kept; they resolve to the
+        fresh user row on the next request.
+        """
+        self.users.invalidate(user_id)
+
+
+def create_cache() -> CacheBackend:
+    """
+    Builds the posts cache backend selected by CACHE_BACKEND:
+
+    - "local": an in-process SimpleCache (one cache per worker).
+    - "unix": a cache server on CACHE_SOCKET_PATH shared by the workers of
+      this host, started on demand by the first worker that needs it.
+    - "redis": a Redis (or Redis-protocol) server at CACHE_REDIS_URL.
+
+    Returns:
+        CacheBackend: The configured backend.
+
+    Raises:
+        ValueError: If CACHE_BACKEND is not one of the above.
+    """
+    local = SimpleCache(
+        ttl_seconds=settings.CACHE_TTL_SECONDS,
+        max_entries=settings.CACHE_MAX_ENTRIES,
+        max_bytes=settings.CACHE_MAX_BYTES,
+        shards=settings.CACHE_SHARDS,
+        sweep_interval=settings.CACHE_SWEEP_INTERVAL_SECONDS,
+        ttl_jitter=settings.CACHE_TTL_JITTER,
+        stale_seconds=settings.CACHE_STALE_SECONDS,
+    )
+    if settings.CACHE_BACKEND == "local":
+        return local
+
+    local.ttl = min(settings.CACHE_NEAR_TTL_SECONDS, settings.CACHE_TTL_SECONDS)
+    local.stale_seconds = 0
+    jitter = settings.CACHE_TTL_JITTER
+    if settings.CACHE_BACKEND == "unix":
+        path = settings.CACHE_SOCKET_PATH
+        command = [sys.executable, "-m", "core.cache_server", "--unix", path]
+        return RemoteCache(
+            f"unix://{path}", settings.CACHE_TTL_SECONDS, local, settings.CACHE_NAMESPACE, command, ttl_jitter=jitter,
+        )
+    if settings.CACHE_BACKEND == "redis":
+        return RemoteCache(
+            settings.CACHE_REDIS_URL, settings.CACHE_TTL_SECONDS, local, settings.CACHE_NAMESPACE, ttl_jitter=jitter,
+        )
+    raise ValueError(f"Unknown CACHE_BACKEND: {settings.CACHE_BACKEND}")
 
 
-# Global cache instance with 5-minute TTL
-cache = SimpleCache(ttl_seconds=300)
+# Global cache instance, bounded by entry count and approximate memory
+cache = create_cache()
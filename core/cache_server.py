@@ -0,0 +1,265 @@
+"""
+A small cache server speaking the Redis protocol (RESP2).
+
+It backs the "unix" cache backend, shared by all uvicorn workers on one host,
+and doubles as a local stand-in for Redis when testing the "redis" backend.
+Only the commands used by `core.cache.RemoteCache` are implemented:
+PING, AUTH, SELECT, GET, MGET, SET [NX] [PX], DEL, SADD, SMEMBERS, PEXPIRE,
+PUBLISH, SUBSCRIBE and FLUSHDB.
+
+Usage:
+    python -m core.cache_server --unix /tmp/mvc-cache.sock
+    python -m core.cache_server --port 6390
+"""
+import argparse
+import asyncio
+import fcntl
+import logging
+import os
+import sys
+import time
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStore:
+    """
+    Keyspace of the cache server: byte strings and sets with optional expiry,
+    evicted least recently used first once `max_bytes` is exceeded.
+    """
+
+    def __init__(self, max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.values = OrderedDict()
+        self.sets = {}
+        self.expires = {}
+        self.bytes = 0
+
+    def _alive(self, key: bytes) -> bool:
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.delete(key)
+            return False
+        return True
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        if key not in self.values or not self._alive(key):
+            return None
+        self.values.move_to_end(key)
+        return self.values[key]
+
+    def set(self, key: bytes, value: bytes, ttl_ms: Optional[int]):
+        self.delete(key)
+        self.values[key] = value
+        self.bytes += len(key) + len(value)
+        if ttl_ms is not None:
+            self.expires[key] = time.monotonic() + ttl_ms / 1000
+        while self.max_bytes and self.bytes > self.max_bytes and self.values:
+            self.delete(next(iter(self.values)))
+
+    def delete(self, key: bytes) -> int:
+        self.expires.pop(key, None)
+        if key in self.values:
+            self.bytes -= len(key) + len(self.values.pop(key))
+            return 1
+        return 1 if self.sets.pop(key, None) is not None else 0
+
+    def sadd(self, key: bytes, members: list) -> int:
+        if key in self.sets:
+            self._alive(key)  # Drops the set first if it has expired
+        members_set = self.sets.setdefault(key, set())
+        before = len(members_set)
+        members_set.update(members)
+        return len(members_set) - before
+
+    def smembers(self, key: bytes) -> list:
+        if key not in self.sets or not self._alive(key):
+            return []
+        return list(self.sets[key])
+
+    def pexpire(self, key: bytes, ttl_ms: int) -> int:
+        if key not in self.values and key not in self.sets:
+            return 0
+        self.expires[key] = time.monotonic() + ttl_ms / 1000
+        return 1
+
+    def sweep(self):
+        now = time.monotonic()
+        for key in [key for key, deadline in self.expires.items() if deadline <= now]:
+            self.delete(key)
+
+    def flush(self):
+        self.values.clear()
+        self.sets.clear()
+        self.expires.clear()
+        self.bytes = 0
+
+
+def _encode(reply) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, Exception):
+        return b"-ERR %s\r\n" % str(reply).encode()
+    if isinstance(reply, str):
+        return b"+%s\r\n" % reply.encode()
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    return b"*%d\r\n" % len(reply) + b"".join(_encode(item) for item in reply)
+
+
+class CacheServer:
+    """
+    asyncio RESP server around a `CacheStore`, with publish/subscribe.
+    """
+
+    def __init__(self, max_bytes: int = 0):
+        self.store = CacheStore(max_bytes)
+        self.channels = {}
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> Optional[list]:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()  # Inline command, e.g. "PING" typed by hand
+        args = []
+        for _ in range(int(line[1:-2])):
+            header = await reader.readline()
+            data = await reader.readexactly(int(header[1:-2]) + 2)
+            args.append(data[:-2])
+        return args
+
+    def _execute(self, args: list):
+        name = args[0].upper()
+        store = self.store
+        if name == b"PING":
+            return "PONG"
+        if name in (b"AUTH", b"SELECT"):
+            return "OK"
+        if name == b"GET":
+            return store.get(args[1])
+        if name == b"MGET":
+            return [store.get(key) for key in args[1:]]
+        if name == b"SET":
+            options = [arg.upper() for arg in args[3:]]
+            ttl_ms = int(args[3 + options.index(b"PX") + 1]) if b"PX" in options else None
+            if b"NX" in options and store.get(args[1]) is not None:
+                return None
+            store.set(args[1], args[2], ttl_ms)
+            return "OK"
+        if name == b"DEL":
+            return sum(store.delete(key) for key in args[1:])
+        if name == b"SADD":
+            return store.sadd(args[1], args[2:])
+        if name == b"SMEMBERS":
+            return store.smembers(args[1])
+        if name == b"PEXPIRE":
+            return store.pexpire(args[1], int(args[2]))
+        if name == b"PUBLISH":
+            message = _encode([b"message", args[1], args[2]])
+            subscribers = self.channels.get(args[1], ())
+            for writer in list(subscribers):
+                writer.write(message)
+            return len(subscribers)
+        if name == b"FLUSHDB":
+            store.flush()
+            return "OK"
+        return ValueError(f"unknown command '{name.decode(errors='replace')}'")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        subscribed = []
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                if not args:
+                    continue
+                if args[0].upper() == b"SUBSCRIBE":
+                    for channel in args[1:]:
+                        self.channels.setdefault(channel, set()).add(writer)
+                        subscribed.append(channel)
+                        writer.write(_encode([b"subscribe", channel, len(subscribed)]))
+                else:
+                    try:
+                        writer.write(_encode(self._execute(args)))
+                    except (IndexError, ValueError) as exc:
+                        writer.write(_encode(ValueError(f"bad arguments: {exc}")))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for channel in subscribed:
+                self.channels.get(channel, set()).discard(writer)
+            writer.close()
+
+    async def _sweep_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.store.sweep()
+
+    async def serve(self, unix_path: Optional[str] = None, host: str = "127.0.0.1", port: int = 0):
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle, path=unix_path)
+            os.chmod(unix_path, 0o600)  # Only the application's user may talk to the cache
+        else:
+            server = await asyncio.start_server(self.handle, host=host, port=port)
+        sweeper = asyncio.get_running_loop().create_task(self._sweep_loop(5.0))
+        logger.info("Cache server listening on %s", unix_path or f"{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            sweeper.cancel()
+
+
+def _claim_socket(unix_path: str):
+    """
+    Takes an exclusive lock next to the socket so that only one server runs per
+    path, even when several workers try to start it at the same time.
+    The lock file is kept open for the lifetime of the process.
+
+    Returns:
+        The open lock file, or None if another server already holds the lock.
+    """
+    lock_file = open(unix_path + ".lock", "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    if os.path.exists(unix_path):
+        os.unlink(unix_path)  # Stale socket of a server that has exited
+    return lock_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--unix", help="Unix socket path to listen on")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    parser.add_argument("--max-bytes", type=int, default=512 * 1024 * 1024)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    lock = None
+    if args.unix:
+        lock = _claim_socket(args.unix)
+        if lock is None:
+            logger.info("Another cache server already serves %s", args.unix)
+            sys.exit(0)
+    try:
+        asyncio.run(CacheServer(args.max_bytes).serve(args.unix, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if lock is not None:
+            lock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import zlib
+from typing import Iterable, Optional
+from core.config import settings
+
+# Optional codecs: brotli needs the "brotli" package; zstd comes from the standard
+# library on Python 3.14+ or from the "zstandard" package. Without them only
+# gzip is offered.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from compression import zstd as stdlib_zstd
+except ImportError:
+    stdlib_zstd = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Media types worth compressing; images and archives are already compressed
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+# Levels used for codecs missing from the configured level lists
+DEFAULT_LEVELS = {"gzip": 6, "br": 4, "zstd": 3}
+
+
+class Compressor:
+    """
+    Incremental compressor producing one Content-Encoding stream.
+
+    `compress` returns output for a chunk of input, `flush` additionally
+    emits everything buffered so far (so a streamed line reaches the client
+    without waiting for more data), and `finish` ends the stream.
+    """
+
+    def __init__(self, codec: str, level: int):
+        """
+        Creates the codec's compression object.
+
+        Args:
+            codec (str): "gzip", "br" or "zstd"; must be one of `available_codecs()`.
+            level (int): Compression level of the codec.
+        """
+        self.codec = codec
+        if codec == "gzip":
+            self._impl = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip header and trailer
+        elif codec == "br":
+            self._impl = brotli.Compressor(quality=level)
+        elif stdlib_zstd is not None:
+            self._impl = stdlib_zstd.ZstdCompressor(level=level)
+        else:
+            self._impl = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        if self.codec == "br":
+            return self._impl.process(data)
+        return self._impl.compress(data)
+
+    def flush(self, data: bytes = b"") -> bytes:
+        if self.codec == "gzip":
+            return self._impl.compress(data) + self._impl.flush(zlib.Z_SYNC_FLUSH)
+        if self.codec == "br":
+            return self._impl.process(data) + self._impl.flush()
+        if stdlib_zstd is not None:
+            return self._impl.compress(data, stdlib_zstd.ZstdCompressor.FLUSH_BLOCK)
+        return self._impl.compress(data) + self._impl.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.codec == "br":
+            return self._impl.process(data) + self._impl.finish()
+        if self.codec == "zstd" and stdlib_zstd is not None:
+            return self._impl.compress(data, stdlib_zstd.ZstdCompressor.FLUSH_FRAME)
+        return self._impl.compress(data) + self._impl.flush()
+
+
+def available_codecs() -> list[str]:
+    """
+    Returns the codecs this process can produce, in order of preference.
+    """
+    codecs = []
+    if stdlib_zstd is not None or zstandard is not None:
+        codecs.append("zstd")
+    if brotli is not None:
+        codecs.append("br")
+    codecs.append("gzip")
+    return codecs
+
+
+def response_codecs() -> list[str]:
+    """
+    Returns the codecs offered for responses: RESPONSE_COMPRESSION_CODECS, in
+    its order, restricted to those available in this process.
+    """
+    available = available_codecs()
+    return [codec.strip() for codec in settings.RESPONSE_COMPRESSION_CODECS.split(",") if codec.strip() in available]
+
+
+def parse_levels(spec: str) -> dict[str, int]:
+    """
+    Parses a comma-separated list of ``codec=level`` pairs, e.g. "gzip=6,br=4,zstd=3".
+    """
+    levels = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        codec, _, level = entry.partition("=")
+        levels[codec.strip()] = int(level)
+    return levels
+
+
+def compress(data: bytes, codec: str, level: int) -> bytes:
+    """
+    Compresses a complete body with the given codec.
+
+    Args:
+        data (bytes): The body.
+        codec (str): "gzip", "br" or "zstd".
+        level (int): Compression level of the codec.
+
+    Returns:
+        bytes: The encoded body.
+    """
+    return Compressor(codec, level).finish(data)
+
+
+def negotiate(accept_encoding: str, offered: Iterable[str]) -> Optional[str]:
+    """
+    Picks the content coding to use for a response.
+
+    The client's Accept-Encoding q-values decide first; among equally
+    weighted codings the order of `offered` (server preference) wins.
+    A wildcard applies to codings the client did not name.
+
+    Args:
+        accept_encoding (str): The request's Accept-Encoding header.
+        offered (Iterable[str]): Codings available for this response, preferred first.
+
+    Returns:
+        Optional[str]: The chosen coding, or None to send the body uncompressed.
+    """
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, *params = (part.strip() for part in item.split(";"))
+        if not name:
+            continue
+        weight = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name.lower()] = weight
+
+    best, best_weight = None, 0.0
+    for codec in offered:
+        weight = weights.get(codec, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = codec, weight
+    return best
+
+
+def encoded_etag(etag: str, codec: str) -> str:
+    """
+    Returns the entity tag of a compressed representation. A strong tag must
+    differ between content codings, so the codec is appended, e.g.
+    "42.ab12" becomes "42.ab12-gzip"; weak tags are returned unchanged.
+    """
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{codec}"'
+
+
+def is_compressible(content_type: str) -> bool:
+    """
+    Tells whether a response of this media type benefits from compression.
+    """
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+# Levels for compressing on the fly (cheap) and for cached bodies (compressed once, sent many times)
+response_levels = {**DEFAULT_LEVELS, **parse_levels(settings.RESPONSE_COMPRESSION_LEVELS)}
+cache_levels = {**DEFAULT_LEVELS, **parse_levels(settings.RESPONSE_CACHE_COMPRESSION_LEVELS)}
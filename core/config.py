@@ -15,9 +15,104 @@ class Settings(BaseSettings):
         DB_NAME (str): Name of the database to connect to.
         DB_USER (str): Username used to authenticate with the database.
         DB_PASSWORD (str): Password used to authenticate with the database.
+        DATABASE_URL (str): Full SQLAlchemy URL overriding the DB_* settings (e.g. SQLite for local runs).
+        ASYNC_DATABASE_URL (str): Full async SQLAlchemy URL overriding the DB_* settings in async mode.
+        ASYNC_MODE (bool): Serve requests through async routes backed by an AsyncEngine.
+        SERVER_WORKERS (int): Worker processes started by serve.py; 0 uses one per available CPU.
+        SERVER_MAX_REQUESTS (int): Requests after which serve.py replaces a worker; 0 never does.
+        SERVER_MAX_REQUESTS_JITTER (int): Random extra requests per worker, so workers are not replaced together.
+        SERVER_GRACEFUL_TIMEOUT (float): Seconds a stopping worker may spend finishing its requests.
+        SERVER_LOOP (str): Event loop of serve.py workers: "auto" (uvloop when installed), "uvloop" or "asyncio".
+        SERVER_HTTP (str): HTTP parser of serve.py workers: "auto" (httptools when installed), "httptools" or "h11".
+        SERVER_BACKLOG (int): Pending connections the listening socket queues.
+        DB_POOL_SIZE (int): Connections kept open in the pool of each engine (per worker process).
+        DB_MAX_OVERFLOW (int): Extra connections opened under load beyond DB_POOL_SIZE.
+        DB_POOL_TIMEOUT (float): Seconds a request waits for a free connection before failing.
+        DB_POOL_RECYCLE (int): Seconds after which a connection is replaced; -1 keeps connections forever.
+        DB_POOL_PRE_PING (bool): Test connections with a ping on checkout.
+        DB_POOL_WARMUP (int): Connections opened per pool at startup, before the first request needs them.
+        DB_SCHEMA_CHECK (str): "fingerprint" runs schema DDL only when the models changed; "always" on every start.
+        DB_REPLICA_URLS (str): Comma-separated SQLAlchemy URLs of read replicas; reads are spread over them.
+        ASYNC_DB_REPLICA_URLS (str): Async driver URLs of the read replicas, used in async mode.
+        DB_REPLICA_STICKY_SECONDS (float): How long a user's reads stay on the primary after the user wrote.
+        DB_REPLICA_RETRY_SECONDS (float): How long a failed replica is left out of the rotation.
+        ADMISSION_CONTROL (bool): Limit concurrent requests per route group and shed excess load with 503s.
+            Off by default; tune ADMISSION_LIMITS to the deployment before enabling it.
+        ADMISSION_LIMITS (str): Comma-separated path_prefix=limit pairs; paths matching none are not limited.
+        ADMISSION_QUEUE_LIMIT (int): Requests allowed to wait for a slot, per path prefix.
+        ADMISSION_QUEUE_TIMEOUT_MS (float): Longest a request may wait for a slot before getting a 503.
+        POSTS_ADD_RATE (float): Posts a user may add per second through /posts/add; 0 (the default)
+            disables the limit.
+        POSTS_ADD_BURST (int): Posts a user may add in a burst before POSTS_ADD_RATE applies; only
+            used when POSTS_ADD_RATE is set.
+        METRICS_ENABLED (bool): Record request, query and cache metrics and send Server-Timing headers.
+        PROFILE_SECRET (str): Key signing X-Profile request headers that ask for a profile of the
+            request (see core.profiling); empty disables them.
+        PROFILE_SAMPLE_RATE (float): Fraction of requests profiled without being asked; 0 disables it.
+        PROFILE_INTERVAL_MS (float): Interval between stack samples of a profiled request.
+        PROFILE_DIR (str): Directory receiving the collapsed-stack files of profiled requests.
+        SLOW_QUERY_MS (float): Statements running at least this long are logged with their
+            parameters and route (see core.slow_queries); 0 disables the log.
+        SLOW_QUERY_EXPLAIN (bool): Capture the EXPLAIN output of logged statements.
+        SLOW_QUERY_LOG_SIZE (int): Slow statements kept for /metrics/slow-queries.
+        SLOW_QUERY_LOG_PARAMETERS (bool): Log the values of statement parameters; by default
+            only their type and length are logged, as they hold emails, hashes and post text.
         SECRET_KEY (str): Secret key used for JWT encoding/decoding.
         ALGORITHM (str): The hashing algorithm used for JWT.
         ACCESS_TOKEN_EXPIRE_MINUTES (int): Token expiration time in minutes.
+        HASH_POOL_SIZE (int): Worker processes used for bcrypt; 0 hashes inline in the request thread.
+        HASH_QUEUE_LIMIT (int): Hashing jobs allowed to wait for a worker before logins get a 503.
+        BCRYPT_ROUNDS (int): Fixed bcrypt cost, recommended in production; 0 calibrates it at startup
+            from BCRYPT_TARGET_MS (once in the serve.py master, or in each process otherwise).
+        BCRYPT_TARGET_MS (int): Target duration of one hash used by the startup calibration.
+        BCRYPT_MIN_ROUNDS (int): Lowest cost the calibration may pick.
+        CACHE_TTL_SECONDS (int): Lifetime of a cached posts page.
+        CACHE_MAX_ENTRIES (int): Maximum number of entries in the posts cache.
+        CACHE_MAX_BYTES (int): Approximate memory budget of the posts cache; 0 disables the byte limit.
+        CACHE_SHARDS (int): Number of independently locked shards of the posts cache.
+        CACHE_SWEEP_INTERVAL_SECONDS (float): Period of the background expiry sweep; 0 disables it.
+        CACHE_BACKEND (str): "local" (per process), "unix" (shared by the workers of a host) or "redis".
+        CACHE_SOCKET_PATH (str): Unix socket of the host-local cache server used by the "unix" backend.
+        CACHE_REDIS_URL (str): Server used by the "redis" backend.
+        CACHE_NAMESPACE (str): Prefix of shared cache keys and of the invalidation channel.
+        CACHE_NEAR_TTL_SECONDS (int): Lifetime of the per-worker copy of shared cache entries.
+        CACHE_TTL_JITTER (float): Fraction by which cache entry lifetimes are randomly shortened,
+            so entries cached together do not expire together.
+        CACHE_STALE_SECONDS (float): How long an expired posts page may still be served while one
+            request refreshes it in the background (local backend only); 0 disables it.
+        CACHE_REFRESH_WORKERS (int): Threads refreshing stale cache entries in the background.
+        POSTS_CACHE_MODE (str): "objects" caches ORM posts; "rendered" caches serialized JSON bodies.
+        POSTS_CACHE_WRITE_THROUGH (bool): Keep a window of each user's newest posts cached and apply
+            writes to it in place, instead of dropping the user's cache on every write.
+        POSTS_CACHE_WINDOW (int): Newest posts held in that window; should exceed POSTS_PAGE_MAX_LIMIT.
+        RESPONSE_CACHE_PRECOMPRESS (bool): Also cache compressed copies of rendered bodies, each made on
+            the first request negotiating its codec; bodies under RESPONSE_COMPRESSION_MIN_BYTES are not.
+        RESPONSE_CACHE_COMPRESSION_LEVELS (str): codec=level pairs used for cached copies, compressed once.
+        RESPONSE_COMPRESSION (bool): Compress responses with the best codec the client accepts.
+        RESPONSE_COMPRESSION_CODECS (str): Codecs offered, preferred first; unavailable ones are skipped.
+        RESPONSE_COMPRESSION_LEVELS (str): codec=level pairs used when compressing a response on the fly.
+        RESPONSE_COMPRESSION_MIN_BYTES (int): Smallest response body that gets compressed.
+        POST_TEXT_COMPRESSION (bool): Store large post texts zlib-compressed.
+        POST_TEXT_COMPRESSION_MIN_BYTES (int): Smallest post text, in UTF-8 bytes, that gets compressed.
+        POST_TEXT_COMPRESSION_LEVEL (int): zlib level used for post texts.
+        POST_PREVIEW_LENGTH (int): Characters of a post's text kept in its stored preview; at most
+            200, the width of the preview column.
+        POSTS_BATCH_MAX_ITEMS (int): Maximum number of posts in one batch request.
+        POSTS_BATCH_MAX_BYTES (int): Maximum combined text length of one /posts/add_batch request.
+        POSTS_GROUP_COMMIT (bool): Write concurrently added posts together, in one transaction per batch.
+        POSTS_GROUP_COMMIT_WINDOW_MS (float): How long a group-commit batch waits for more posts.
+        POSTS_GROUP_COMMIT_MAX_BATCH (int): Largest number of posts written by one group commit.
+        SEARCH_BACKEND (str): "memory" (per-process BM25 index) or "sql" (MySQL FULLTEXT / SQLite FTS5).
+        SEARCH_INDEX_MAX_POSTINGS (int): Memory budget of the in-process search index, in postings.
+        SEARCH_INDEX_WARM (bool): Build the in-process index in the background at startup. Off by
+            default: every worker scans the posts table on every start, recycle and reload; users
+            are otherwise indexed on their first search.
+        SEARCH_MAX_QUERY_TERMS (int): Distinct words of a search query that are used; the rest are ignored.
+        PRINCIPAL_CACHE_SIZE (int): Maximum number of cached token payloads and cached users.
+        PRINCIPAL_CACHE_TTL_SECONDS (int): Lifetime of an authenticated-principal cache entry.
+        POSTS_PAGE_DEFAULT_LIMIT (int): Page size used by /posts/get when no limit is given.
+        POSTS_PAGE_MAX_LIMIT (int): Largest page size a client may request from /posts/get.
+        POSTS_STREAM_BATCH_SIZE (int): Rows fetched from the server-side cursor at a time when streaming posts.
     """
 
     DB_HOST: str = os.getenv("DB_HOST", "localhost")
@@ -25,9 +120,96 @@ class Settings(BaseSettings):
     DB_NAME: str = os.getenv("DB_NAME", "mvc_backend")
     DB_USER: str = os.getenv("DB_USER", "admin")
     DB_PASSWORD: str = os.getenv("DB_PASSWORD", "admin")
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+    ASYNC_MODE: bool = os.getenv("ASYNC_MODE", "false").lower() in ("1", "true", "yes")
+    SERVER_WORKERS: int = int(os.getenv("SERVER_WORKERS", "0"))
+    SERVER_MAX_REQUESTS: int = int(os.getenv("SERVER_MAX_REQUESTS", "0"))
+    SERVER_MAX_REQUESTS_JITTER: int = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", "0"))
+    SERVER_GRACEFUL_TIMEOUT: float = float(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+    SERVER_LOOP: str = os.getenv("SERVER_LOOP", "auto")
+    SERVER_HTTP: str = os.getenv("SERVER_HTTP", "auto")
+    SERVER_BACKLOG: int = int(os.getenv("SERVER_BACKLOG", "2048"))
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    DB_POOL_WARMUP: int = int(os.getenv("DB_POOL_WARMUP", "0"))
+    DB_SCHEMA_CHECK: str = os.getenv("DB_SCHEMA_CHECK", "fingerprint")
+    DB_REPLICA_URLS: str = os.getenv("DB_REPLICA_URLS", "")
+    ASYNC_DB_REPLICA_URLS: str = os.getenv("ASYNC_DB_REPLICA_URLS", "")
+    DB_REPLICA_STICKY_SECONDS: float = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+    DB_REPLICA_RETRY_SECONDS: float = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+    ADMISSION_CONTROL: bool = os.getenv("ADMISSION_CONTROL", "false").lower() in ("1", "true", "yes")
+    ADMISSION_QUEUE_LIMIT: int = int(os.getenv("ADMISSION_QUEUE_LIMIT", "256"))
+    ADMISSION_QUEUE_TIMEOUT_MS: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "2000"))
+    POSTS_ADD_RATE: float = float(os.getenv("POSTS_ADD_RATE", "0"))
+    POSTS_ADD_BURST: int = int(os.getenv("POSTS_ADD_BURST", "40"))
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+    PROFILE_SECRET: str = os.getenv("PROFILE_SECRET", "")
+    PROFILE_SAMPLE_RATE: float = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "profiles")
+    SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", "0"))
+    SLOW_QUERY_EXPLAIN: bool = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() in ("1", "true", "yes")
+    SLOW_QUERY_LOG_SIZE: int = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))
+    SLOW_QUERY_LOG_PARAMETERS: bool = os.getenv("SLOW_QUERY_LOG_PARAMETERS", "false").lower() in ("1", "true", "yes")
     SECRET_KEY: str = os.getenv("SECRET_KEY", "examplesecretkey")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    HASH_POOL_SIZE: int = int(os.getenv("HASH_POOL_SIZE", str(max(1, (os.cpu_count() or 2) // 2))))
+    HASH_QUEUE_LIMIT: int = int(os.getenv("HASH_QUEUE_LIMIT", "32"))
+    # By default bcrypt-heavy routes get two requests per hashing worker, and the
+    # post routes as many as there are database connections
+    ADMISSION_LIMITS: str = os.getenv(
+        "ADMISSION_LIMITS",
+        f"/auth/signup={2 * max(1, HASH_POOL_SIZE)},/auth/login={2 * max(1, HASH_POOL_SIZE)},"
+        f"/posts={DB_POOL_SIZE + DB_MAX_OVERFLOW}",
+    )
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "0"))
+    BCRYPT_TARGET_MS: int = int(os.getenv("BCRYPT_TARGET_MS", "250"))
+    BCRYPT_MIN_ROUNDS: int = int(os.getenv("BCRYPT_MIN_ROUNDS", "10"))
+    CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+    CACHE_MAX_BYTES: int = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    CACHE_SHARDS: int = int(os.getenv("CACHE_SHARDS", "16"))
+    CACHE_SWEEP_INTERVAL_SECONDS: float = float(os.getenv("CACHE_SWEEP_INTERVAL_SECONDS", "30"))
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "local")
+    CACHE_SOCKET_PATH: str = os.getenv("CACHE_SOCKET_PATH", "/tmp/mvc-cache.sock")
+    CACHE_REDIS_URL: str = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    CACHE_NAMESPACE: str = os.getenv("CACHE_NAMESPACE", "mvc")
+    CACHE_NEAR_TTL_SECONDS: int = int(os.getenv("CACHE_NEAR_TTL_SECONDS", "30"))
+    CACHE_TTL_JITTER: float = float(os.getenv("CACHE_TTL_JITTER", "0.1"))
+    CACHE_STALE_SECONDS: float = float(os.getenv("CACHE_STALE_SECONDS", "30"))
+    CACHE_REFRESH_WORKERS: int = int(os.getenv("CACHE_REFRESH_WORKERS", "2"))
+    POSTS_CACHE_MODE: str = os.getenv("POSTS_CACHE_MODE", "objects")
+    POSTS_CACHE_WRITE_THROUGH: bool = os.getenv("POSTS_CACHE_WRITE_THROUGH", "false").lower() in ("1", "true", "yes")
+    POSTS_CACHE_WINDOW: int = int(os.getenv("POSTS_CACHE_WINDOW", "200"))
+    RESPONSE_CACHE_PRECOMPRESS: bool = os.getenv("RESPONSE_CACHE_PRECOMPRESS", "true").lower() in ("1", "true", "yes")
+    RESPONSE_CACHE_COMPRESSION_LEVELS: str = os.getenv("RESPONSE_CACHE_COMPRESSION_LEVELS", "gzip=9,br=9,zstd=12")
+    RESPONSE_COMPRESSION: bool = os.getenv("RESPONSE_COMPRESSION", "true").lower() in ("1", "true", "yes")
+    RESPONSE_COMPRESSION_CODECS: str = os.getenv("RESPONSE_COMPRESSION_CODECS", "zstd,br,gzip")
+    RESPONSE_COMPRESSION_LEVELS: str = os.getenv("RESPONSE_COMPRESSION_LEVELS", "gzip=5,br=4,zstd=3")
+    RESPONSE_COMPRESSION_MIN_BYTES: int = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+    POST_TEXT_COMPRESSION: bool = os.getenv("POST_TEXT_COMPRESSION", "true").lower() in ("1", "true", "yes")
+    POST_TEXT_COMPRESSION_MIN_BYTES: int = int(os.getenv("POST_TEXT_COMPRESSION_MIN_BYTES", "1024"))
+    POST_TEXT_COMPRESSION_LEVEL: int = int(os.getenv("POST_TEXT_COMPRESSION_LEVEL", "6"))
+    POST_PREVIEW_LENGTH: int = int(os.getenv("POST_PREVIEW_LENGTH", "200"))
+    POSTS_BATCH_MAX_ITEMS: int = int(os.getenv("POSTS_BATCH_MAX_ITEMS", "100"))
+    POSTS_BATCH_MAX_BYTES: int = int(os.getenv("POSTS_BATCH_MAX_BYTES", str(8 * 1024 * 1024)))
+    POSTS_GROUP_COMMIT: bool = os.getenv("POSTS_GROUP_COMMIT", "false").lower() in ("1", "true", "yes")
+    POSTS_GROUP_COMMIT_WINDOW_MS: float = float(os.getenv("POSTS_GROUP_COMMIT_WINDOW_MS", "2"))
+    POSTS_GROUP_COMMIT_MAX_BATCH: int = int(os.getenv("POSTS_GROUP_COMMIT_MAX_BATCH", "100"))
+    SEARCH_BACKEND: str = os.getenv("SEARCH_BACKEND", "memory")
+    SEARCH_INDEX_MAX_POSTINGS: int = int(os.getenv("SEARCH_INDEX_MAX_POSTINGS", "1000000"))
+    SEARCH_INDEX_WARM: bool = os.getenv("SEARCH_INDEX_WARM", "false").lower() in ("1", "true", "yes")
+    SEARCH_MAX_QUERY_TERMS: int = int(os.getenv("SEARCH_MAX_QUERY_TERMS", "16"))
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+    PRINCIPAL_CACHE_TTL_SECONDS: int = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+    POSTS_PAGE_DEFAULT_LIMIT: int = int(os.getenv("POSTS_PAGE_DEFAULT_LIMIT", "50"))
+    POSTS_PAGE_MAX_LIMIT: int = int(os.getenv("POSTS_PAGE_MAX_LIMIT", "100"))
+    POSTS_STREAM_BATCH_SIZE: int = int(os.getenv("POSTS_STREAM_BATCH_SIZE", "500"))
 
 
 # Global settings instance accessible throughout the application
@@ -1,40 +1,377 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base, scoped_session
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Optional
+from sqlalchemy import Column, DateTime, MetaData, String, Table, create_engine, event, func, inspect, make_url
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from core.config import settings
+from core.metrics import record_query
+from core.slow_queries import slow_query_log
+from core.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from core.routing import ReplicaSet, RoutingSession
+
+logger = logging.getLogger(__name__)
 
 # Construct the full database URL from environment configuration
 # Format: mysql+mysqldb://<user>:<password>@<host>:<port>/<database>
-DATABASE_URL = (
+# DATABASE_URL overrides it, e.g. sqlite:///./local.db for local runs and benchmarks.
+DATABASE_URL = settings.DATABASE_URL or (
     f"mysql+mysqldb://{settings.DB_USER}:{settings.DB_PASSWORD}"
     f"@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
 )
 
+# Async counterpart of DATABASE_URL, used when ASYNC_MODE is enabled
+# Format: mysql+aiomysql://<user>:<password>@<host>:<port>/<database>
+# ASYNC_DATABASE_URL overrides it, e.g. sqlite+aiosqlite:///./local.db
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or (
+    f"mysql+aiomysql://{settings.DB_USER}:{settings.DB_PASSWORD}"
+    f"@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+)
+
+
+def _connect_args(url: str) -> dict:
+    """
+    Returns driver-specific connection arguments for the given URL.
+    SQLite connections are shared between threadpool workers, so the
+    same-thread check has to be disabled.
+    """
+    return {"check_same_thread": False} if url.startswith("sqlite") else {}
+
+
+def _pool_args(url: str, pool_class: type) -> dict:
+    """
+    Returns the connection pool configuration for the given URL.
+    In-memory SQLite keeps SQLAlchemy's default single-connection pool, since
+    every new connection would open an empty database.
+    """
+    args = {"pool_pre_ping": settings.DB_POOL_PRE_PING}  # Checks that connections are alive before using them
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return args
+    args.update(
+        poolclass=pool_class,  # Records checkout wait times, see /metrics/pool
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,  # Stays below MySQL's wait_timeout
+    )
+    return args
+
+
 # SQLAlchemy engine that manages the connection pool and communication with the database
 engine = create_engine(
     DATABASE_URL,
-    pool_pre_ping=True  # Enables checking if connections are alive before using them
+    connect_args=_connect_args(DATABASE_URL),
+    **_pool_args(DATABASE_URL, InstrumentedQueuePool),
 )
 
-# Session factory for creating database sessions.
+
+def _replica_set(urls: str, create, pool_class: type) -> Optional[ReplicaSet]:
+    """
+    Creates engines for a comma-separated list of replica URLs, or returns
+    None when no replicas are configured.
+    """
+    urls = [url.strip() for url in urls.split(",") if url.strip()]
+    if not urls:
+        return None
+    engines = [create(url, connect_args=_connect_args(url), **_pool_args(url, pool_class)) for url in urls]
+    return ReplicaSet(
+        engines,
+        sticky_seconds=settings.DB_REPLICA_STICKY_SECONDS,
+        retry_seconds=settings.DB_REPLICA_RETRY_SECONDS,
+    )
+
+
+# Read replicas; without them every query goes to the primary engine
+replicas = _replica_set(settings.DB_REPLICA_URLS, create_engine, InstrumentedQueuePool)
+
+# Session factory for creating database sessions. Every request gets exactly one
+# session from `get_db`, shared by authentication and the route handler.
+# With replicas, RoutingSession sends reads to them and writes to `engine`.
 # - autocommit=False: ensures explicit commit/rollback handling.
 # - autoflush=False: delays automatic flushing of data to the DB.
-SessionLocal = scoped_session(sessionmaker(
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
     autocommit=False,
     autoflush=False,
-    bind=engine
-))
+    bind=engine,
+    info={"replicas": replicas},
+)
+
+# Async engine and session factory, only created in async mode so the async
+# driver is not required otherwise. SQLAlchemy's asyncio extension is imported
+# here too rather than at the top: it is a tenth of a second of startup.
+# - expire_on_commit=False: attributes stay loaded after commit, since lazy loads
+#   are not possible outside of an awaitable context.
+if settings.ASYNC_MODE:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        connect_args=_connect_args(ASYNC_DATABASE_URL),
+        **_pool_args(ASYNC_DATABASE_URL, InstrumentedAsyncQueuePool),
+    )
+
+    async_replicas = _replica_set(
+        settings.ASYNC_DB_REPLICA_URLS,
+        lambda url, **kwargs: create_async_engine(url, **kwargs).sync_engine,
+        InstrumentedAsyncQueuePool,
+    )
+
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        autoflush=False,
+        expire_on_commit=False,
+        info={"replicas": async_replicas},
+    )
+else:
+    async_engine = async_replicas = AsyncSessionLocal = None
 
 # Base class for declaring models using SQLAlchemy ORM
 Base = declarative_base()
 
 
-def init_db():
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    record_query(time.perf_counter() - context._query_started)
+
+
+def _check_slow_query(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - context._query_started
+    if seconds >= slow_query_log.threshold:
+        # Async engines cannot be used from the EXPLAIN thread; the sync primary reaches the same database
+        explain_engine = engine if conn.dialect.is_async else conn.engine
+        slow_query_log.record(explain_engine, statement, parameters, seconds, executemany)
+
+
+def _instrument_engine(target):
+    """
+    Times every statement: counts queries and database time, globally and per
+    request (see core.metrics), and records slow ones (see core.slow_queries).
+    """
+    event.listen(target, "before_cursor_execute", _start_query_timer)
+    if settings.METRICS_ENABLED:
+        event.listen(target, "after_cursor_execute", _stop_query_timer)
+    if slow_query_log is not None:
+        event.listen(target, "after_cursor_execute", _check_slow_query)
+
+
+if settings.METRICS_ENABLED or slow_query_log is not None:
+    _instrument_engine(engine)
+    if async_engine is not None:
+        _instrument_engine(async_engine.sync_engine)
+    for replica_set in filter(None, (replicas, async_replicas)):
+        for replica in replica_set.engines:
+            _instrument_engine(replica)
+
+
+def new_session(user_id: Optional[int] = None) -> Session:
+    """
+    Opens a session outside of the request's dependencies, for work that
+    outlives them, such as a streaming response body. The caller closes it.
+
+    Args:
+        user_id (Optional[int]): The user the work is done for, so that reads
+            follow the user to the primary after a recent write.
+    """
+    db = SessionLocal()
+    db.info["user_id"] = user_id
+    return db
+
+
+def stick_to_primary(user_id: int):
+    """
+    Keeps a user's reads on the primary after a write committed outside of a
+    session that knew the user, such as a group commit of several users' posts.
+
+    Args:
+        user_id (int): The user whose reads should see the write.
+    """
+    for replica_set in filter(None, (replicas, async_replicas)):
+        replica_set.stick(user_id)
+
+
+def get_db():
+    """
+    Dependency function that provides a SQLAlchemy session for the request.
+    FastAPI caches dependencies per request, so authentication and the route
+    handler share this one session. It is closed after the request ends.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """
+    Dependency function that provides an AsyncSession for async routes.
+    Ensures the session is properly closed after the request ends.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Fingerprint of the models the schema was last synchronized with. Kept out of
+# Base.metadata, so that it is not part of the fingerprint itself.
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("fingerprint", String(64), primary_key=True),
+    Column("applied_at", DateTime, server_default=func.now()),
+)
+
+
+def schema_fingerprint(dialect) -> str:
+    """
+    Hashes the DDL of every model table and index as compiled for `dialect`,
+    so that any change to tables, columns, types or indexes yields a new value.
+
+    Args:
+        dialect: The SQLAlchemy dialect of the database.
+
+    Returns:
+        str: Hex SHA-256 digest of the schema.
+    """
+    import models.user_model  # Ensures User model is registered
+    import models.post_model  # Ensures Post model is registered
+    digest = hashlib.sha256()
+    for table in Base.metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+    return digest.hexdigest()
+
+
+def _sync_schema(connection) -> bool:
+    """
+    Brings the schema up to date with the models, skipping all DDL and
+    reflection when the stored fingerprint shows nothing changed since the
+    last synchronization (unless DB_SCHEMA_CHECK is "always").
+
+    Returns:
+        bool: True if the schema DDL was run.
+    """
+    fingerprint = schema_fingerprint(connection.dialect)
+    schema_version.create(bind=connection, checkfirst=True)
+    stored = connection.execute(schema_version.select().with_only_columns(schema_version.c.fingerprint)).scalar()
+    synchronized = settings.DB_SCHEMA_CHECK != "always" and stored == fingerprint
+    if not synchronized:
+        _create_schema(connection)
+        connection.execute(schema_version.delete())
+        connection.execute(schema_version.insert().values(fingerprint=fingerprint))
+    _check_post_text_storage(connection)
+    return not synchronized
+
+
+def _create_schema(connection):
+    """
+    Creates all tables, and any nullable columns and indexes added to models
+    after their table was created, since `create_all` skips tables that already exist.
+    """
+    import models.user_model  # Ensures User model is registered
+    import models.post_model  # Ensures Post model is registered
+    Base.metadata.create_all(bind=connection)  # Creates all tables from Base subclasses
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+        for column in table.columns:
+            # Only plain nullable columns can be added to a populated table everywhere
+            if column.name not in existing and column.nullable and column.server_default is None:
+                ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+        for index in table.indexes:
+            index.create(bind=connection, checkfirst=True)  # No-op when the index already exists
+
+
+def _check_post_text_storage(connection):
+    """
+    Disables post text compression while `posts.text` is still a TEXT column,
+    which cannot hold compressed bytes. SQLite accepts bytes in any column.
+    """
+    from models.types import CompressedText
+    if connection.dialect.name == "sqlite" or not CompressedText.enabled:
+        return
+    column = next(c for c in inspect(connection).get_columns("posts") if c["name"] == "text")
+    if column["type"].python_type is not bytes:
+        CompressedText.enabled = False
+        logger.warning(
+            "posts.text is not a binary column yet; post compression is disabled until "
+            "`python -m core.migrations compress-posts` has been run"
+        )
+
+
+def init_db() -> bool:
     """
     Initializes the database by importing model definitions
     and creating the associated tables if they don't exist.
 
     This function is typically called during application startup.
+
+    Returns:
+        bool: True if schema DDL was run, False if the schema fingerprint was current.
     """
-    import models.user_model  # Ensures User model is registered
-    import models.post_model  # Ensures Post model is registered
-    Base.metadata.create_all(bind=engine)  # Creates all tables from Base subclasses
+    with engine.begin() as connection:
+        return _sync_schema(connection)
+
+
+async def init_db_async() -> bool:
+    """
+    Async-mode counterpart of `init_db`, running the same DDL through the AsyncEngine.
+    """
+    async with async_engine.begin() as connection:
+        return await connection.run_sync(_sync_schema)
+
+
+def warm_up_pools(count: int) -> int:
+    """
+    Opens up to `count` connections in the pool of the primary and of each
+    replica, so that the first requests do not pay for connection setup.
+
+    Args:
+        count (int): Connections to open per pool; capped at DB_POOL_SIZE.
+
+    Returns:
+        int: Number of connections opened.
+    """
+    opened = 0
+    for target in [engine, *(replicas.engines if replicas is not None else ())]:
+        connections = [target.connect() for _ in range(min(count, settings.DB_POOL_SIZE))]
+        for connection in connections:
+            connection.close()  # Returns the connection to the pool, still open
+        opened += len(connections)
+    return opened
+
+
+async def warm_up_pools_async(count: int) -> int:
+    """
+    Async-mode counterpart of `warm_up_pools`; each pool's connections are opened concurrently.
+    """
+    opened = 0
+    targets = [async_engine, *(AsyncEngine(replica) for replica in (async_replicas.engines if async_replicas else ()))]
+    for target in targets:
+        connections = await asyncio.gather(*(target.connect() for _ in range(min(count, settings.DB_POOL_SIZE))))
+        for connection in connections:
+            await connection.close()
+        opened += len(connections)
+    return opened
+
+
+def dispose_inherited_pools():
+    """
+    Forgets the pooled connections a forked worker inherited from its parent,
+    without closing them (they still belong to the parent), so the worker opens
+    its own. Called by serve.py in each worker right after the fork.
+    """
+    targets = [engine, *(replicas.engines if replicas is not None else ())]
+    if async_engine is not None:
+        targets += [async_engine.sync_engine, *(async_replicas.engines if async_replicas else ())]
+    for target in targets:
+        target.dispose(close=False)
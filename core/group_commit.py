@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from queue import Empty, SimpleQueue
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# What a batch writer returns: one result per item, and the post-commit side effects or None
+WriteResult = tuple[list, Optional[Callable[[], None]]]
+
+
+class GroupCommitter:
+    """
+    Collects writes submitted by concurrent requests and hands them to a
+    batch writer together, so that many writes share one transaction.
+
+    A background thread waits for the first item, then keeps collecting for
+    `window_seconds` or until `max_batch` items are queued, and calls
+    `write_batch` with all of them. The writer commits the batch and returns
+    one result per item, in order, together with the side effects to run once
+    the commit succeeded (or None); each caller receives its own result
+    through a Future. If the writer raises, nothing was committed and the items
+    of that batch are written again one by one, so only the callers whose own
+    item fails get an exception. The side effects run once per committed
+    batch; their errors are logged and never cause the batch to be rewritten.
+
+    Attributes:
+        write_batch (Callable[[list], WriteResult]): Commits a batch; see above.
+        window_seconds (float): How long a batch stays open after its first item arrived.
+        max_batch (int): Largest number of items written together.
+    """
+
+    def __init__(
+            self, write_batch: Callable[[list], WriteResult], window_seconds: float = 0.002, max_batch: int = 100,
+    ):
+        """
+        Initializes the committer. The writer thread is started on first use.
+
+        Args:
+            write_batch (Callable[[list], WriteResult]): Commits a batch and returns one result
+                per item, and the side effects to run after the commit.
+            window_seconds (float): How long a batch stays open after its first item arrived.
+            max_batch (int): Largest number of items written together.
+        """
+        self.write_batch = write_batch
+        self.window_seconds = window_seconds
+        self.max_batch = max(1, max_batch)
+        self.queue: SimpleQueue = SimpleQueue()
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.pid: Optional[int] = None
+
+    def start(self):
+        """
+        Starts the writer thread, once per process (forked workers start their own).
+        """
+        with self.lock:
+            if self.thread is not None and self.pid == os.getpid():
+                return
+            self.queue = SimpleQueue()
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+            self.thread.start()
+
+    def shutdown(self):
+        """
+        Writes the items still queued and stops the writer thread.
+        """
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None and self.pid == os.getpid():
+            self.queue.put(None)
+            thread.join()
+
+    def submit(self, item: Any) -> Future:
+        """
+        Queues an item for the next batch.
+
+        Returns:
+            Future: Future resolving to the writer's result for this item.
+        """
+        if self.thread is None or self.pid != os.getpid():
+            self.start()
+        future = Future()
+        self.queue.put((item, future))
+        return future
+
+    def write(self, item: Any) -> Any:
+        """
+        Queues an item and blocks the calling thread until its batch is committed.
+        """
+        return self.submit(item).result()
+
+    async def write_async(self, item: Any) -> Any:
+        """
+        Awaitable variant of `write` that does not block the event loop.
+        """
+        return await asyncio.wrap_future(self.submit(item))
+
+    def _collect(self, first: tuple) -> tuple[list, bool]:
+        """
+        Gathers the items of one batch, starting with `first`.
+
+        Returns:
+            tuple[list, bool]: The (item, future) pairs, and whether shutdown was requested.
+        """
+        batch = [first]
+        deadline = time.monotonic() + self.window_seconds
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except Empty:
+                break
+            if entry is None:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self.queue.get()
+            if first is None:
+                break
+            batch, stopping = self._collect(first)
+            items = [item for item, _ in batch]
+            try:
+                results, after_commit = self.write_batch(items)
+            except Exception as exc:
+                if len(batch) == 1:
+                    logger.exception("Group commit of 1 item failed")
+                    batch[0][1].set_exception(exc)
+                else:
+                    logger.warning("Group commit of %d items failed; writing them one by one", len(items))
+                    self._write_each(batch)
+                continue
+            self._after_commit(after_commit)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def _write_each(self, batch: list):
+        """
+        Writes the items of a failed batch in batches of one, isolating the
+        items that fail from those that can be written.
+        """
+        for item, future in batch:
+            try:
+                results, after_commit = self.write_batch([item])
+            except Exception as exc:
+                logger.exception("Group commit item failed")
+                future.set_exception(exc)
+                continue
+            self._after_commit(after_commit)
+            future.set_result(results[0])
+
+    @staticmethod
+    def _after_commit(after_commit: Optional[Callable[[], None]]):
+        # The batch is committed: a failing side effect must not fail (or rewrite) its items
+        if after_commit is None:
+            return
+        try:
+            after_commit()
+        except Exception:
+            logger.exception("Side effects of a committed group commit failed")
@@ -0,0 +1,193 @@
+import asyncio
+import math
+import multiprocessing
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from threading import BoundedSemaphore
+from typing import TYPE_CHECKING, Callable, Optional
+
+# Worker processes import this module to unpickle their tasks, so it avoids
+# importing FastAPI, passlib and bcrypt at module level to keep them fast to spawn
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+
+@lru_cache(maxsize=8)
+def crypt_context(rounds: int) -> "CryptContext":
+    """
+    Returns a bcrypt CryptContext hashing with `rounds`, which reports hashes of
+    a lower cost through `needs_update`. Stronger hashes are left alone, so a
+    stored hash is never rewritten to a weaker one. Cached per process; passlib
+    and bcrypt are only imported by the first call, keeping them out of startup.
+
+    Args:
+        rounds (int): bcrypt cost factor (log2 of the iteration count).
+
+    Returns:
+        CryptContext: Context hashing and verifying with the given cost.
+    """
+    from passlib.context import CryptContext
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+    )
+
+
+def _hash(password: str, rounds: int) -> str:
+    """
+    Worker-side password hashing. Must stay a module-level function so it can
+    be sent to the process pool.
+    """
+    return crypt_context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str, rounds: int) -> tuple[bool, Optional[str]]:
+    """
+    Worker-side password verification. Returns whether the password matches and,
+    when the stored hash uses a lower cost, a replacement hash with `rounds`.
+    """
+    return crypt_context(rounds).verify_and_update(password, hashed_password)
+
+
+def _noop():
+    """
+    Task used to start pool workers ahead of the first real request.
+    """
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification on a dedicated process pool.
+
+    bcrypt is deliberately CPU-heavy; running it in separate processes keeps
+    login and signup bursts from competing with read traffic for the GIL and
+    for the request threadpool. The number of outstanding jobs is bounded,
+    and callers beyond that limit are rejected immediately.
+
+    Attributes:
+        rounds (int): bcrypt cost used for new hashes.
+        pool_size (int): Number of worker processes; 0 hashes inline in the caller.
+        queue_limit (int): Jobs allowed to wait for a free worker.
+    """
+
+    def __init__(self, rounds: int = 12, pool_size: int = 0, queue_limit: int = 0):
+        """
+        Initializes the hasher. The pool itself is started by `start`.
+
+        Args:
+            rounds (int): bcrypt cost used for new hashes.
+            pool_size (int): Number of worker processes; 0 hashes inline in the caller.
+            queue_limit (int): Jobs allowed to wait for a free worker.
+        """
+        self.rounds = rounds
+        self.pool_size = pool_size
+        self.queue_limit = queue_limit
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.slots = BoundedSemaphore(max(1, pool_size + queue_limit))
+
+    def start(self):
+        """
+        Starts the worker processes and waits until each one is up.
+        Workers are spawned rather than forked, so they do not inherit the
+        server's threads or open connections.
+        """
+        if self.pool_size <= 0 or self.executor is not None:
+            return
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.pool_size,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        for future in [self.executor.submit(_noop) for _ in range(self.pool_size)]:
+            future.result()
+
+    def shutdown(self):
+        """
+        Stops the worker processes, cancelling jobs that have not started.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """
+        Schedules `fn(*args)` on the pool, or runs it inline without a pool.
+
+        Raises:
+            HTTPException: If the pool and its queue are full (status code 503).
+
+        Returns:
+            Future: Future resolving to the function's result.
+        """
+        if self.executor is None:
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as exc:
+                future.set_exception(exc)
+            return future
+
+        if not self.slots.acquire(blocking=False):
+            from fastapi import HTTPException
+            raise HTTPException(
+                status_code=503,
+                detail="Authentication service is busy, try again later",
+                headers={"Retry-After": "1"},
+            )
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def hash(self, password: str) -> str:
+        """
+        Hashes a password on the pool, blocking the calling thread until done.
+        """
+        return self.submit(_hash, password, self.rounds).result()
+
+    def verify_and_update(self, password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        """
+        Verifies a password on the pool, blocking the calling thread until done.
+        The second item is a rehashed password when the stored cost is below `rounds`.
+        """
+        return self.submit(_verify_and_update, password, hashed_password, self.rounds).result()
+
+    async def hash_async(self, password: str) -> str:
+        """
+        Awaitable variant of `hash` that does not block the event loop.
+        """
+        return await asyncio.wrap_future(self.submit(_hash, password, self.rounds))
+
+    async def verify_and_update_async(self, password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        """
+        Awaitable variant of `verify_and_update` that does not block the event loop.
+        """
+        return await asyncio.wrap_future(self.submit(_verify_and_update, password, hashed_password, self.rounds))
+
+
+def calibrate_bcrypt_rounds(target_ms: float, min_rounds: int = 10, max_rounds: int = 16, probe_rounds: int = 8) -> int:
+    """
+    Picks the highest bcrypt cost whose hashing time stays within `target_ms` on this machine.
+
+    Each extra round doubles the work, so a fast hash at `probe_rounds` is timed
+    and extrapolated instead of trying expensive costs directly.
+
+    Args:
+        target_ms (float): Desired time for one hash in milliseconds.
+        min_rounds (int): Lowest cost ever returned, regardless of hardware speed.
+        max_rounds (int): Highest cost ever returned.
+        probe_rounds (int): Cost used for the timing probe.
+
+    Returns:
+        int: The calibrated bcrypt cost.
+    """
+    context = crypt_context(probe_rounds)
+    timings = []
+    for _ in range(3):
+        started = time.perf_counter()
+        context.hash("calibration-password")
+        timings.append(time.perf_counter() - started)
+    probe_ms = min(timings) * 1000
+    rounds = probe_rounds + math.floor(math.log2(max(target_ms, probe_ms) / probe_ms))
+    return max(min_rounds, min(max_rounds, rounds))
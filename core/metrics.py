@@ -0,0 +1,236 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Metrics are plain counters, gauges and histograms kept per worker process;
+values that already live elsewhere (cache and pool statistics) are read by
+collectors only when /metrics is scraped, so they cost nothing per request.
+"""
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+# Latency buckets in seconds, for whole requests and for single queries
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    """
+    Base class of the metric types: a name, help text and label names, with one
+    value per combination of label values. Thread-safe.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Counter(_Metric):
+    """
+    A monotonically increasing count.
+    """
+
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """
+    A value that can go up and down.
+    """
+
+    kind = "gauge"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """
+    Observations counted into cumulative buckets, with their sum and count.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = REQUEST_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # Per-bucket counts (the last one is +Inf), then sum
+                state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = [(labels, list(state)) for labels, state in self._values.items()]
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="%s"' % le)
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(state[-1])}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+class Registry:
+    """
+    The set of metrics and scrape-time collectors rendered by /metrics.
+
+    A collector is a callable returning (name, kind, documentation, samples)
+    tuples, where samples are (labels dict, value) pairs.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[tuple]]):
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        Returns every metric in the Prometheus text exposition format (version 0.0.4).
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for collector in self.collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Global registry of this worker process
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests handled, by route template and status.", ("method", "route", "status"),
+))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Time until the response was complete, by route template.", ("method", "route"),
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled.",
+))
+admission_admitted = registry.register(Counter(
+    "admission_admitted_total", "Requests admitted by admission control, by limit.", ("limit",),
+))
+admission_rejected = registry.register(Counter(
+    "admission_rejected_total", "Requests shed by admission control with a 503, by limit and reason.",
+    ("limit", "reason"),
+))
+admission_queue_wait = registry.register(Histogram(
+    "admission_queue_wait_seconds", "Time admitted requests waited for a slot, by limit.", ("limit",),
+))
+admission_in_flight = registry.register(Gauge(
+    "admission_in_flight", "Requests holding an admission slot, by limit.", ("limit",),
+))
+admission_queued = registry.register(Gauge(
+    "admission_queued", "Requests waiting for an admission slot, by limit.", ("limit",),
+))
+rate_limited = registry.register(Counter(
+    "rate_limited_total", "Requests rejected by a per-user rate limit with a 429, by route.", ("route",),
+))
+db_queries = registry.register(Counter(
+    "db_queries_total", "SQL statements executed.",
+))
+db_query_duration = registry.register(Histogram(
+    "db_query_duration_seconds", "Time spent executing single SQL statements.", buckets=QUERY_BUCKETS,
+))
+db_slow_queries = registry.register(Counter(
+    "db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS, by route.", ("route",),
+))
+profiles_written = registry.register(Counter(
+    "profiles_written_total", "Request profiles written, by trigger (header or sampled).", ("trigger",),
+))
+
+
+@dataclass
+class RequestStats:
+    """
+    Work done on behalf of the current request, reported in its Server-Timing header.
+
+    Attributes:
+        db_queries (int): SQL statements executed.
+        db_seconds (float): Time spent executing them.
+    """
+    db_queries: int = 0
+    db_seconds: float = 0.0
+
+
+# Stats of the request being handled; the object is shared with the threadpool
+# threads running sync routes, since they receive a copy of this context
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+# ASGI scope of the request being handled, set by core.middleware.ProfilingMiddleware
+# when profiling or the slow query log is enabled; the router adds the matched route to it
+request_scope: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+
+
+def record_query(seconds: float):
+    """
+    Accounts one executed SQL statement, globally and to the current request.
+    """
+    db_queries.inc()
+    db_query_duration.observe(seconds)
+    stats = request_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_seconds += seconds
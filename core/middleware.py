@@ -0,0 +1,294 @@
+import itertools
+import logging
+import os
+import random
+import re
+import time
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from core.admission import AdmissionController, Rejected
+from core.compression import Compressor, encoded_etag, is_compressible, negotiate
+from core.metrics import (
+    RequestStats, http_request_duration, http_requests, http_requests_in_flight, profiles_written, request_scope,
+    request_stats,
+)
+from core.profiling import PROFILE_HEADER, ProfileSession, StackSampler, profile_session, verify_token, write_profile
+
+logger = logging.getLogger(__name__)
+
+
+def route_template(scope) -> str:
+    """
+    Returns the path template of the route that handled a request, e.g.
+    /posts/{post_id}, including the prefix of the router it was included from.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "<unmatched>"
+    # Depending on the FastAPI version, route.path may lack the router prefix;
+    # the prefix is whatever precedes the route's own segments in the request path
+    template = route.path.split("/")[1:]
+    actual = scope["path"].split("/")
+    return "/".join(actual[:max(1, len(actual) - len(template))] + template)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, status counts and in-flight
+    requests, and adding a Server-Timing header with the time spent in the
+    application and in the database for each response.
+
+    Routes are labelled by their template (e.g. /posts/{post_id}), so the number
+    of label values stays bounded; requests that match no route share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                timing = (
+                    f'app;dur={elapsed_ms:.1f}, '
+                    f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.db_queries} queries"'
+                )
+                message["headers"] = list(message.get("headers", ())) + [(b"server-timing", timing.encode())]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            http_requests_in_flight.dec()
+            request_stats.reset(token)
+            route = route_template(scope)
+            http_requests.inc(scope["method"], route, str(status))
+            http_request_duration.observe(time.perf_counter() - started, scope["method"], route)
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying admission control (see `core.admission`). Each
+    request waits for a slot of the concurrency limiter of its path prefix, or
+    is answered at once with a 503 and a Retry-After header when the limiter
+    sheds it, so excess load is turned away before it queues for threads,
+    hashing workers or database connections.
+    """
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        limiter = self.controller.limiter_for(scope["path"]) if scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire()
+        except Rejected as rejection:
+            response = JSONResponse(
+                {"detail": "Server is busy, try again later"},
+                status_code=503,
+                headers={"Retry-After": str(rejection.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - started)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing response bodies with the best codec the
+    client accepts (see `core.compression.negotiate`).
+
+    A single-message body is compressed whole, with a correct Content-Length,
+    when it reaches `min_bytes`; a streamed body is compressed incrementally
+    and flushed after every message, so each chunk reaches the client as soon
+    as the application produces it. Responses that already carry a
+    Content-Encoding (e.g. precompressed cache entries) or whose media type
+    does not compress well are passed through untouched. Large chunks are
+    compressed in the thread pool to keep the event loop responsive.
+    """
+
+    # Chunks at least this large are compressed off the event loop; the codecs release the GIL
+    OFFLOAD_BYTES = 64 * 1024
+
+    def __init__(self, app, codecs: list[str], levels: dict[str, int], min_bytes: int):
+        """
+        Initializes the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            codecs (list[str]): Codecs offered, preferred first.
+            levels (dict[str, int]): Compression level by codec.
+            min_bytes (int): Smallest single-message body that gets compressed.
+        """
+        self.app = app
+        self.codecs = codecs
+        self.levels = levels
+        self.min_bytes = min_bytes
+
+    async def __call__(self, scope, receive, send):
+        codec = None
+        if scope["type"] == "http":
+            codec = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.codecs)
+        if codec is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+
+        async def encode(method, data: bytes) -> bytes:
+            if len(data) >= self.OFFLOAD_BYTES:
+                return await run_in_threadpool(method, data)
+            return method(data)
+
+        async def send_compressed(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                # Held back until the first body message shows whether and how to compress
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            if start is None:
+                # Later messages of a streamed body
+                if compressor is not None:
+                    method = compressor.flush if message.get("more_body", False) else compressor.finish
+                    message = {**message, "body": await encode(method, message.get("body", b""))}
+                await send(message)
+                return
+
+            response_start, start = start, None
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = MutableHeaders(raw=list(response_start.get("headers", ())))
+            if (
+                response_start["status"] in (204, 304)
+                or "content-encoding" in headers
+                or not is_compressible(headers.get("content-type", ""))
+                or (not more_body and len(body) < self.min_bytes)
+            ):
+                await send(response_start)
+                await send(message)
+                return
+
+            compressor = Compressor(codec, self.levels[codec])
+            headers["Content-Encoding"] = codec
+            headers.add_vary_header("Accept-Encoding")
+            if "etag" in headers:
+                headers["ETag"] = encoded_etag(headers["etag"], codec)
+            if more_body:
+                # The compressed length of a stream is not known in advance
+                del headers["Content-Length"]
+                body = await encode(compressor.flush, body)
+            else:
+                body = await encode(compressor.finish, body)
+                headers["Content-Length"] = str(len(body))
+            await send({**response_start, "headers": headers.raw})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware publishing the scope of each request for the slow query
+    log (see `core.slow_queries`), and profiling the requests that carry a
+    valid X-Profile token or are picked at `sample_rate` (see `core.profiling`).
+
+    The collapsed stacks of a profiled request are written to `directory` once
+    the request is over. A client that asked for the profile gets the file name
+    in the X-Profile-Id response header.
+    """
+
+    def __init__(self, app, sampler: StackSampler, secret: str, sample_rate: float, directory: str):
+        self.app = app
+        self.sampler = sampler
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.sequence = itertools.count(1)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = request_scope.set(scope)
+        try:
+            trigger = self._trigger(scope)
+            if trigger is None:
+                await self.app(scope, receive, send)
+            else:
+                await self._profile(scope, receive, send, trigger)
+        finally:
+            request_scope.reset(token)
+
+    def _trigger(self, scope) -> Optional[str]:
+        if self.secret:
+            token = Headers(scope=scope).get(PROFILE_HEADER)
+            if token is not None and verify_token(self.secret, token):
+                return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    def _file_name(self, scope, number: int) -> str:
+        route = re.sub(r"[^A-Za-z0-9]+", "_", route_template(scope)).strip("_") or "root"
+        return f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{number}-{scope['method']}-{route}"
+
+    async def _profile(self, scope, receive, send, trigger: str):
+        session = ProfileSession()
+        number = next(self.sequence)
+        name = None
+
+        async def send_with_profile_id(message):
+            nonlocal name
+            if message["type"] == "http.response.start":
+                # The route is known once the router has matched the request
+                name = self._file_name(scope, number)
+                if trigger == "header":
+                    MutableHeaders(scope=message).append("X-Profile-Id", name)
+            await send(message)
+
+        token = profile_session.set(session)
+        self.sampler.start(session)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            self.sampler.stop(session)
+            profile_session.reset(token)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            path = await run_in_threadpool(
+                write_profile, self.directory, name or self._file_name(scope, number), session.samples,
+            )
+            profiles_written.inc(trigger)
+            logger.info(
+                "Profile of %s %s (%.0f ms, %d samples) written to %s",
+                scope["method"], scope["path"], elapsed_ms, sum(session.samples.values()), path,
+            )
@@ -0,0 +1,198 @@
+"""
+Maintenance commands for schema changes that `init_db` cannot apply by itself,
+because `create_all` never alters existing tables.
+
+Usage:
+    python -m core.migrations compress-posts [--batch-size 500]
+    python -m core.migrations backfill-previews [--batch-size 500]
+    python -m core.migrations backfill-search [--batch-size 500]
+"""
+import argparse
+import logging
+from sqlalchemy import LargeBinary, bindparam, column, inspect, select, table, text, update
+from core.database import engine, init_db
+from models.types import CompressedText
+from services.post_service import post_row
+from services.search_service import SqlSearchBackend
+
+logger = logging.getLogger(__name__)
+
+
+def migrate_post_text_column(connection) -> bool:
+    """
+    Converts `posts.text` from TEXT to a binary column so it can hold
+    compressed values. Existing rows keep their UTF-8 bytes, which
+    `CompressedText` reads as uncompressed text. SQLite needs no change.
+
+    Returns:
+        bool: True if the column was altered.
+    """
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        return False
+    current = next(c for c in inspect(connection).get_columns("posts") if c["name"] == "text")
+    if current["type"].python_type is bytes:
+        return False
+    if dialect == "mysql":
+        connection.execute(text("ALTER TABLE posts MODIFY text MEDIUMBLOB NOT NULL"))
+    elif dialect == "postgresql":
+        connection.execute(text("ALTER TABLE posts ALTER COLUMN text TYPE BYTEA USING convert_to(text, 'UTF8')"))
+    else:
+        raise RuntimeError(f"Don't know how to migrate posts.text on {dialect}")
+    return True
+
+
+def backfill_compressed_posts(batch_size: int = 500) -> tuple[int, int]:
+    """
+    Rewrites existing post texts in their compressed representation, walking
+    the table by primary key in batches of `batch_size`, one transaction each.
+    Rows that are already compressed, or too small to be, are left alone.
+
+    Returns:
+        tuple[int, int]: Rows scanned and rows rewritten.
+    """
+    # Raw view of the table, so stored bytes are read without decoding them
+    posts = table("posts", column("id"), column("text", LargeBinary()))
+    scanned = rewritten = 0
+    last_id = 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                select(posts.c.id, posts.c.text).where(posts.c.id > last_id).order_by(posts.c.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            updates = []
+            for post_id, stored in rows:
+                stored = stored.encode("utf-8") if isinstance(stored, str) else bytes(stored)
+                encoded = CompressedText.encode(CompressedText.decode(stored))
+                if encoded != stored:
+                    updates.append({"post_id": post_id, "encoded": encoded})
+            if updates:
+                connection.execute(
+                    update(posts).where(posts.c.id == bindparam("post_id")).values(text=bindparam("encoded")),
+                    updates,
+                )
+            scanned += len(rows)
+            rewritten += len(updates)
+            last_id = rows[-1][0]
+        logger.info("Backfill progress: %s rows scanned, %s compressed", scanned, rewritten)
+    return scanned, rewritten
+
+
+def backfill_post_previews(batch_size: int = 500) -> int:
+    """
+    Fills the preview and text_length columns of posts created before they
+    existed (`init_db` adds the columns themselves), in id-ordered batches of
+    `batch_size`, one transaction each.
+
+    Returns:
+        int: Number of posts updated.
+    """
+    posts = table("posts", column("id"), column("text", CompressedText()), column("preview"), column("text_length"))
+    updated = 0
+    last_id = 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                select(posts.c.id, posts.c.text)
+                .where(posts.c.id > last_id, posts.c.preview.is_(None))
+                .order_by(posts.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            values = []
+            for post_id, post_text in rows:
+                row = post_row(0, post_text)
+                values.append({"post_id": post_id, "new_preview": row["preview"], "new_length": row["text_length"]})
+            connection.execute(
+                update(posts)
+                .where(posts.c.id == bindparam("post_id"))
+                .values(preview=bindparam("new_preview"), text_length=bindparam("new_length")),
+                values,
+            )
+            updated += len(rows)
+            last_id = rows[-1][0]
+        logger.info("Backfill progress: %s previews written", updated)
+    return updated
+
+
+def backfill_search_index(batch_size: int = 500) -> int:
+    """
+    Copies posts that have no row in the `post_search` table of the SQL search
+    backend into it, in id-ordered batches of `batch_size`, one transaction each.
+    New posts are indexed by the write paths themselves.
+
+    Returns:
+        int: Number of posts indexed.
+    """
+    SqlSearchBackend().start()
+    dialect = engine.dialect.name
+    key = "rowid" if dialect == "sqlite" else "post_id"
+    posts = table("posts", column("id"), column("user_id"), column("text", CompressedText()))
+    indexed = 0
+    last_id = 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                select(posts.c.id, posts.c.user_id, posts.c.text)
+                .where(posts.c.id > last_id)
+                .order_by(posts.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            present = set(connection.scalars(
+                text(f"SELECT {key} FROM post_search WHERE {key} BETWEEN :first AND :last"),
+                {"first": rows[0][0], "last": rows[-1][0]},
+            ))
+            missing = [
+                {"post_id": post_id, "user_id": user_id, "body": post_text}
+                for post_id, user_id, post_text in rows if post_id not in present
+            ]
+            if missing:
+                connection.execute(SqlSearchBackend.INSERT[dialect], missing)
+            indexed += len(missing)
+            last_id = rows[-1][0]
+        logger.info("Backfill progress: %s posts indexed", indexed)
+    return indexed
+
+
+def compress_posts(batch_size: int):
+    """
+    Migrates the post text column and compresses existing rows.
+    """
+    init_db()
+    with engine.begin() as connection:
+        if migrate_post_text_column(connection):
+            logger.info("posts.text converted to a binary column")
+    CompressedText.enabled = True
+    scanned, rewritten = backfill_compressed_posts(batch_size)
+    logger.info("Done: %s rows scanned, %s compressed", scanned, rewritten)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    compress = commands.add_parser("compress-posts", help="Store post texts compressed, including existing rows")
+    compress.add_argument("--batch-size", type=int, default=500)
+    previews = commands.add_parser("backfill-previews", help="Write previews of posts created before they existed")
+    previews.add_argument("--batch-size", type=int, default=500)
+    search = commands.add_parser("backfill-search", help="Index existing posts for SEARCH_BACKEND=sql")
+    search.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "compress-posts":
+        compress_posts(args.batch_size)
+    elif args.command == "backfill-previews":
+        init_db()
+        logger.info("Done: %s previews written", backfill_post_previews(args.batch_size))
+    elif args.command == "backfill-search":
+        init_db()
+        logger.info("Done: %s posts indexed", backfill_search_index(args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import threading
+import time
+from dataclasses import asdict, dataclass
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+@dataclass
+class PoolStats:
+    """
+    Checkout counters of one connection pool since process start.
+
+    Attributes:
+        checkouts (int): Connections handed out.
+        timeouts (int): Checkouts that gave up after DB_POOL_TIMEOUT.
+        wait_seconds_total (float): Time spent waiting for connections, including
+            opening new ones when the pool may still grow.
+        wait_seconds_max (float): Longest single checkout wait.
+        peak_checked_out (int): Highest number of connections in use at once.
+    """
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+    peak_checked_out: int = 0
+
+
+class _InstrumentedPoolMixin:
+    """
+    Times every checkout of a queue pool, so that pool sizing can be based on
+    how long requests actually wait for a connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+        self._stats_lock = threading.Lock()
+
+    def recreate(self):
+        # Keep the counters when the pool is recreated, e.g. by engine.dispose()
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.stats.timeouts += 1
+            raise
+        waited = time.perf_counter() - started
+        with self._stats_lock:
+            stats = self.stats
+            stats.checkouts += 1
+            stats.wait_seconds_total += waited
+            stats.wait_seconds_max = max(stats.wait_seconds_max, waited)
+            # The connection being handed out is not counted as checked out yet
+            stats.peak_checked_out = max(stats.peak_checked_out, self.checkedout() + 1)
+        return record
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    """
+    QueuePool recording checkout wait times in `stats`.
+    """
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool recording checkout wait times in `stats`.
+    """
+
+
+def pool_status(pool: Pool) -> dict:
+    """
+    Describes the current state of a connection pool.
+
+    Args:
+        pool (Pool): The pool of an engine (`engine.pool`).
+
+    Returns:
+        dict: Configured size and overflow, connections in use, idle and in
+            overflow, and the checkout counters when the pool is instrumented.
+    """
+    status = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            # Negative while the pool has not opened `size` connections yet
+            "overflow": pool.overflow(),
+        })
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update(asdict(stats))
+        status["wait_seconds_avg"] = stats.wait_seconds_total / stats.checkouts if stats.checkouts else 0.0
+    return status
@@ -0,0 +1,261 @@
+"""
+Statistical profiling of single requests.
+
+A request is profiled when it carries a valid X-Profile header (a token signed
+with PROFILE_SECRET) or when it is picked at PROFILE_SAMPLE_RATE. While it runs,
+a sampler thread records the request's stack every PROFILE_INTERVAL_MS and the
+samples are written to PROFILE_DIR as collapsed stacks, one "frame;frame;... count"
+line per distinct stack, the input format of flamegraph.pl, inferno and speedscope.
+
+Samples are wall-clock and follow the request wherever it is:
+- its task running on the event loop (including SQLAlchemy's greenlets),
+- a worker thread running its sync route or dependencies, below a "[thread]" frame,
+- otherwise the coroutines it is suspended in, ending in an "[await]" frame
+  (e.g. waiting for the bcrypt process pool or for an async database driver).
+
+Usage:
+    python -m core.profiling token [--ttl 3600]
+    curl -H "X-Profile: <token>" ...
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import Context, ContextVar
+from threading import Lock, Thread
+from types import FrameType
+from typing import Optional
+from core.config import settings
+
+# Request header carrying a profiling token, see `profile_token`
+PROFILE_HEADER = "x-profile"
+
+# Files under the application root are named relative to it
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ProfileSession:
+    """
+    Samples collected for one request.
+
+    Attributes:
+        task (asyncio.Task): The task handling the request.
+        loop (asyncio.AbstractEventLoop): The loop running the task.
+        thread_id (int): Identifier of the loop's thread.
+        frame (FrameType): Frame of the middleware coroutine that started the
+            session; stacks are cut above it.
+        samples (Counter): Number of samples per collapsed stack.
+    """
+
+    def __init__(self):
+        self.task = asyncio.current_task()
+        self.loop = asyncio.get_running_loop()
+        self.thread_id = threading.get_ident()
+        self.frame = sys._getframe(1)
+        self.samples: Counter = Counter()
+
+
+# Session of the request being profiled; copied into the worker threads of sync routes,
+# which is how the sampler recognizes them
+profile_session: ContextVar[Optional[ProfileSession]] = ContextVar("profile_session", default=None)
+
+
+def _short_path(filename: str) -> str:
+    for marker in ("site-packages" + os.sep, "dist-packages" + os.sep):
+        _, found, path = filename.rpartition(marker)
+        if found:
+            return path
+    if filename.startswith(ROOT + os.sep):
+        return filename[len(ROOT) + 1:]
+    return os.path.basename(filename)
+
+
+class StackSampler:
+    """
+    One thread sampling the stacks of every active `ProfileSession`.
+
+    The thread only runs while sessions are active, so an idle sampler costs
+    nothing. Frame labels are computed once per code object.
+
+    Attributes:
+        interval (float): Seconds between samples.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.sessions: set[ProfileSession] = set()
+        self.labels: dict = {}
+        self.lock = Lock()
+        self.thread: Optional[Thread] = None
+
+    def start(self, session: ProfileSession):
+        """
+        Starts sampling a session, starting the sampler thread if needed.
+        """
+        with self.lock:
+            self.sessions.add(session)
+            if self.thread is None:
+                self.thread = Thread(target=self._run, name="profiler", daemon=True)
+                self.thread.start()
+
+    def stop(self, session: ProfileSession):
+        """
+        Stops sampling a session; the thread exits once no session is left.
+        """
+        with self.lock:
+            self.sessions.discard(session)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                sessions = list(self.sessions)
+                if not sessions:
+                    self.thread = None
+                    return
+            frames = sys._current_frames()
+            frames.pop(own_id, None)
+            for session in sessions:
+                stack = self._sample(session, frames)
+                if stack:
+                    session.samples[";".join(stack)] += 1
+
+    def _sample(self, session: ProfileSession, frames: dict) -> list[str]:
+        loop_frame = frames.get(session.thread_id)
+        if loop_frame is not None and asyncio.current_task(session.loop) is session.task:
+            # The request's task is running on the loop
+            return self._names(self._cut(self._chain(loop_frame), session.frame))
+
+        awaiting = self._cut(self._awaiting(session.task), session.frame)
+        for thread_id, frame in frames.items():
+            if thread_id == session.thread_id:
+                continue
+            worker = self._worker_frames(self._chain(frame), session)
+            if worker is not None:
+                return self._names(awaiting) + ["[thread]"] + self._names(worker)
+        return self._names(awaiting) + ["[await]"]
+
+    @staticmethod
+    def _chain(frame: FrameType) -> list[FrameType]:
+        # Frames of a thread's stack, outermost first
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()
+        return frames
+
+    @staticmethod
+    def _cut(frames: list[FrameType], top: FrameType) -> list[FrameType]:
+        # Drops the event loop and server frames above the session's middleware
+        for index, frame in enumerate(frames):
+            if frame is top:
+                return frames[index:]
+        return frames
+
+    @staticmethod
+    def _awaiting(task: asyncio.Task) -> list[FrameType]:
+        # Frames of a suspended task, from its coroutine down to the innermost await
+        frames = []
+        awaitable = task.get_coro()
+        while awaitable is not None:
+            frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+            if frame is not None:
+                frames.append(frame)
+            awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+        return frames
+
+    @staticmethod
+    def _worker_frames(frames: list[FrameType], session: ProfileSession) -> Optional[list[FrameType]]:
+        # Thread pools that propagate contexts (anyio, used by Starlette for sync routes)
+        # run each call with `context.run(...)` from a frame holding the context
+        for index, frame in enumerate(frames):
+            code = frame.f_code
+            if code.co_name == "run" and "context" in code.co_varnames:
+                context = frame.f_locals.get("context")
+                if isinstance(context, Context) and context.get(profile_session) is session:
+                    return frames[index + 1:]
+                return None
+        return None
+
+    def _names(self, frames: list[FrameType]) -> list[str]:
+        names = []
+        for frame in frames:
+            code = frame.f_code
+            label = self.labels.get(code)
+            if label is None:
+                name = getattr(code, "co_qualname", code.co_name)
+                label = self.labels[code] = f"{name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+            names.append(label)
+        return names
+
+
+def profile_token(secret: str, ttl: float) -> str:
+    """
+    Creates a token for the X-Profile header.
+
+    Args:
+        secret (str): PROFILE_SECRET of the servers that should accept it.
+        ttl (float): Seconds the token stays valid.
+
+    Returns:
+        str: "<expiry>.<signature>", the expiry being a Unix time.
+    """
+    expires = str(int(time.time() + ttl))
+    return f"{expires}.{hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()}"
+
+
+def verify_token(secret: str, token: str) -> bool:
+    """
+    Tells whether an X-Profile token was signed with `secret` and has not expired.
+    """
+    expires, _, signature = token.strip().partition(".")
+    if not secret or not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def write_profile(directory: str, name: str, samples: Counter) -> str:
+    """
+    Writes the samples of a session as collapsed stacks, most frequent first.
+
+    Args:
+        directory (str): Directory of the profile files; created if missing.
+        name (str): File name, without extension.
+        samples (Counter): Samples per collapsed stack.
+
+    Returns:
+        str: Path of the written file.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.collapsed")
+    with open(path, "w") as file:
+        file.writelines(f"{stack} {count}\n" for stack, count in samples.most_common())
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    token = commands.add_parser("token", help="Print an X-Profile token signed with PROFILE_SECRET")
+    token.add_argument("--ttl", type=float, default=3600, help="Seconds the token stays valid")
+    args = parser.parse_args()
+
+    if not settings.PROFILE_SECRET:
+        parser.exit(1, "PROFILE_SECRET is not set\n")
+    print(profile_token(settings.PROFILE_SECRET, args.ttl))
+
+
+# Shared by all profiled requests of a worker process
+sampler = StackSampler(settings.PROFILE_INTERVAL_MS / 1000)
+
+
+if __name__ == "__main__":
+    main()
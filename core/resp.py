@@ -0,0 +1,200 @@
+import socket
+from contextlib import contextmanager
+from queue import Empty, Full, LifoQueue
+from typing import Any, Optional
+from urllib.parse import unquote, urlparse
+
+
+class RespError(Exception):
+    """
+    Error reply returned by a RESP server.
+    """
+
+
+def encode_command(*args) -> bytes:
+    """
+    Encodes a command as a RESP array of bulk strings.
+
+    Args:
+        *args: Command name and arguments; str and int values are UTF-8 encoded.
+
+    Returns:
+        bytes: The wire representation of the command.
+    """
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif isinstance(arg, int):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+class RespConnection:
+    """
+    A blocking connection speaking the Redis serialization protocol (RESP2),
+    over TCP or a Unix domain socket. Not thread-safe; see `RespClient`.
+    """
+
+    def __init__(self, address: Any, timeout: Optional[float] = 5.0):
+        """
+        Opens the connection.
+
+        Args:
+            address (Any): A Unix socket path (str) or a (host, port) tuple.
+            timeout (Optional[float]): Socket timeout in seconds; None blocks indefinitely.
+        """
+        if isinstance(address, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(timeout)
+        self.sock.connect(address)
+        self.reader = self.sock.makefile("rb")
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    def send(self, *commands: tuple):
+        """
+        Writes one or more commands without waiting for replies (pipelining).
+        """
+        self.sock.sendall(b"".join(encode_command(*command) for command in commands))
+
+    def read_reply(self) -> Any:
+        """
+        Reads one reply. Error replies are returned as RespError instances,
+        so a pipelined batch can be read to the end before raising.
+        """
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            return RespError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            return None if length < 0 else [self.read_reply() for _ in range(length)]
+        raise ConnectionError(f"Unexpected RESP reply: {line!r}")
+
+    def execute(self, *commands: tuple) -> list:
+        """
+        Sends commands in one round trip and returns their replies in order.
+
+        Raises:
+            RespError: If any command returned an error reply.
+        """
+        self.send(*commands)
+        replies = [self.read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+
+def parse_address(url: str) -> tuple[Any, Optional[str], int]:
+    """
+    Parses a cache server URL.
+
+    Supported forms are ``redis://[:password@]host[:port][/db]`` and
+    ``unix:///path/to/socket``.
+
+    Returns:
+        tuple: The socket address, the password (or None) and the database number.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "unix":
+        return parsed.path, None, 0
+    if parsed.scheme != "redis":
+        raise ValueError(f"Unsupported cache server URL: {url}")
+    password = unquote(parsed.password) if parsed.password else None
+    database = int(parsed.path.lstrip("/") or 0)
+    return (parsed.hostname or "localhost", parsed.port or 6379), password, database
+
+
+class RespClient:
+    """
+    A small thread-safe pool of RESP connections to one server.
+
+    Attributes:
+        address (Any): Unix socket path or (host, port) tuple.
+        password (Optional[str]): Sent with AUTH on every new connection.
+        database (int): Selected with SELECT on every new connection.
+    """
+
+    def __init__(self, url: str, pool_size: int = 8, timeout: float = 5.0):
+        """
+        Initializes the pool; connections are opened on demand.
+
+        Args:
+            url (str): Server URL, see `parse_address`.
+            pool_size (int): Maximum number of idle connections kept open.
+            timeout (float): Socket timeout in seconds.
+        """
+        self.address, self.password, self.database = parse_address(url)
+        self.timeout = timeout
+        self.idle = LifoQueue(maxsize=pool_size)
+
+    def connect(self, timeout: Optional[float] = None) -> RespConnection:
+        """
+        Opens a new, authenticated connection outside of the pool.
+
+        Args:
+            timeout (Optional[float]): Socket timeout; defaults to the pool's timeout.
+        """
+        connection = RespConnection(self.address, self.timeout if timeout is None else timeout)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.database:
+            setup.append(("SELECT", self.database))
+        if setup:
+            connection.execute(*setup)
+        return connection
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrows a pooled connection. Connections that failed are discarded.
+        """
+        try:
+            connection = self.idle.get_nowait()
+        except Empty:
+            connection = self.connect()
+        try:
+            yield connection
+        except RespError:
+            # The protocol stream is intact after an error reply
+            self._release(connection)
+            raise
+        except BaseException:
+            connection.close()
+            raise
+        else:
+            self._release(connection)
+
+    def _release(self, connection: RespConnection):
+        try:
+            self.idle.put_nowait(connection)
+        except Full:
+            connection.close()
+
+    def execute(self, *commands: tuple) -> list:
+        """
+        Runs commands in one round trip on a pooled connection.
+        """
+        with self.connection() as connection:
+            return connection.execute(*commands)
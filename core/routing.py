@@ -0,0 +1,110 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Optional
+from sqlalchemy import Delete, Insert, Update, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaSet:
+    """
+    Read replicas of the primary database, chosen round-robin among the healthy ones.
+
+    A replica whose connection fails is skipped for `retry_seconds`, after which
+    it is tried again. Users who have just written are kept on the primary for
+    `sticky_seconds`, so they read their own writes despite replication lag.
+    The stickiness is tracked per worker process.
+
+    Attributes:
+        engines (list[Engine]): One engine per replica.
+        sticky_seconds (float): How long a user's reads go to the primary after a write.
+        retry_seconds (float): How long a failed replica is left out.
+    """
+
+    def __init__(self, engines: list[Engine], sticky_seconds: float = 5.0, retry_seconds: float = 30.0):
+        self.engines = engines
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self._next = itertools.count()
+        self._down_until = {}
+        self._sticky = {}
+        self._lock = threading.Lock()
+        for replica in engines:
+            event.listen(replica, "handle_error", self._on_error)
+
+    def _on_error(self, context):
+        # Disconnects and failed connection attempts take the replica out of rotation
+        if context.is_disconnect or context.connection is None:
+            replica = context.engine
+            self._down_until[replica] = time.monotonic() + self.retry_seconds
+            logger.warning("Read replica %s failed; skipping it for %ss", replica.url, self.retry_seconds)
+
+    def choose(self) -> Optional[Engine]:
+        """
+        Returns the next healthy replica, or None if every replica is down.
+        """
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            replica = self.engines[next(self._next) % len(self.engines)]
+            if self._down_until.get(replica, 0) <= now:
+                return replica
+        return None
+
+    def stick(self, user_id: int):
+        """
+        Sends the user's reads to the primary for the next `sticky_seconds`.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._sticky[user_id] = now + self.sticky_seconds
+            if len(self._sticky) > 10000:
+                # Forget users whose window has passed, so the map stays small
+                self._sticky = {key: until for key, until in self._sticky.items() if until > now}
+
+    def is_sticky(self, user_id: Optional[int]) -> bool:
+        """
+        Whether the user wrote recently enough that replicas may lag behind.
+        """
+        return user_id is not None and self._sticky.get(user_id, 0) > time.monotonic()
+
+
+class RoutingSession(Session):
+    """
+    Session sending writes to its bind (the primary) and reads to the read
+    replicas in `info["replicas"]`.
+
+    Reads stay on the primary once the session has written anything, and for
+    users marked as sticky by an earlier write. Routes set `info["user_id"]`
+    (see `core.auth.get_current_user`) so that stickiness can apply. Used
+    directly by sync code, and as the `sync_session_class` of async sessions.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        replicas: Optional[ReplicaSet] = self.info.get("replicas")
+        if replicas is None:
+            return primary
+
+        writes = self._flushing or isinstance(clause, (Insert, Update, Delete))
+        # SELECT ... FOR UPDATE takes locks, which only means something on the primary
+        locks = getattr(clause, "_for_update_arg", None) is not None
+        if writes or locks:
+            self.info["wrote"] = True
+            return primary
+        if self.info.get("wrote") or replicas.is_sticky(self.info.get("user_id")):
+            return primary
+        return replicas.choose() or primary
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _stick_to_primary(session: Session):
+    """
+    Keeps the user who has just committed a write on the primary for a while.
+    """
+    replicas = session.info.get("replicas")
+    if replicas is not None and session.info.get("wrote") and session.info.get("user_id") is not None:
+        replicas.stick(session.info["user_id"])
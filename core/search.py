@@ -0,0 +1,290 @@
+import math
+import re
+from collections import OrderedDict
+from threading import Lock
+from typing import Hashable, Iterable, Optional
+
+# Word characters of any script; case is folded before matching
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Longer tokens are almost always encoded blobs or URLs and are not indexed
+MAX_TOKEN_LENGTH = 64
+
+# BM25 parameters: term-frequency saturation and document-length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits a text into lowercase word tokens.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        list[str]: Tokens in order of appearance, repetitions included.
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.casefold()) if len(token) <= MAX_TOKEN_LENGTH]
+
+
+def bm25(
+        term_postings: Iterable[dict[int, int]], lengths: dict[int, int], count: int, average_length: float,
+) -> list[tuple[int, float]]:
+    """
+    Scores documents with BM25.
+
+    Args:
+        term_postings (Iterable[dict[int, int]]): For each query term, document ID -> term frequency.
+        lengths (dict[int, int]): Number of tokens of (at least) every document in `term_postings`.
+        count (int): Number of documents in the collection.
+        average_length (float): Average number of tokens of a document of the collection.
+
+    Returns:
+        list[tuple[int, float]]: (document ID, score) pairs, best first; ties are
+            broken by the newer (higher) document ID.
+    """
+    scores: dict[int, float] = {}
+    for postings in term_postings:
+        if not postings:
+            continue
+        idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+        for doc_id, frequency in postings.items():
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc_id] / average_length)
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+    return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+
+
+def scan(documents: Iterable[tuple[int, str]], terms: Iterable[str]) -> list[tuple[int, float]]:
+    """
+    Ranks documents read once, without indexing them: only the frequencies of
+    the query terms and the lengths of the matching documents are kept, so
+    memory grows with the matches rather than with the collection.
+
+    Args:
+        documents (Iterable[tuple[int, str]]): (document ID, text) of every document of the collection.
+        terms (Iterable[str]): Distinct query terms, as produced by `tokenize`.
+
+    Returns:
+        list[tuple[int, float]]: Same as `DocumentIndex.search` over those documents.
+    """
+    wanted = set(terms)
+    term_postings: dict[str, dict[int, int]] = {term: {} for term in wanted}
+    lengths: dict[int, int] = {}
+    count = total_length = 0
+    for doc_id, text in documents:
+        tokens = tokenize(text)
+        count += 1
+        total_length += len(tokens)
+        for token in tokens:
+            if token in wanted:
+                postings = term_postings[token]
+                postings[doc_id] = postings.get(doc_id, 0) + 1
+                lengths[doc_id] = len(tokens)
+    if not count:
+        return []
+    return bm25(term_postings.values(), lengths, count, total_length / count or 1.0)
+
+
+class DocumentIndex:
+    """
+    An inverted index over one group of documents (one user's posts), ranked with BM25.
+
+    Attributes:
+        postings (dict): Term -> {document ID: term frequency}.
+        terms (dict): Document ID -> distinct terms of the document, used to remove it.
+        lengths (dict): Document ID -> number of tokens.
+        total_length (int): Sum of `lengths`, for the average document length.
+        version (int): Version of the group the index reflects, compared with the
+            database to detect changes made elsewhere.
+        size (int): Number of postings, the unit of the index memory budget.
+        lock (Lock): Held while the index is searched or changed once it is shared.
+    """
+
+    __slots__ = ("postings", "terms", "lengths", "total_length", "version", "size", "lock")
+
+    def __init__(self, version: int = 0):
+        self.postings: dict[str, dict[int, int]] = {}
+        self.terms: dict[int, tuple] = {}
+        self.lengths: dict[int, int] = {}
+        self.total_length = 0
+        self.version = version
+        self.size = 0
+        self.lock = Lock()
+
+    def add(self, doc_id: int, text: str):
+        """
+        Indexes a document; a document already in the index is left unchanged.
+        """
+        if doc_id in self.lengths:
+            return
+        tokens = tokenize(text)
+        frequencies = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+        for term, frequency in frequencies.items():
+            self.postings.setdefault(term, {})[doc_id] = frequency
+        self.terms[doc_id] = tuple(frequencies)
+        self.lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+        self.size += len(frequencies)
+
+    def remove(self, doc_id: int):
+        """
+        Removes a document from the index, if present.
+        """
+        terms = self.terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self.postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(doc_id)
+        self.size -= len(terms)
+
+    def search(self, terms: Iterable[str]) -> list[tuple[int, float]]:
+        """
+        Ranks the documents containing any of the terms.
+
+        Args:
+            terms (Iterable[str]): Distinct query terms, as produced by `tokenize`.
+
+        Returns:
+            list[tuple[int, float]]: (document ID, BM25 score) pairs, best first;
+                ties are broken by the newer (higher) document ID.
+        """
+        count = len(self.lengths)
+        if not count:
+            return []
+        term_postings = [self.postings.get(term, {}) for term in terms]
+        return bm25(term_postings, self.lengths, count, self.total_length / count or 1.0)
+
+
+class InvertedIndex:
+    """
+    Per-key document indexes (one per user) kept within a memory budget.
+
+    The budget counts postings across all keys. When it is exceeded, the
+    least recently searched keys are evicted; their index is rebuilt by the
+    caller on the next search. A single key larger than the whole budget is
+    never kept. All methods are thread-safe: the shared lock only guards the
+    map of keys and the budget, while each key's index is searched and changed
+    under its own lock, so a slow search holds up nothing but that key's writes.
+
+    Attributes:
+        max_postings (int): Budget of postings held across all keys.
+        size (int): Postings currently held.
+        evictions (int): Keys evicted to stay within the budget since startup.
+    """
+
+    def __init__(self, max_postings: int):
+        """
+        Initializes an empty index.
+
+        Args:
+            max_postings (int): Budget of postings held across all keys.
+        """
+        self.max_postings = max_postings
+        self.indexes: OrderedDict[Hashable, DocumentIndex] = OrderedDict()
+        # Postings each held index was last counted with in `size`
+        self.sizes: dict[Hashable, int] = {}
+        self.size = 0
+        self.evictions = 0
+        self.lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.indexes)
+
+    def put(self, key: Hashable, index: DocumentIndex, replace: bool = True) -> bool:
+        """
+        Stores the index of a key, evicting the least recently used keys as needed.
+
+        Args:
+            key (Hashable): The key, e.g. a user ID.
+            index (DocumentIndex): The key's complete index.
+            replace (bool): Whether an index already held for the key is replaced.
+
+        Returns:
+            bool: True if the index is now held.
+        """
+        if index.size > self.max_postings:
+            return False
+        with self.lock:
+            if key in self.indexes:
+                if not replace:
+                    return True
+                self.size -= self.sizes[key]
+            self.indexes[key] = index
+            self.indexes.move_to_end(key)
+            self.sizes[key] = index.size
+            self.size += index.size
+            self._evict()
+        return True
+
+    def discard(self, key: Hashable):
+        """
+        Drops the index of a key.
+        """
+        with self.lock:
+            if self.indexes.pop(key, None) is not None:
+                self.size -= self.sizes.pop(key)
+
+    def update(self, key: Hashable, version: int, added: Iterable[tuple[int, str]], removed: Iterable[int]):
+        """
+        Applies a change that took a key's documents to `version`, provided the
+        held index is at the version just before. Other keys are skipped, as
+        their index is rebuilt from the database when next searched, and so is
+        an index that missed a change, as it no longer matches the database.
+
+        Args:
+            key (Hashable): The key, e.g. a user ID.
+            version (int): Version of the key's documents after the change.
+            added (Iterable[tuple[int, str]]): (document ID, text) of each added document.
+            removed (Iterable[int]): IDs of the removed documents.
+        """
+        with self.lock:
+            index = self.indexes.get(key)
+        if index is None:
+            return
+        with index.lock:
+            if index.version != version - 1:
+                return
+            for doc_id, text in added:
+                index.add(doc_id, text)
+            for doc_id in removed:
+                index.remove(doc_id)
+            index.version = version
+            with self.lock:
+                # Unless it was replaced or evicted meanwhile, which already settled its count
+                if self.indexes.get(key) is index:
+                    self.size += index.size - self.sizes[key]
+                    self.sizes[key] = index.size
+                    self._evict()
+
+    def search(self, key: Hashable, terms: Iterable[str], version: int) -> Optional[list]:
+        """
+        Ranks a key's documents, provided its held index is at `version`.
+
+        Returns:
+            Optional[list]: (document ID, score) pairs as in `DocumentIndex.search`,
+                or None if the key's index is not held or is out of date.
+        """
+        with self.lock:
+            index = self.indexes.get(key)
+            if index is None:
+                return None
+            self.indexes.move_to_end(key)
+        # Scored outside the shared lock; lock order is always index, then shared
+        with index.lock:
+            if index.version != version:
+                return None
+            return index.search(terms)
+
+    def _evict(self):
+        # The most recently used key stays even if it alone exceeds the budget after growing
+        while self.size > self.max_postings and len(self.indexes) > 1:
+            key, _ = self.indexes.popitem(last=False)
+            self.size -= self.sizes.pop(key)
+            self.evictions += 1
@@ -0,0 +1,188 @@
+"""
+Log of SQL statements slower than SLOW_QUERY_MS.
+
+Each slow statement is logged (logger "core.slow_queries", as one JSON object)
+with its duration, parameters and the route of the request that ran it, and
+kept in memory for /metrics/slow-queries (which requires an X-Profile token,
+see core.profiling). Parameters are redacted to their type
+and length unless SLOW_QUERY_LOG_PARAMETERS is set. With SLOW_QUERY_EXPLAIN the plan of
+the statement is captured as well: EXPLAIN runs on a separate connection in a
+background thread, so it never delays the request, and plans are remembered
+per statement text, so a hot slow query is explained once.
+"""
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Optional
+from sqlalchemy.engine import Engine
+from core.config import settings
+from core.metrics import db_slow_queries, request_scope
+from core.middleware import route_template
+
+logger = logging.getLogger(__name__)
+
+# Statements EXPLAIN accepts on every supported database
+EXPLAINABLE = ("select", "with", "insert", "update", "delete")
+
+# EXPLAIN syntax by dialect; SQLite's plain EXPLAIN lists bytecode, not the plan
+EXPLAIN_PREFIXES = {"sqlite": "EXPLAIN QUERY PLAN "}
+
+# Longest parameter value logged as is; longer values are truncated
+MAX_PARAMETER_LENGTH = 200
+
+
+def _short_value(value: Any, keep_values: bool) -> Any:
+    if value is None:
+        return None
+    if not keep_values:
+        if isinstance(value, (str, bytes, bytearray, memoryview)):
+            return f"<{type(value).__name__}, {len(value)}>"
+        return f"<{type(value).__name__}>"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, str) and len(value) > MAX_PARAMETER_LENGTH:
+        return value[:MAX_PARAMETER_LENGTH] + f"... <{len(value)} chars>"
+    return value
+
+
+def format_parameters(parameters: Any, keep_values: bool = False) -> Any:
+    """
+    Returns the DBAPI parameters of a statement in a loggable form.
+
+    Args:
+        parameters (Any): The parameters, a sequence or mapping (or a sequence of them for executemany).
+        keep_values (bool): Keep the values, with binary values replaced by their size and long
+            strings truncated; otherwise each value is replaced by its type and length.
+
+    Returns:
+        Any: The parameters with the same structure.
+    """
+    if isinstance(parameters, dict):
+        return {key: _short_value(value, keep_values) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [format_parameters(value, keep_values) if isinstance(value, (dict, list, tuple))
+                else _short_value(value, keep_values) for value in parameters]
+    return _short_value(parameters, keep_values)
+
+
+class SlowQueryLog:
+    """
+    Records slow statements and captures their plans.
+
+    Attributes:
+        threshold (float): Duration in seconds from which a statement is recorded.
+        explain (bool): Whether plans are captured.
+        keep_parameters (bool): Whether parameter values are recorded, rather than their type and length.
+        records (deque): The most recent records, oldest first.
+    """
+
+    # Statements whose plan is remembered, and explains allowed to wait for the background thread
+    MAX_PLANS = 256
+    MAX_PENDING = 32
+
+    def __init__(self, threshold: float, explain: bool, max_records: int, keep_parameters: bool = False):
+        """
+        Initializes the log.
+
+        Args:
+            threshold (float): Duration in seconds from which a statement is recorded.
+            explain (bool): Whether plans are captured.
+            max_records (int): Records kept in memory.
+            keep_parameters (bool): Record parameter values rather than their type and length.
+        """
+        self.threshold = threshold
+        self.explain = explain
+        self.keep_parameters = keep_parameters
+        self.records: deque = deque(maxlen=max_records)
+        self.plans: OrderedDict = OrderedDict()
+        self.pending = 0
+        self.lock = Lock()
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="slow-query-explain")
+
+    def record(self, engine: Engine, statement: str, parameters: Any, seconds: float, executemany: bool):
+        """
+        Records one slow statement; called from the engine's after_cursor_execute event.
+
+        Args:
+            engine (Engine): A sync engine on the database that ran the statement, used for EXPLAIN.
+            statement (str): The SQL sent to the driver.
+            parameters (Any): Its DBAPI parameters (a sequence of them for executemany).
+            seconds (float): How long it ran.
+            executemany (bool): Whether it ran once per parameter set.
+        """
+        scope = request_scope.get()
+        route = f'{scope["method"]} {route_template(scope)}' if scope is not None else None
+        entry = {
+            "time": round(time.time(), 3),
+            "duration_ms": round(seconds * 1000, 1),
+            "route": route,
+            "statement": statement,
+            "parameters": format_parameters(parameters, self.keep_parameters),
+            "executemany": executemany,
+            "plan": None,
+        }
+        db_slow_queries.inc(route or "<none>")
+
+        if not self.explain or not statement.lstrip().lower().startswith(EXPLAINABLE):
+            self._emit(entry)
+            return
+        with self.lock:
+            plan = self.plans.get(statement)
+            if plan is not None:
+                self.plans.move_to_end(statement)
+            elif self.pending >= self.MAX_PENDING:
+                plan = "not captured: too many statements waiting for EXPLAIN"
+            else:
+                self.pending += 1
+        if plan is not None:
+            self._emit({**entry, "plan": plan})
+            return
+        first = parameters[0] if executemany and parameters else parameters
+        self.executor.submit(self._explain, engine, statement, first, entry)
+
+    def _explain(self, engine: Engine, statement: str, parameters: Any, entry: dict):
+        prefix = EXPLAIN_PREFIXES.get(engine.dialect.name, "EXPLAIN ")
+        try:
+            with engine.connect() as connection:
+                result = connection.exec_driver_sql(prefix + statement, parameters or ())
+                plan = [{key: str(value) for key, value in row._mapping.items()} for row in result]
+            with self.lock:
+                self.plans[statement] = plan
+                if len(self.plans) > self.MAX_PLANS:
+                    self.plans.popitem(last=False)
+        except Exception as exc:
+            plan = f"not captured: {exc.__class__.__name__}: {exc}"
+        finally:
+            with self.lock:
+                self.pending -= 1
+        self._emit({**entry, "plan": plan})
+
+    def _emit(self, entry: dict):
+        self.records.append(entry)
+        logger.warning("Slow query: %s", json.dumps(entry, default=str))
+
+    def recent(self) -> list[dict]:
+        """
+        Returns the records kept in memory, newest first.
+        """
+        return list(reversed(self.records))
+
+
+def create_slow_query_log(
+        threshold_ms: float, explain: bool, max_records: int, keep_parameters: bool = False,
+) -> Optional[SlowQueryLog]:
+    """
+    Creates the slow query log, or returns None when it is disabled (threshold 0).
+    """
+    if threshold_ms <= 0:
+        return None
+    return SlowQueryLog(threshold_ms / 1000, explain, max_records, keep_parameters)
+
+
+# Fed by the engines of core.database; None when SLOW_QUERY_MS is 0
+slow_query_log = create_slow_query_log(
+    settings.SLOW_QUERY_MS, settings.SLOW_QUERY_EXPLAIN, settings.SLOW_QUERY_LOG_SIZE, settings.SLOW_QUERY_LOG_PARAMETERS,
+)
@@ -1,10 +1,44 @@
+import logging
+import time
+
+# Taken before the application modules are imported, for the startup timing breakdown
+STARTED = time.perf_counter()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from core.database import init_db
-from controllers.user_controller import router as user_router
-from controllers.post_controller import router as post_router
+from core.auth import configure_password_hashing, password_hasher
+from core.config import settings
+from services.post_service import post_committer
+from services.search_service import search_backend
+from core.database import init_db, init_db_async, warm_up_pools, warm_up_pools_async
+from core.admission import admission
+from core.compression import response_codecs, response_levels
+from core.middleware import AdmissionMiddleware, CompressionMiddleware, MetricsMiddleware, ProfilingMiddleware
+from core.profiling import sampler
+from core.slow_queries import slow_query_log
+from core.startup import StartupTimer
+from controllers.metrics_controller import router as metrics_router
+
+if settings.ASYNC_MODE:
+    # Async routes backed by the AsyncEngine; no threadpool slot per request
+    from controllers.async_user_controller import router as user_router
+    from controllers.async_post_controller import router as post_router
+else:
+    from controllers.user_controller import router as user_router
+    from controllers.post_controller import router as post_router
+
+logger = logging.getLogger(__name__)
+
+# serve.py sets up logging before it imports the app; under plain `uvicorn main:app`
+# only uvicorn's own loggers are, and the application's INFO messages (startup
+# summary, search warm-up) would be dropped. No-op when logging is already set up.
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(process)d] %(levelname)s %(message)s")
+
+# Durations of the startup phases, logged once the application is ready
+startup_timer = StartupTimer(STARTED)
+startup_timer.record("imports", STARTED)
 
 
 @asynccontextmanager
@@ -21,9 +55,34 @@ async def lifespan(app: FastAPI):
     Yields:
         None
     """
-    init_db()  # Initialize the database (create tables, connect, etc.)
-    print("Таблиці створено.")  # Optional: log to console when DB tables are created
+    # Initialize the database (create tables, connect, etc.); skipped when the
+    # schema fingerprint shows the models have not changed since the last start
+    with startup_timer.phase("schema"):
+        if settings.ASYNC_MODE:
+            schema_changed = await init_db_async()
+        else:
+            schema_changed = init_db()
+    if schema_changed:
+        logger.info("Таблиці створено.")
+    with startup_timer.phase("password hashing"):
+        configure_password_hashing()  # Calibrate bcrypt cost and start the hashing pool
+    with startup_timer.phase("search"):
+        # Create the search table; an in-process index warms up in the background
+        # and logs its own duration, as it does not delay startup
+        search_backend.start()
+    if settings.DB_POOL_WARMUP:
+        # Open database connections now rather than in the first requests
+        with startup_timer.phase("pool warm-up"):
+            if settings.ASYNC_MODE:
+                await warm_up_pools_async(settings.DB_POOL_WARMUP)
+            else:
+                warm_up_pools(settings.DB_POOL_WARMUP)
+    if settings.POSTS_GROUP_COMMIT:
+        post_committer.start()  # Start the thread that writes queued posts in batches
+    logger.info(startup_timer.summary())
     yield
+    post_committer.shutdown()  # Write posts still queued before the process exits
+    password_hasher.shutdown()
 
 
 # Instantiate the FastAPI application
@@ -34,6 +93,21 @@ app = FastAPI(
     lifespan=lifespan  # Attach the lifespan context manager
 )
 
+# Compress response bodies the client accepts compressed. Added first, so it is the
+# innermost middleware and Content-Length / Server-Timing refer to what is actually sent.
+if settings.RESPONSE_COMPRESSION:
+    app.add_middleware(
+        CompressionMiddleware,
+        codecs=response_codecs(),
+        levels=response_levels,
+        min_bytes=settings.RESPONSE_COMPRESSION_MIN_BYTES,
+    )
+
+# Shed load beyond the configured concurrency limits with fast 503s. Added early,
+# so it runs inside CORS and metrics: shed responses keep CORS headers and are counted.
+if settings.ADMISSION_CONTROL:
+    app.add_middleware(AdmissionMiddleware, controller=admission)
+
 # Add CORS middleware to allow cross-origin requests from any domain
 app.add_middleware(
     CORSMiddleware,
@@ -41,10 +115,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all HTTP methods (GET, POST, PUT, etc.)
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["X-Next-Cursor", "Server-Timing", "ETag", "X-Profile-Id"],  # Let browser clients read these headers
 )
 
+# Record per-route latency and per-request database time (see /metrics)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Profile requests on demand or at a sampling rate, and tell the slow query log which
+# route ran a statement. Outermost, so profiles include the other middleware.
+if settings.PROFILE_SECRET or settings.PROFILE_SAMPLE_RATE > 0 or slow_query_log is not None:
+    app.add_middleware(
+        ProfilingMiddleware,
+        sampler=sampler,
+        secret=settings.PROFILE_SECRET,
+        sample_rate=settings.PROFILE_SAMPLE_RATE,
+        directory=settings.PROFILE_DIR,
+    )
+
 # Include the user authentication routes under the "/auth" path
 app.include_router(user_router, prefix="/auth", tags=["Authentication"])
 
 # Include the post management routes under the "/posts" path
 app.include_router(post_router, prefix="/posts", tags=["Posts"])
+
+# Include the operational metrics routes under the "/metrics" path
+app.include_router(metrics_router, prefix="/metrics", tags=["Metrics"])
@@ -1,6 +1,12 @@
-from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Column, Integer, DateTime, ForeignKey, Index, String, func
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import deferred, relationship
 from core.database import Base
+from models.types import CompressedText
+
+# Width of the preview column. Fixed, because the schema is only ever extended with
+# missing columns, never altered: previews are cut to POST_PREVIEW_LENGTH within it.
+PREVIEW_COLUMN_LENGTH = 200
 
 
 class Post(Base):
@@ -11,14 +17,44 @@ class Post(Base):
     along with a timestamp indicating when it was created.
     """
     __tablename__ = "posts"
+    # Composite index backing keyset pagination: lets MySQL walk a user's posts
+    # in (created_at, id) order without a filesort
+    __table_args__ = (Index("ix_posts_user_id_created_at_id", "user_id", "created_at", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     # Foreign key linking this post to a user; cascade deletes on user deletion
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    # Main content of the post
-    text = Column(Text, nullable=False)
-    # Timestamp automatically set to current time when the post is created
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Main content of the post, stored compressed when large. Deferred, so queries
+    # only fetch it when they ask for it with undefer(Post.text).
+    text = deferred(Column(CompressedText(), nullable=False))
+    # Start of the text and its full length in characters, written together with
+    # the text so that post listings never have to read the text itself.
+    # Nullable only for rows created before they existed (see core.migrations).
+    preview = Column(String(PREVIEW_COLUMN_LENGTH), nullable=True)
+    text_length = Column(Integer, nullable=True)
+    # Timestamp automatically set to current time when the post is created.
+    # On SQLite (local stand-in) bound values are truncated to whole seconds so they
+    # compare correctly with CURRENT_TIMESTAMP in keyset conditions, as on MySQL.
+    created_at = Column(
+        DateTime(timezone=True).with_variant(sqlite.DATETIME(truncate_microseconds=True), "sqlite"),
+        server_default=func.now(),
+    )
 
     # Defines a relationship to the User model; allows access to the post's author
     user = relationship("User", backref="posts")
+
+
+class PostVersion(Base):
+    """
+    SQLAlchemy model holding the content version of each user's posts.
+
+    The version is incremented in the same transaction as every write to the
+    user's posts, so it changes exactly when their listing may change. It backs
+    the ETag of /posts/get. Users who never wrote a post have no row (version 0).
+    """
+    __tablename__ = "post_versions"
+
+    # The owner of the posts; the row goes away with the user
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, autoincrement=False)
+    # Incremented by every committed add or delete of the user's posts
+    version = Column(BigInteger, nullable=False, default=0)
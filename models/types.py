@@ -0,0 +1,82 @@
+import zlib
+from typing import Optional, Union
+from sqlalchemy import LargeBinary
+from sqlalchemy.dialects import mysql
+from sqlalchemy.types import TypeDecorator
+from core.config import settings
+
+# Stored values starting with this byte carry a codec marker as their second byte.
+# Plain UTF-8 text written before compression existed never starts with it,
+# except for texts that begin with NUL, which are therefore always written with
+# the RAW marker.
+MARKER = b"\x00"
+RAW = b"r"
+ZLIB = b"z"
+
+
+class CompressedText(TypeDecorator):
+    """
+    A text column stored as bytes, zlib-compressed above a size threshold.
+
+    Values of at least `min_bytes` UTF-8 bytes are compressed when that actually
+    saves space, and prefixed with a two-byte codec marker. Shorter values are
+    stored as plain UTF-8, so rows written before compression was introduced (and
+    columns still declared as TEXT) remain readable as they are.
+
+    Attributes:
+        enabled (bool): Whether new values may be compressed. `core.database.init_db`
+            turns it off while the column has not been migrated to a binary type.
+        min_bytes (int): Smallest value, in UTF-8 bytes, that is compressed.
+        level (int): zlib compression level.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    enabled = settings.POST_TEXT_COMPRESSION
+    min_bytes = settings.POST_TEXT_COMPRESSION_MIN_BYTES
+    level = settings.POST_TEXT_COMPRESSION_LEVEL
+
+    def load_dialect_impl(self, dialect):
+        # MySQL's plain BLOB holds only 64 KB; posts may hold 1 MB of 4-byte characters
+        if dialect.name == "mysql":
+            return dialect.type_descriptor(mysql.MEDIUMBLOB())
+        return dialect.type_descriptor(LargeBinary())
+
+    @classmethod
+    def encode(cls, value: str) -> bytes:
+        """
+        Converts a text into its stored representation.
+        """
+        data = value.encode("utf-8")
+        if cls.enabled and len(data) >= cls.min_bytes:
+            compressed = zlib.compress(data, cls.level)
+            if len(compressed) + 2 < len(data):
+                return MARKER + ZLIB + compressed
+        if data.startswith(MARKER):
+            return MARKER + RAW + data
+        return data
+
+    @staticmethod
+    def decode(value: Union[bytes, str]) -> str:
+        """
+        Converts a stored representation back into text.
+        """
+        if isinstance(value, str):
+            # Column still declared as TEXT by an unmigrated schema; only RAW can occur there
+            return value[2:] if value.startswith("\x00r") else value
+        value = bytes(value)
+        if value[:1] != MARKER:
+            return value.decode("utf-8")
+        codec, payload = value[1:2], value[2:]
+        if codec == ZLIB:
+            return zlib.decompress(payload).decode("utf-8")
+        if codec == RAW:
+            return payload.decode("utf-8")
+        raise ValueError(f"Unknown text codec marker {codec!r}")
+
+    def process_bind_param(self, value: Optional[str], dialect) -> Optional[bytes]:
+        return None if value is None else self.encode(value)
+
+    def process_result_value(self, value: Optional[Union[bytes, str]], dialect) -> Optional[str]:
+        return None if value is None else self.decode(value)
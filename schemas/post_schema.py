@@ -1,5 +1,7 @@
-from pydantic import BaseModel, constr
+from pydantic import BaseModel, conlist, constr, field_validator
 from datetime import datetime
+from typing import Optional
+from core.config import settings
 
 
 class PostCreate(BaseModel):
@@ -13,6 +15,51 @@ class PostCreate(BaseModel):
     text: constr(min_length=1, max_length=1024*1024)  # Validates that the text has a minimum length of 1 and max length of 1 MB.
 
 
+class PostBatchCreate(BaseModel):
+    """
+    Pydantic schema for creating several posts in one request.
+
+    The number of posts and their combined text size are limited, so one batch
+    cannot hold a request worker or a transaction for too long.
+    """
+    # Posts to create, in order; each one is validated like a single PostCreate
+    posts: conlist(PostCreate, min_length=1, max_length=settings.POSTS_BATCH_MAX_ITEMS)
+
+    @field_validator("posts")
+    @classmethod
+    def check_total_size(cls, posts: list[PostCreate]) -> list[PostCreate]:
+        """
+        Rejects batches whose combined text exceeds POSTS_BATCH_MAX_BYTES.
+        """
+        if sum(len(post.text) for post in posts) > settings.POSTS_BATCH_MAX_BYTES:
+            raise ValueError(f"Combined text of a batch must not exceed {settings.POSTS_BATCH_MAX_BYTES} characters")
+        return posts
+
+
+class PostBatchDelete(BaseModel):
+    """
+    Pydantic schema for deleting several posts in one request.
+    """
+    # IDs of the posts to delete; duplicates are ignored
+    post_ids: conlist(int, min_length=1, max_length=settings.POSTS_BATCH_MAX_ITEMS)
+
+
+class PostBatchCreateResult(BaseModel):
+    """
+    Outcome of one item of a batch creation.
+    """
+    index: int  # Position of the post in the request
+    post_id: int  # The ID assigned to the created post
+
+
+class PostBatchDeleteResult(BaseModel):
+    """
+    Outcome of one item of a batch deletion.
+    """
+    post_id: int  # The requested post ID
+    deleted: bool  # False when the post does not exist or belongs to another user
+
+
 class PostOut(BaseModel):
     """
     Pydantic schema for returning a post's data after creation or retrieval.
@@ -26,3 +73,27 @@ class PostOut(BaseModel):
     class Config:
         # This option allows the model to accept data from ORM objects like SQLAlchemy models
         from_attributes = True
+
+
+class PostSummary(BaseModel):
+    """
+    Pydantic schema for listing posts without their full text.
+
+    Built from the stored preview columns only; clients fetch the full body of
+    one post from /posts/{post_id}. Preview and length are null for posts
+    created before previews existed that have not been backfilled yet.
+    """
+    id: int  # The unique identifier for the post
+    created_at: datetime  # Timestamp when the post was created
+    preview: Optional[str]  # The first POST_PREVIEW_LENGTH characters of the text
+    text_length: Optional[int]  # Length of the full text in characters
+
+    class Config:
+        from_attributes = True
+
+
+class PostSearchResult(PostSummary):
+    """
+    Pydantic schema for one post matching a /posts/search query, best match first.
+    """
+    score: float  # Relevance of the post to the query; only comparable within one result list
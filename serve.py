@@ -0,0 +1,365 @@
+"""
+Production entry point: a prefork master supervising uvicorn worker processes.
+
+The master binds the listening socket and imports the application once,
+then forks the workers, so they share the imported code and data
+copy-on-write instead of each importing everything again. The workers
+accept connections on the shared socket.
+
+- Workers: SERVER_WORKERS, by default one per CPU available to the process
+  (CPU affinity and cgroup quota, e.g. `docker run --cpus`).
+- Event loop and HTTP parser: uvloop and httptools when installed.
+- Worker recycling: a worker is replaced after SERVER_MAX_REQUESTS requests
+  (plus up to SERVER_MAX_REQUESTS_JITTER), and whenever it dies.
+- SIGHUP: zero-downtime reload. The master checks that the new code imports,
+  re-executes itself (same PID and listening socket) and starts new workers.
+  Once they are ready, the previous workers finish their requests and exit.
+- SIGTERM / SIGINT: graceful shutdown within SERVER_GRACEFUL_TIMEOUT.
+
+Usage:
+    python serve.py --host 0.0.0.0 --port 8000 [--workers 4]
+    kill -HUP <master pid>
+"""
+import argparse
+import gc
+import importlib.util
+import logging
+import math
+import os
+import random
+import select
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import Optional
+
+import uvicorn
+
+from core.config import settings
+
+logger = logging.getLogger("serve")
+
+# Hand the listening socket and the workers to be retired over to the re-executed master
+LISTEN_FD_ENV = "SERVE_LISTEN_FD"
+RETIRING_ENV = "SERVE_RETIRING_WORKERS"
+
+# Workers failing to start this many times in a row stop the server
+MAX_START_FAILURES = 5
+
+# Signals handled by the master; blocked across the re-exec of a reload until it handles them again
+CONTROL_SIGNALS = (signal.SIGTERM, signal.SIGINT, signal.SIGQUIT, signal.SIGHUP, signal.SIGCHLD)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def available_cpus() -> int:
+    """
+    Returns the number of CPUs this process may use: its CPU affinity, limited
+    by the cgroup CPU quota when there is one, rounded up.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = _cgroup_cpu_quota()
+    if quota:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+def _cgroup_cpu_quota() -> Optional[float]:
+    # CPUs granted by the cgroup (v2, then v1), or None when unlimited
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as file:
+            quota, period = file.read().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as file:
+            quota = int(file.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as file:
+            period = int(file.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def resolve_implementations(loop: str, http: str) -> tuple[str, str]:
+    """
+    Resolves "auto" to uvloop and httptools when they are installed, and to the
+    pure-Python asyncio loop and h11 parser otherwise.
+    """
+    if loop == "auto":
+        loop = "uvloop" if sys.platform != "win32" and importlib.util.find_spec("uvloop") else "asyncio"
+    if http == "auto":
+        http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    return loop, http
+
+
+def listening_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """
+    Returns the socket inherited from the previous master on a reload, or binds a new one.
+    """
+    inherited = os.environ.pop(LISTEN_FD_ENV, None)
+    if inherited is not None:
+        return socket.socket(fileno=int(inherited))
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+class WorkerServer(uvicorn.Server):
+    """
+    uvicorn server reporting to the master, through `ready_fd`, once the
+    application has started and connections are being accepted.
+    """
+
+    def __init__(self, config: uvicorn.Config, ready_fd: int):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets: Optional[list] = None):
+        await super().startup(sockets)
+        if self.started:
+            os.write(self.ready_fd, b"%d\n" % os.getpid())
+
+
+class Master:
+    """
+    Forks the workers, replaces those that exit and handles the control signals.
+
+    Attributes:
+        workers (dict[int, float]): Start time of each current worker, by PID.
+        ready (set[int]): Current workers that are accepting connections.
+        retiring (set[int]): Workers of the previous master, stopped once the current ones are ready.
+    """
+
+    def __init__(self, app, sock: socket.socket, args: argparse.Namespace, retiring: set[int]):
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.workers: dict[int, float] = {}
+        self.ready: set[int] = set()
+        self.retiring = retiring
+        self.failures = 0
+        self.signals: list[int] = []
+        self.ready_read, self.ready_write = os.pipe()
+        self.wake_read, self.wake_write = os.pipe()
+
+    def run(self) -> int:
+        """
+        Supervises the workers until the server is stopped.
+
+        Returns:
+            int: Exit status of the master.
+        """
+        os.set_blocking(self.wake_write, False)
+        signal.set_wakeup_fd(self.wake_write)
+        for signum in CONTROL_SIGNALS:
+            signal.signal(signum, self._on_signal)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, CONTROL_SIGNALS)
+
+        while True:
+            self._spawn_missing()
+            readable, _, _ = select.select([self.ready_read, self.wake_read], [], [], 1.0)
+            if self.wake_read in readable:
+                os.read(self.wake_read, 4096)
+            if self.ready_read in readable:
+                self._on_ready(os.read(self.ready_read, 4096))
+            self._reap()
+
+            signals, self.signals = self.signals, []
+            if any(signum in (signal.SIGTERM, signal.SIGINT, signal.SIGQUIT) for signum in signals):
+                self.stop()
+                return 0
+            if signal.SIGHUP in signals:
+                self.reload()
+            if self.failures >= MAX_START_FAILURES:
+                logger.error("Workers failed to start %s times in a row, stopping", self.failures)
+                self.stop()
+                return 1
+
+    def _on_signal(self, signum, frame):
+        self.signals.append(signum)
+
+    @staticmethod
+    def _exit_on_signal(signum, frame):
+        # uvicorn re-raises the signal that stopped it once it has shut down gracefully;
+        # exiting normally then lets the worker's atexit handlers run
+        sys.exit(0)
+
+    def _spawn_missing(self):
+        while len(self.workers) < self.args.workers:
+            # Until one worker is ready, start them one at a time: the first one runs the
+            # schema check on its own, and a release that cannot start fails only once
+            if self.workers and not self.ready:
+                return
+            pid = os.fork()
+            if pid == 0:
+                # Leave through the normal interpreter exit, so the worker's atexit
+                # handlers (e.g. multiprocessing cleanup) run
+                sys.exit(self._run_worker())
+            self.workers[pid] = time.monotonic()
+
+    def _run_worker(self) -> int:
+        # Runs in the forked child: drop the master's signal handling and pipes first
+        signal.set_wakeup_fd(-1)
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self._exit_on_signal)
+        signal.signal(signal.SIGQUIT, signal.SIG_DFL)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)  # Reloads are handled by the master
+        for fd in (self.ready_read, self.wake_read, self.wake_write):
+            os.close(fd)
+
+        from core.database import dispose_inherited_pools
+        from core.startup import StartupTimer
+        dispose_inherited_pools()
+        # The imports ran once, in the master: time this worker's startup from the fork
+        sys.modules["main"].startup_timer = StartupTimer()
+
+        max_requests = None
+        if self.args.max_requests:
+            max_requests = self.args.max_requests + random.randint(0, self.args.max_requests_jitter)
+        config = uvicorn.Config(
+            self.app,
+            loop=self.args.loop,
+            http=self.args.http,
+            lifespan="on",
+            log_level=self.args.log_level,
+            access_log=self.args.access_log,
+            limit_max_requests=max_requests,
+            timeout_graceful_shutdown=self.args.graceful_timeout,
+        )
+        WorkerServer(config, self.ready_write).run(sockets=[self.sock])
+        return 0
+
+    def _on_ready(self, data: bytes):
+        for pid in map(int, data.split()):
+            if pid in self.workers:
+                self.ready.add(pid)
+                self.failures = 0
+        if self.retiring and len(self.ready) >= self.args.workers:
+            logger.info("New workers ready, stopping %s previous workers", len(self.retiring))
+            self._kill(self.retiring, signal.SIGTERM)
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self.retiring.discard(pid)
+            if pid not in self.workers:
+                continue
+            started = self.workers.pop(pid)
+            if pid in self.ready:
+                self.ready.discard(pid)
+                if os.waitstatus_to_exitcode(status) != 0:
+                    logger.warning("Worker %s died (status %s), replacing it", pid, os.waitstatus_to_exitcode(status))
+                else:
+                    logger.info("Worker %s exited after %.0fs, replacing it", pid, time.monotonic() - started)
+            else:
+                self.failures += 1
+                logger.error("Worker %s exited before it was ready", pid)
+                time.sleep(min(2 ** self.failures / 10, 5))  # Don't respawn in a tight loop
+
+    def _kill(self, pids, signum: int):
+        for pid in list(pids):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def stop(self):
+        """
+        Stops every worker gracefully, killing those still running after the graceful timeout.
+        """
+        children = set(self.workers) | self.retiring
+        logger.info("Stopping %s workers", len(children))
+        self._kill(children, signal.SIGTERM)
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while children and time.monotonic() < deadline:
+            for pid in list(children):
+                try:
+                    if os.waitpid(pid, os.WNOHANG)[0]:
+                        children.discard(pid)
+                except ChildProcessError:
+                    children.discard(pid)
+            time.sleep(0.05)
+        self._kill(children, signal.SIGKILL)
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+
+    def reload(self):
+        """
+        Re-executes the master with the current code, keeping the listening socket
+        and the running workers, which keep serving until the new ones are ready.
+        """
+        check = subprocess.run([sys.executable, "-c", "import main"], cwd=ROOT)
+        if check.returncode != 0:
+            logger.error("Reload aborted: the application failed to import")
+            return
+        logger.info("Reloading")
+        os.set_inheritable(self.sock.fileno(), True)
+        env = dict(os.environ)
+        env[LISTEN_FD_ENV] = str(self.sock.fileno())
+        env[RETIRING_ENV] = ",".join(map(str, set(self.workers) | self.retiring))
+        logging.shutdown()
+        signal.pthread_sigmask(signal.SIG_BLOCK, CONTROL_SIGNALS)
+        try:
+            os.execve(sys.executable, [sys.executable, *sys.orig_argv[1:]], env)
+        except OSError:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, CONTROL_SIGNALS)
+            logger.exception("Reload failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS, help="0: one per available CPU")
+    parser.add_argument("--max-requests", type=int, default=settings.SERVER_MAX_REQUESTS)
+    parser.add_argument("--max-requests-jitter", type=int, default=settings.SERVER_MAX_REQUESTS_JITTER)
+    parser.add_argument("--graceful-timeout", type=float, default=settings.SERVER_GRACEFUL_TIMEOUT)
+    parser.add_argument("--loop", default=settings.SERVER_LOOP, choices=("auto", "uvloop", "asyncio"))
+    parser.add_argument("--http", default=settings.SERVER_HTTP, choices=("auto", "httptools", "h11"))
+    parser.add_argument("--backlog", type=int, default=settings.SERVER_BACKLOG)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-access-log", dest="access_log", action="store_false")
+    args = parser.parse_args()
+    args.workers = args.workers or available_cpus()
+    args.loop, args.http = resolve_implementations(args.loop, args.http)
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s [%(process)d] %(levelname)s %(message)s")
+
+    sock = listening_socket(args.host, args.port, args.backlog)
+    retiring = {int(pid) for pid in os.environ.pop(RETIRING_ENV, "").split(",") if pid}
+
+    # Import the application once, before forking, and move everything it allocated
+    # out of the collector's reach, so collections in the workers don't touch (and copy) those pages
+    from main import app
+    from core.auth import calibrate_password_hashing
+    calibrate_password_hashing()  # Every worker hashes with the same bcrypt cost
+    gc.collect()
+    gc.freeze()
+
+    logger.info(
+        "Serving on %s:%s with %s workers (loop %s, http %s)",
+        *sock.getsockname()[:2], args.workers, args.loop, args.http,
+    )
+    sys.exit(Master(app, sock, args, retiring).run())
+
+
+if __name__ == "__main__":
+    main()
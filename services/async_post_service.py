@@ -0,0 +1,340 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from models.post_model import Post
+from schemas.post_schema import (
+    PostBatchCreate, PostBatchCreateResult, PostBatchDelete, PostBatchDeleteResult, PostCreate,
+)
+from models.user_model import User
+from fastapi import HTTPException
+from core.cache import cache
+from core.config import settings
+from services.search_service import SearchPage, search_backend, search_posts
+from core.database import AsyncSessionLocal
+from services.post_service import (
+    PostPage, PostWindow, RenderedPage, add_posts, build_page, build_summary_page, build_window, bump_posts_version,
+    delete_posts, ndjson_lines, post_committer, post_row, post_statement, posts_version_statement,
+    prepare_cache_update, render_page, summarize_page, user_post_summaries_statement, user_posts_statement,
+    window_page, window_statement,
+)
+
+
+async def add_post_async(user: User, post_data: PostCreate, db: AsyncSession) -> int:
+    """
+    Async counterpart of `services.post_service.add_post`.
+
+    Args:
+        user (User): The user who is creating the post.
+        post_data (PostCreate): The data for the new post (text).
+        db (AsyncSession): The async SQLAlchemy session used to interact with the database.
+
+    Returns:
+        int: The ID of the newly created post.
+    """
+    if settings.POSTS_GROUP_COMMIT:
+        # The batch is written by the committer's thread; only the wait happens on the event loop.
+        # The request's connection is returned first, as the committer needs one too.
+        await db.close()
+        return await post_committer.write_async(post_row(user.id, post_data.text))
+
+    # Create a new post object
+    post = Post(**post_row(user.id, post_data.text))
+
+    # Add the post to the database and commit the changes, reading the ID on flush
+    db.add(post)
+    await db.flush()
+    post_id = post.id
+    await db.run_sync(lambda session: search_backend.posts_added(session, user.id, [(post_id, post_data.text)]))
+    await db.run_sync(lambda session: bump_posts_version(session, [user.id]))
+    update_cache = await db.run_sync(lambda session: prepare_cache_update(session, [user.id], added_ids=[post_id]))
+    await db.commit()
+
+    # Apply the new post to the user's cache (or drop it) now that it is visible
+    update_cache()
+
+    return post_id
+
+
+async def add_posts_async(user: User, batch: PostBatchCreate, db: AsyncSession) -> list[PostBatchCreateResult]:
+    """
+    Async counterpart of `services.post_service.add_posts`. The batch logic is
+    dialect-dependent, so the sync implementation runs on the async connection
+    through `run_sync` instead of being duplicated.
+
+    Args:
+        user (User): The user who is creating the posts.
+        batch (PostBatchCreate): The posts to create.
+        db (AsyncSession): The async SQLAlchemy session used to interact with the database.
+
+    Returns:
+        list[PostBatchCreateResult]: The ID assigned to each post, by request position.
+    """
+    return await db.run_sync(lambda session: add_posts(user, batch, session))
+
+
+async def delete_posts_async(user: User, batch: PostBatchDelete, db: AsyncSession) -> list[PostBatchDeleteResult]:
+    """
+    Async counterpart of `services.post_service.delete_posts`, run through `run_sync`.
+
+    Args:
+        user (User): The user attempting to delete the posts.
+        batch (PostBatchDelete): The IDs of the posts to delete.
+        db (AsyncSession): The async SQLAlchemy session used to interact with the database.
+
+    Returns:
+        list[PostBatchDeleteResult]: Whether each requested post was deleted, in request order.
+    """
+    return await db.run_sync(lambda session: delete_posts(user, batch, session))
+
+
+async def in_new_session_async(user_id: int, load: Callable[[AsyncSession], Awaitable[Any]]) -> Any:
+    """
+    Async counterpart of `services.post_service.in_new_session`.
+
+    Args:
+        user_id (int): The user the data is loaded for, for read replica stickiness.
+        load (Callable[[AsyncSession], Awaitable[Any]]): The loader.
+
+    Returns:
+        Any: What the loader returned.
+    """
+    async with AsyncSessionLocal() as session:
+        session.info["user_id"] = user_id
+        return await load(session)
+
+
+async def get_posts_version_async(user: User, db: AsyncSession) -> int:
+    """
+    Async counterpart of `services.post_service.get_posts_version`.
+
+    Args:
+        user (User): The owner of the posts.
+        db (AsyncSession): The async SQLAlchemy session used to interact with the database.
+
+    Returns:
+        int: The version, 0 if the user never changed their posts.
+    """
+    if settings.POSTS_CACHE_WRITE_THROUGH:
+        return (await get_post_window_async(user, db)).version
+
+    async def load(session: AsyncSession) -> int:
+        return await session.scalar(posts_version_statement(user.id)) or 0
+
+    return await cache.get_or_load_async(
+        (user.id, "version"), lambda: load(db), refresh=lambda: in_new_session_async(user.id, load),
+    )
+
+
+async def get_post_window_async(user: User, db: AsyncSession) -> PostWindow:
+    """
+    Async counterpart of `services.post_service.get_post_window`.
+
+    Args:
+        user (User): The owner of the posts.
+        db (AsyncSession): The async SQLAlchemy session used to interact with the database.
+
+    Returns:
+        PostWindow: The newest posts and the version they are current at.
+    """
+    async def load(session: AsyncSession) -> PostWindow:
+        version = await session.scalar(posts_version_statement(user.id)) or 0
+        return build_window((await session.scalars(window_statement(user.id))).all(), version)
+
+    return await cache.get_or_load_async(
+        (user.id, "window"), lambda: load(db), refresh=lambda: in_new_session_async(user.id, load),
+    )
+
+
+async def get_user_posts_async(user: User, db: AsyncSession, limit: int, after: Optional[str] = None) -> PostPage:
+    """
+    Async counterpart of `services.post_service.get_user_posts`.
+    Pages are shared with the sync service through the same cache keys.
+
+    Args:
+        user (User): The user whose posts need to be fetched.
+        db (AsyncSession): The async SQLAlchemy session used to interact with the database.
+        limit (int): Maximum number of posts on the page.
+        after (Optional[str]): Cursor returned with the previous page, or None for the first page.
+
+    Returns:
+        PostPage: The posts on the page and the cursor of the next page.
+
+    Raises:
+        HTTPException: If the cursor is malformed (status code 400).
+    """
+    async def load(session: AsyncSession) -> PostPage:
+        if settings.POSTS_CACHE_WRITE_THROUGH:
+            page = window_page(await get_post_window_async(user, session), limit, after)
+            if page is not None:
+                return page
+        # The version is read first, so the page is at least as new as the version it is tagged with
+        version = await session.scalar(posts_version_statement(user.id)) or 0
+        posts = (await session.scalars(user_posts_statement(user.id, limit, after))).all()
+        return build_page(posts, limit, version)
+
+    return await cache.get_or_load_async(
+        (user.id, limit, after), lambda: load(db), refresh=lambda: in_new_session_async(user.id, load),
+    )
+
+
+async def get_user_posts_rendered_async(
+        user: User, db: AsyncSession, limit: int, after: Optional[str] = None
+) -> RenderedPage:
+    """
+    Async counterpart of `services.post_service.get_user_posts_rendered`.
+
+    Args:
+        user (User): The user whose posts need to be fetched.
+        db (AsyncSession): The async SQLAlchemy session used to interact with the database.
+        limit (int): Maximum number of posts on the page.
+        after (Optional[str]): Cursor returned with the previous page, or None for the first page.
+
+    Returns:
+        RenderedPage: The response body of the page and the cursor of the next page.
+
+    Raises:
+        HTTPException: If the cursor is malformed (status code 400).
+    """
+    async def load(session: AsyncSession) -> RenderedPage:
+        # Serializing a page can take long enough to stall every request of the worker:
+        # it runs in the thread pool rather than on the event loop
+        if settings.POSTS_CACHE_WRITE_THROUGH:
+            page = window_page(await get_post_window_async(user, session), limit, after)
+            if page is not None:
+                return await run_in_threadpool(render_page, page)
+        version = await session.scalar(posts_version_statement(user.id)) or 0
+        posts = (await session.scalars(user_posts_statement(user.id, limit, after))).all()
+        return await run_in_threadpool(render_page, build_page(posts, limit, version))
+
+    return await cache.get_or_load_async(
+        (user.id, "rendered", limit, after), lambda: load(db), refresh=lambda: in_new_session_async(user.id, load),
+    )
+
+
+async def get_user_post_summaries_async(
+        user: User, db: AsyncSession, limit: int, after: Optional[str] = None
+) -> PostPage:
+    """
+    Async counterpart of `services.post_service.get_user_post_summaries`.
+
+    Args:
+        user (User): The user whose posts need to be fetched.
+        db (AsyncSession): The async SQLAlchemy session used to interact with the database.
+        limit (int): Maximum number of posts on the page.
+        after (Optional[str]): Cursor returned with the previous page, or None for the first page.
+
+    Returns:
+        PostPage: PostSummary items on the page and the cursor of the next page.
+
+    Raises:
+        HTTPException: If the cursor is malformed (status code 400).
+    """
+    async def load(session: AsyncSession) -> PostPage:
+        if settings.POSTS_CACHE_WRITE_THROUGH:
+            page = window_page(await get_post_window_async(user, session), limit, after)
+            if page is not None:
+                return summarize_page(page)
+        version = await session.scalar(posts_version_statement(user.id)) or 0
+        rows = (await session.execute(user_post_summaries_statement(user.id, limit, after))).all()
+        return build_summary_page(rows, limit, version)
+
+    return await cache.get_or_load_async(
+        (user.id, "summary", limit, after), lambda: load(db), refresh=lambda: in_new_session_async(user.id, load),
+    )
+
+
+async def get_post_async(user: User, post_id: int, db: AsyncSession) -> Post:
+    """
+    Async counterpart of `services.post_service.get_post`.
+
+    Args:
+        user (User): The owner of the post.
+        post_id (int): The ID of the post.
+        db (AsyncSession): The async SQLAlchemy session used to interact with the database.
+
+    Returns:
+        Post: The post with its text loaded.
+
+    Raises:
+        HTTPException: If the post is not found or does not belong to the user (status code 404).
+    """
+    async def load(session: AsyncSession) -> Post:
+        post = await session.scalar(post_statement(user.id, post_id))
+        if not post:
+            raise HTTPException(status_code=404, detail="Post not found")
+        return post
+
+    return await cache.get_or_load_async(
+        (user.id, "post", post_id), lambda: load(db), refresh=lambda: in_new_session_async(user.id, load),
+    )
+
+
+async def stream_user_posts_async(
+        statement: Select, user_id: int, fields: Optional[frozenset] = None
+) -> AsyncIterator[bytes]:
+    """
+    Async counterpart of `services.post_service.stream_user_posts`, reading
+    through `AsyncSession.stream` so the server-side cursor is consumed batch by batch.
+
+    Args:
+        statement (Select): The statement built by `user_posts_stream_statement`.
+        user_id (int): The owner of the posts, for read replica stickiness.
+        fields (Optional[frozenset]): Summary fields, or None for full posts.
+
+    Yields:
+        bytes: NDJSON lines of one batch of posts.
+    """
+    async with AsyncSessionLocal() as db:
+        db.info["user_id"] = user_id
+        result = await db.stream(statement)
+        async for rows in result.partitions():
+            yield ndjson_lines(rows, fields)
+
+
+async def search_posts_async(
+        user: User, query: str, db: AsyncSession, limit: int, after: Optional[str] = None,
+) -> SearchPage:
+    """
+    Async counterpart of `services.search_service.search_posts`. Backends work on
+    a sync session, so the search runs on the async connection through `run_sync`.
+
+    Args:
+        user (User): The user whose posts are searched.
+        query (str): Words to look for; posts containing any of them match.
+        db (AsyncSession): The async SQLAlchemy session used to interact with the database.
+        limit (int): Maximum number of results on the page.
+        after (Optional[str]): Cursor returned with the previous page, or None for the first page.
+
+    Returns:
+        SearchPage: The results on the page and the cursor of the next page.
+    """
+    return await db.run_sync(lambda session: search_posts(user, query, session, limit, after))
+
+
+async def delete_post_async(user: User, post_id: int, db: AsyncSession):
+    """
+    Async counterpart of `services.post_service.delete_post`.
+
+    Args:
+        user (User): The user attempting to delete the post.
+        post_id (int): The ID of the post to be deleted.
+        db (AsyncSession): The async SQLAlchemy session used to interact with the database.
+
+    Raises:
+        HTTPException: If the post is not found or does not belong to the user (status code 404).
+    """
+    # Find the post by ID and ensure it belongs to the current user
+    post = await db.scalar(select(Post).where(Post.id == post_id, Post.user_id == user.id))
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    # Delete the post from the database
+    await db.delete(post)
+    await db.run_sync(lambda session: search_backend.posts_deleted(session, user.id, [post_id]))
+    await db.run_sync(lambda session: bump_posts_version(session, [user.id]))
+    update_cache = await db.run_sync(lambda session: prepare_cache_update(session, [user.id], deleted_ids=[post_id]))
+    await db.commit()
+
+    # Remove the post from the user's cache now that the delete is visible
+    update_cache()
@@ -0,0 +1,71 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.user_model import User
+from schemas.user_schema import UserCreate, UserLogin
+from core.auth import get_password_hash_async, verify_and_update_password_async, create_access_token
+from fastapi import HTTPException, status
+
+
+async def register_user_async(user_data: UserCreate, db: AsyncSession) -> str:
+    """
+    Async counterpart of `services.user_service.register_user`.
+    Hashing runs on the hashing process pool without blocking the event loop.
+
+    Args:
+        user_data (UserCreate): The data provided for the new user (email and password).
+        db (AsyncSession): The async SQLAlchemy session used to interact with the database.
+
+    Returns:
+        str: The JWT access token that can be used for authenticating the user.
+
+    Raises:
+        HTTPException: If the email is already registered (status code 400).
+    """
+    # Check if the email is already in use
+    existing_user = await db.scalar(select(User).where(User.email == user_data.email))
+    if existing_user:
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+    # Hash the password before saving the user
+    hashed_password = await get_password_hash_async(user_data.password)
+
+    # Create a new user instance and add to the database
+    user = User(email=user_data.email, hashed_password=hashed_password)
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)  # Refresh the user object with data from the database
+
+    return create_access_token({"user_id": user.id, "email": user.email})
+
+
+async def login_user_async(user_data: UserLogin, db: AsyncSession) -> str:
+    """
+    Async counterpart of `services.user_service.login_user`, including the
+    transparent rehash of hashes with an outdated bcrypt cost.
+
+    Args:
+        user_data (UserLogin): The data provided for the user login (email and password).
+        db (AsyncSession): The async SQLAlchemy session used to interact with the database.
+
+    Returns:
+        str: The JWT access token that can be used for authenticating the user.
+
+    Raises:
+        HTTPException: If the credentials are invalid (status code 401).
+    """
+    # Retrieve the user by email from the database
+    user = await db.scalar(select(User).where(User.email == user_data.email))
+
+    # If no user is found or password doesn't match, raise unauthorized error
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    valid, new_hash = await verify_and_update_password_async(user_data.password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+
+    # Rehash with the current bcrypt cost while the plain password is at hand
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+
+    return create_access_token({"user_id": user.id, "email": user.email})
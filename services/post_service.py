@@ -1,9 +1,369 @@
-from sqlalchemy.orm import Session
-from models.post_model import Post
-from schemas.post_schema import PostCreate
+import base64
+import hashlib
+import json
+from datetime import datetime
+from functools import partial
+from importlib import import_module
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Optional
+from sqlalchemy import Select, and_, delete, func, insert, literal_column, or_, select
+from sqlalchemy.dialects import mysql
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session, undefer
+from models.post_model import PREVIEW_COLUMN_LENGTH, Post, PostVersion
+from schemas.post_schema import (
+    PostBatchCreate, PostBatchCreateResult, PostBatchDelete, PostBatchDeleteResult, PostCreate, PostOut, PostSummary,
+)
 from models.user_model import User
 from fastapi import HTTPException
 from core.cache import cache
+from core.compression import cache_levels, compress, response_codecs
+from core.config import settings
+from core.database import new_session, stick_to_primary
+from core.group_commit import GroupCommitter
+from services.search_service import search_backend
+
+# Validates ORM posts into PostOut models and encodes them in one pass
+posts_adapter = TypeAdapter(list[PostOut])
+summaries_adapter = TypeAdapter(list[PostSummary])
+post_adapter = TypeAdapter(PostOut)
+summary_adapter = TypeAdapter(PostSummary)
+
+# Fields a client may request from /posts/get with ?fields=; asking for "text"
+# selects full posts, any other combination is served from the preview columns
+SUMMARY_FIELDS = frozenset(PostSummary.model_fields)
+POST_FIELDS = SUMMARY_FIELDS | frozenset(PostOut.model_fields)
+
+# Dialects whose INSERT construct supports ON CONFLICT upserts; see `bump_posts_version`.
+# Their module is looked up on use, so only the configured database's dialect is imported.
+ON_CONFLICT_DIALECTS = ("postgresql", "sqlite")
+
+
+class PostPage(NamedTuple):
+    """
+    One keyset page of a user's posts.
+
+    Attributes:
+        items (list): Posts on this page, newest first.
+        next_cursor (Optional[str]): Opaque cursor for the following page, or None on the last page.
+        version (Optional[int]): Version of the user's posts the page was read at, see `page_etag`.
+    """
+    items: list
+    next_cursor: Optional[str]
+    version: Optional[int] = None
+
+
+class RenderedPage(NamedTuple):
+    """
+    One keyset page of a user's posts, already serialized to the JSON response body.
+
+    Attributes:
+        body (bytes): JSON array of PostOut objects.
+        encodings (dict[str, bytes]): Compressed copies of `body` by content coding,
+            added by `page_encoding` as clients ask for them (see `page_codecs`).
+        next_cursor (Optional[str]): Opaque cursor for the following page, or None on the last page.
+        version (Optional[int]): Version of the user's posts the page was read at, see `page_etag`.
+    """
+    body: bytes
+    encodings: dict[str, bytes]
+    next_cursor: Optional[str]
+    version: Optional[int] = None
+
+
+class PostWindow(NamedTuple):
+    """
+    The newest posts of a user, cached as one entry in POSTS_CACHE_WRITE_THROUGH
+    mode and updated in place by writes (see `apply_to_window`).
+
+    Attributes:
+        posts (list): Up to POSTS_CACHE_WINDOW posts with their text, newest first.
+        complete (bool): Whether these are all of the user's posts; if not, pages
+            reaching past the window are read from the database.
+        version (int): Version of the user's posts the window is current at.
+    """
+    posts: list
+    complete: bool
+    version: int
+
+
+def encode_cursor(post: Post) -> str:
+    """
+    Encodes the keyset position of a post into an opaque cursor string.
+
+    Args:
+        post (Post): The last post of a page.
+
+    Returns:
+        str: URL-safe cursor pointing just after the given post.
+    """
+    raw = json.dumps([post.created_at.isoformat(), post.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): Opaque cursor received from the client.
+
+    Returns:
+        tuple[datetime, int]: The (created_at, id) position encoded in the cursor.
+
+    Raises:
+        HTTPException: If the cursor is malformed (status code 400).
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, post_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(post_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_fields(fields: Optional[str]) -> Optional[frozenset]:
+    """
+    Parses the comma-separated `fields` parameter of the posts list.
+
+    Args:
+        fields (Optional[str]): Requested fields, e.g. "id,created_at,preview", or None.
+
+    Returns:
+        Optional[frozenset]: The requested summary fields, or None when full posts
+            (including their text) are requested.
+
+    Raises:
+        HTTPException: If an unknown field is requested (status code 400).
+    """
+    if fields is None:
+        return None
+    requested = frozenset(name.strip() for name in fields.split(",") if name.strip())
+    unknown = requested - POST_FIELDS
+    if unknown or not requested:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown)) or '(none given)'}")
+    return None if "text" in requested else requested
+
+
+def post_row(user_id: int, text: str) -> dict:
+    """
+    Builds the column values of a new post, including its stored preview and
+    text length. Every write path goes through it, so summaries stay in sync.
+
+    Args:
+        user_id (int): The owner of the post.
+        text (str): The full text of the post.
+
+    Returns:
+        dict: Values for the user_id, text, preview and text_length columns.
+    """
+    return {
+        "user_id": user_id,
+        "text": text,
+        "preview": text[:min(settings.POST_PREVIEW_LENGTH, PREVIEW_COLUMN_LENGTH)],
+        "text_length": len(text),
+    }
+
+
+def bump_posts_version(db: Session, user_ids: Iterable[int]) -> dict[int, int]:
+    """
+    Increments the content version of each user's posts within the caller's
+    transaction, so the new version becomes visible together with the write.
+
+    A single upsert per user, which also locks the version row until commit;
+    users are handled in ID order so concurrent batches lock rows in the same order.
+    The upsert reports the new version itself (RETURNING, or LAST_INSERT_ID(expr)
+    on MySQL, which comes back with the statement's result), and the versions are
+    kept in `db.info["posts_versions"]` for the cache update and the search index,
+    so no further query reads them.
+
+    Args:
+        db (Session): The session holding the write transaction.
+        user_ids (Iterable[int]): Users whose posts were changed.
+
+    Returns:
+        dict[int, int]: The new version of each user's posts.
+    """
+    dialect = db.get_bind().dialect.name
+    versions = db.info.setdefault("posts_versions", {})
+    for user_id in sorted(set(user_ids)):
+        if dialect == "mysql":
+            statement = mysql.insert(PostVersion).values(user_id=user_id, version=1)
+            statement = statement.on_duplicate_key_update(version=func.last_insert_id(PostVersion.version + 1))
+            # A fresh row (version 1) leaves the insert ID at 0: the table has no auto-increment column
+            versions[user_id] = db.execute(statement).lastrowid or 1
+        elif dialect in ON_CONFLICT_DIALECTS:
+            statement = import_module(f"sqlalchemy.dialects.{dialect}").insert(PostVersion)
+            statement = statement.values(user_id=user_id, version=1)
+            statement = statement.on_conflict_do_update(
+                index_elements=[PostVersion.user_id], set_={"version": PostVersion.version + 1},
+            )
+            versions[user_id] = db.execute(statement.returning(PostVersion.version)).scalar_one()
+        else:
+            raise RuntimeError(f"Don't know how to upsert post versions on {dialect}")
+    return {user_id: versions[user_id] for user_id in set(user_ids)}
+
+
+def posts_version_statement(user_id: int) -> Select:
+    """
+    Builds the primary key lookup of a user's posts version; no row means version 0.
+    """
+    return select(PostVersion.version).where(PostVersion.user_id == user_id)
+
+
+def in_new_session(user_id: int, load: Callable[[Session], Any]) -> Any:
+    """
+    Runs a cache loader in a session of its own, for background refreshes
+    that outlive the request whose session triggered them.
+
+    Args:
+        user_id (int): The user the data is loaded for, for read replica stickiness.
+        load (Callable[[Session], Any]): The loader.
+
+    Returns:
+        Any: What the loader returned.
+    """
+    with new_session(user_id) as session:
+        return load(session)
+
+
+def get_posts_version(user: User, db: Session) -> int:
+    """
+    Returns the current content version of a user's posts.
+
+    The version is cached in the user's cache group, so it is dropped by the
+    same invalidation as the user's pages; polling clients that are up to date
+    are answered without any database query.
+
+    Args:
+        user (User): The owner of the posts.
+        db (Session): The SQLAlchemy session object used to interact with the database.
+
+    Returns:
+        int: The version, 0 if the user never changed their posts.
+    """
+    if settings.POSTS_CACHE_WRITE_THROUGH:
+        # The window is patched rather than dropped on writes, and knows the version it is current at
+        return get_post_window(user, db).version
+
+    def load(session: Session) -> int:
+        return session.scalar(posts_version_statement(user.id)) or 0
+
+    return cache.get_or_load((user.id, "version"), lambda: load(db), refresh=lambda: in_new_session(user.id, load))
+
+
+def page_etag(user_id: int, version: int, limit: int, after: Optional[str], fields: Optional[frozenset]) -> str:
+    """
+    Builds the strong ETag of one page of /posts/get.
+
+    The tag combines the version of the user's posts with a digest of the
+    request parameters that select the page, so it changes whenever the
+    posts change and differs between pages, page sizes and field selections.
+
+    Args:
+        user_id (int): The owner of the posts.
+        version (int): Content version of the posts, see `get_posts_version`.
+        limit (int): Maximum number of posts on the page.
+        after (Optional[str]): Cursor of the page, or None for the first page.
+        fields (Optional[frozenset]): Requested summary fields, or None for full posts.
+
+    Returns:
+        str: The quoted entity tag, e.g. "42.1f2e3d4c5b6a7988".
+    """
+    selection = f"{user_id}:{limit}:{after}:{','.join(sorted(fields)) if fields is not None else '*'}"
+    digest = hashlib.blake2b(selection.encode(), digest_size=8).hexdigest()
+    return f'"{version}.{digest}"'
+
+
+def apply_to_window(
+        window: PostWindow, version: int, added: Iterable[Post] = (), deleted: Iterable[int] = ()
+) -> Optional[PostWindow]:
+    """
+    Applies one committed write to a cached window, returning a new window.
+
+    The write is applied only if it is the next one after the window's
+    version; otherwise a write in between was missed (or applied out of
+    order) and the window can no longer be trusted. A window already at or
+    past `version` was loaded after the write and is returned unchanged.
+
+    Args:
+        window (PostWindow): The cached window; it is never modified.
+        version (int): Version of the user's posts committed by the write.
+        added (Iterable[Post]): Posts created by the write, read back with their created_at.
+        deleted (Iterable[int]): IDs of the posts deleted by the write.
+
+    Returns:
+        Optional[PostWindow]: The updated window, or None if it must be reloaded.
+    """
+    if window.version >= version:
+        return window
+    if window.version + 1 != version:
+        return None
+
+    def order(post: Post) -> tuple:
+        return post.created_at, post.id
+
+    deleted = set(deleted)
+    posts = {post.id: post for post in window.posts if post.id not in deleted}
+    posts.update((post.id, post) for post in added if post.id not in deleted)
+    posts = sorted(posts.values(), key=order, reverse=True)
+    if not window.complete and window.posts:
+        # Posts older than the window's oldest may not be adjacent to it; leave them to the database
+        oldest = order(window.posts[-1])
+        posts = [post for post in posts if order(post) >= oldest]
+    complete = window.complete and len(posts) <= settings.POSTS_CACHE_WINDOW
+    posts = posts[:settings.POSTS_CACHE_WINDOW]
+    if not complete and len(posts) <= settings.POSTS_PAGE_MAX_LIMIT:
+        # Shrunk by deletes below a page; reloading is cheaper than falling back on every read
+        return None
+    return PostWindow(posts=posts, complete=complete, version=version)
+
+
+def prepare_cache_update(
+        db: Session, user_ids: Iterable[int], added_ids: Iterable[int] = (), deleted_ids: Iterable[int] = ()
+) -> Callable[[], None]:
+    """
+    Prepares the cache update of a write, inside its transaction and after
+    `bump_posts_version`; the returned function applies it after the commit.
+
+    By default the update invalidates each user's cache. In
+    POSTS_CACHE_WRITE_THROUGH mode it takes the versions `bump_posts_version`
+    set and reads the created posts (for their server-generated created_at) in
+    the same transaction, then patches each user's cached window (see `apply_to_window`)
+    while dropping their other entries. A window that cannot be patched is
+    dropped and reloaded by the next read.
+
+    Args:
+        db (Session): The session holding the write transaction.
+        user_ids (Iterable[int]): Users whose posts were changed.
+        added_ids (Iterable[int]): IDs of the posts created by the write.
+        deleted_ids (Iterable[int]): IDs of the posts deleted by the write (of a single user).
+
+    Returns:
+        Callable[[], None]: Applies the update; call it once the transaction is committed.
+    """
+    user_ids = sorted(set(user_ids))
+    if not settings.POSTS_CACHE_WRITE_THROUGH:
+        def invalidate():
+            for user_id in user_ids:
+                cache.invalidate(user_id)
+        return invalidate
+
+    versions = db.info["posts_versions"]
+    added_ids, deleted_ids = list(added_ids), list(deleted_ids)
+    added = db.scalars(select(Post).options(undefer(Post.text)).where(Post.id.in_(added_ids))).all() if added_ids else []
+    # Detached, so the commit does not expire what the cache is about to hold
+    for post in added:
+        db.expunge(post)
+
+    def patch():
+        for user_id in user_ids:
+            update = partial(
+                apply_to_window,
+                version=versions[user_id],
+                added=[post for post in added if post.user_id == user_id],
+                deleted=deleted_ids,
+            )
+            cache.patch(user_id, (user_id, "window"), update)
+    return patch
 
 
 def add_post(user: User, post_data: PostCreate, db: Session) -> int:
@@ -12,10 +372,13 @@ def add_post(user: User, post_data: PostCreate, db: Session) -> int:
 
     This function performs the following actions:
     1. Creates a new Post object using the provided post data.
-    2. Adds the new post to the database and commits the transaction.
-    3. Refreshes the post object to ensure it has the most up-to-date data.
-    4. Invalidates the user's cache to ensure the cache is refreshed for subsequent post queries.
-    5. Returns the ID of the newly created post.
+    2. Adds the new post to the database, reads its ID on flush, bumps the user's
+       posts version (see `bump_posts_version`) and commits the transaction.
+    3. Updates the user's cache (see `prepare_cache_update`) for subsequent post queries.
+    4. Returns the ID of the newly created post.
+
+    With POSTS_GROUP_COMMIT enabled the post is instead queued on `post_committer`
+    and written together with posts added concurrently (see `write_post_batch`).
 
     Args:
         user (User): The user who is creating the post.
@@ -28,53 +391,598 @@ def add_post(user: User, post_data: PostCreate, db: Session) -> int:
     Raises:
         None
     """
+    if settings.POSTS_GROUP_COMMIT:
+        # Return the request's connection first: the committer needs one from the same pool
+        db.close()
+        return post_committer.write(post_row(user.id, post_data.text))
+
     # Create a new post object
-    post = Post(user_id=user.id, text=post_data.text)
+    post = Post(**post_row(user.id, post_data.text))
 
-    # Add the post to the database and commit the changes
+    # Add the post to the database and commit the changes; the ID is known after
+    # the flush, so no SELECT is needed to read it back after the commit
     db.add(post)
+    db.flush()
+    post_id = post.id
+    search_backend.posts_added(db, user.id, [(post_id, post_data.text)])
+    bump_posts_version(db, [user.id])
+    update_cache = prepare_cache_update(db, [user.id], added_ids=[post_id])
     db.commit()
-    db.refresh(post)  # Refresh the post object with data from the database
 
-    # Invalidate the user's cache to refresh it
-    cache.invalidate(user.id)
+    # Apply the new post to the user's cache (or drop it) now that it is visible
+    update_cache()
 
     # Return the ID of the created post
-    return post.id
+    return post_id
+
+
+def consecutive_insert_ids(db: Session) -> bool:
+    """
+    Tells whether the MySQL server allocates consecutive auto-increment IDs to
+    the rows of one multi-row INSERT: only with an auto_increment_increment of 1
+    and an innodb_autoinc_lock_mode of 0 or 1. Mode 2 (interleaved), the default
+    since MySQL 8.0, may interleave the IDs of concurrent statements. The answer
+    is kept with the pooled connection, as both settings can be set per session.
+    """
+    info = db.connection().info
+    if "consecutive_insert_ids" not in info:
+        increment, lock_mode = db.execute(
+            select(literal_column("@@auto_increment_increment"), literal_column("@@innodb_autoinc_lock_mode"))
+        ).one()
+        info["consecutive_insert_ids"] = int(increment) == 1 and int(lock_mode) != 2
+    return info["consecutive_insert_ids"]
+
+
+def insert_posts(db: Session, rows: list[dict]) -> list[int]:
+    """
+    Inserts posts and returns their IDs in row order.
+
+    Where the dialect supports it (SQLite, PostgreSQL, MariaDB), one multi-row
+    INSERT returns the IDs through RETURNING; auto-increment IDs of one statement
+    grow in row order, so sorting them restores the order of `rows`. On MySQL,
+    one multi-row INSERT is used when the server allocates its IDs consecutively
+    (see `consecutive_insert_ids`): they are derived from LAST_INSERT_ID(), the
+    first ID of the statement, after checking that every row was inserted.
+    Otherwise each row gets an INSERT of its own in the caller's transaction,
+    so the batch still shares one commit.
+
+    Args:
+        db (Session): The SQLAlchemy session object used to interact with the database.
+        rows (list[dict]): Column values of each post, as built by `post_row`.
+
+    Returns:
+        list[int]: The IDs of the inserted posts, in the order of `rows`.
+
+    Raises:
+        RuntimeError: If MySQL reports another number of inserted rows than given.
+    """
+    statement = insert(Post).values(rows)
+    dialect = db.get_bind().dialect
+    if dialect.insert_returning:
+        return sorted(db.scalars(statement.returning(Post.id)))
+
+    if dialect.name == "mysql" and consecutive_insert_ids(db):
+        result = db.execute(statement)
+        if result.rowcount != len(rows):
+            raise RuntimeError(f"Inserted {result.rowcount} posts instead of {len(rows)}")
+        return list(range(result.lastrowid, result.lastrowid + len(rows)))
+
+    return [db.execute(insert(Post).values(row)).lastrowid for row in rows]
+
+
+def write_post_batch(rows: list[dict]) -> tuple[list[int], Callable[[], None]]:
+    """
+    Writes the posts collected by `post_committer`: one multi-row INSERT and one
+    commit for the whole batch. The cache update of each distinct user is left
+    to the returned callable, which the committer runs once after the commit.
+
+    Args:
+        rows (list[dict]): Column values of each post, as built by `post_row`.
+
+    Returns:
+        tuple[list[int], Callable[[], None]]: The IDs of the inserted posts, in the
+            order of `rows`, and the post-commit side effects.
+    """
+    with new_session() as db:
+        post_ids = insert_posts(db, rows)
+        for user_id in {row["user_id"] for row in rows}:
+            search_backend.posts_added(db, user_id, [
+                (post_id, row["text"]) for post_id, row in zip(post_ids, rows) if row["user_id"] == user_id
+            ])
+        bump_posts_version(db, [row["user_id"] for row in rows])
+        update_cache = prepare_cache_update(db, [row["user_id"] for row in rows], added_ids=post_ids)
+        db.commit()
+
+    def after_commit():
+        for user_id in {row["user_id"] for row in rows}:
+            stick_to_primary(user_id)
+        update_cache()
+    return post_ids, after_commit
+
+
+# Shared by all requests of a worker process; used by add_post when POSTS_GROUP_COMMIT is enabled
+post_committer = GroupCommitter(
+    write_post_batch,
+    window_seconds=settings.POSTS_GROUP_COMMIT_WINDOW_MS / 1000,
+    max_batch=settings.POSTS_GROUP_COMMIT_MAX_BATCH,
+)
+
+
+def add_posts(user: User, batch: PostBatchCreate, db: Session) -> list[PostBatchCreateResult]:
+    """
+    Adds several posts for a user in one transaction.
+
+    All posts are written with one multi-row INSERT and one commit, and the
+    user's cache is updated once for the whole batch.
+
+    Args:
+        user (User): The user who is creating the posts.
+        batch (PostBatchCreate): The posts to create.
+        db (Session): The SQLAlchemy session object used to interact with the database.
+
+    Returns:
+        list[PostBatchCreateResult]: The ID assigned to each post, by request position.
+    """
+    post_ids = insert_posts(db, [post_row(user.id, post.text) for post in batch.posts])
+    search_backend.posts_added(db, user.id, [(post_id, post.text) for post_id, post in zip(post_ids, batch.posts)])
+    bump_posts_version(db, [user.id])
+    update_cache = prepare_cache_update(db, [user.id], added_ids=post_ids)
+    db.commit()
+
+    # Update the user's cache once for the whole batch
+    update_cache()
+
+    return [PostBatchCreateResult(index=index, post_id=post_id) for index, post_id in enumerate(post_ids)]
+
+
+def delete_posts(user: User, batch: PostBatchDelete, db: Session) -> list[PostBatchDeleteResult]:
+    """
+    Deletes several posts of a user in one transaction.
+
+    Rows are removed with a single `DELETE ... WHERE id IN (...) AND user_id = ...`,
+    so posts of other users are never touched. Where the dialect supports
+    RETURNING the deleted IDs come back from that statement; otherwise (MySQL)
+    the matching rows are locked and read first in the same transaction.
+
+    Args:
+        user (User): The user attempting to delete the posts.
+        batch (PostBatchDelete): The IDs of the posts to delete.
+        db (Session): The SQLAlchemy session object used to interact with the database.
+
+    Returns:
+        list[PostBatchDeleteResult]: Whether each requested post was deleted, in request order.
+    """
+    post_ids = list(dict.fromkeys(batch.post_ids))  # Drop duplicates, keep request order
+    condition = and_(Post.id.in_(post_ids), Post.user_id == user.id)
+
+    if db.get_bind().dialect.delete_returning:
+        deleted = set(db.scalars(
+            delete(Post).where(condition).returning(Post.id),
+            execution_options={"synchronize_session": False},
+        ))
+    else:
+        deleted = set(db.scalars(select(Post.id).where(condition).with_for_update()))
+        if deleted:
+            db.execute(delete(Post).where(condition), execution_options={"synchronize_session": False})
+    search_backend.posts_deleted(db, user.id, list(deleted))
+    update_cache = None
+    if deleted:
+        bump_posts_version(db, [user.id])
+        update_cache = prepare_cache_update(db, [user.id], deleted_ids=deleted)
+    db.commit()
+
+    # Update the user's cache once for the whole batch
+    if update_cache is not None:
+        update_cache()
+
+    return [PostBatchDeleteResult(post_id=post_id, deleted=post_id in deleted) for post_id in post_ids]
+
+
+def user_posts_statement(user_id: int, limit: int, after: Optional[str] = None) -> Select:
+    """
+    Builds the keyset query for one page of a user's posts.
+
+    Posts are ordered newest first by (created_at, id); `limit + 1` rows are selected,
+    the extra row only telling whether another page exists. Shared by the sync and
+    async services.
+
+    Args:
+        user_id (int): The owner of the posts.
+        limit (int): Maximum number of posts on the page.
+        after (Optional[str]): Cursor returned with the previous page, or None for the first page.
+
+    Returns:
+        Select: The statement selecting the page's posts.
+
+    Raises:
+        HTTPException: If the cursor is malformed (status code 400).
+    """
+    statement = select(Post).options(undefer(Post.text)).where(Post.user_id == user_id)
+    return _keyset_page(statement, limit, after)
+
+
+def user_post_summaries_statement(user_id: int, limit: int, after: Optional[str] = None) -> Select:
+    """
+    Builds the keyset query for one page of a user's post summaries.
+
+    Only the summary columns are selected, so the text column is never read.
+    Pagination works exactly as in `user_posts_statement`.
+
+    Args:
+        user_id (int): The owner of the posts.
+        limit (int): Maximum number of posts on the page.
+        after (Optional[str]): Cursor returned with the previous page, or None for the first page.
+
+    Returns:
+        Select: The statement selecting the page's summary rows.
+
+    Raises:
+        HTTPException: If the cursor is malformed (status code 400).
+    """
+    statement = select(Post.id, Post.created_at, Post.preview, Post.text_length).where(Post.user_id == user_id)
+    return _keyset_page(statement, limit, after)
+
+
+def _keyset_page(statement: Select, limit: int, after: Optional[str]) -> Select:
+    """
+    Restricts a posts query to the keyset page following `after`.
+    """
+    return _keyset_order(statement, after).limit(limit + 1)
+
+
+def _keyset_order(statement: Select, after: Optional[str]) -> Select:
+    """
+    Orders a posts query newest first, starting just after the `after` cursor.
+    """
+    if after is not None:
+        # Keyset condition: strictly older than the cursor, ties broken by id
+        created_at, post_id = decode_cursor(after)
+        statement = statement.where(or_(
+            Post.created_at < created_at,
+            and_(Post.created_at == created_at, Post.id < post_id),
+        ))
+    return statement.order_by(Post.created_at.desc(), Post.id.desc())
+
+
+def build_page(posts: list, limit: int, version: Optional[int] = None) -> PostPage:
+    """
+    Turns the `limit + 1` rows selected by `user_posts_statement` into a page.
+
+    Args:
+        posts (list): Posts returned by the page query.
+        limit (int): Maximum number of posts on the page.
+        version (Optional[int]): Version of the user's posts read before the page query.
+
+    Returns:
+        PostPage: The posts on the page and the cursor of the next page.
+    """
+    next_cursor = encode_cursor(posts[limit - 1]) if len(posts) > limit else None
+    return PostPage(items=posts[:limit], next_cursor=next_cursor, version=version)
+
+
+def window_statement(user_id: int) -> Select:
+    """
+    Builds the query of a user's post window: the POSTS_CACHE_WINDOW newest
+    posts, plus one telling whether there are more. Shared by the sync and async services.
+    """
+    return user_posts_statement(user_id, settings.POSTS_CACHE_WINDOW)
+
+
+def build_window(posts: list, version: int) -> PostWindow:
+    """
+    Turns the rows selected by `window_statement` into a window.
+    """
+    return PostWindow(
+        posts=list(posts[:settings.POSTS_CACHE_WINDOW]),
+        complete=len(posts) <= settings.POSTS_CACHE_WINDOW,
+        version=version,
+    )
+
+
+def get_post_window(user: User, db: Session) -> PostWindow:
+    """
+    Retrieves the cached window of a user's newest posts, loading it on a miss.
+
+    Args:
+        user (User): The owner of the posts.
+        db (Session): The SQLAlchemy session object used to interact with the database.
+
+    Returns:
+        PostWindow: The newest posts and the version they are current at.
+    """
+    def load(session: Session) -> PostWindow:
+        version = session.scalar(posts_version_statement(user.id)) or 0
+        return build_window(session.scalars(window_statement(user.id)).all(), version)
 
+    key = (user.id, "window")
+    return cache.get_or_load(key, lambda: load(db), refresh=lambda: in_new_session(user.id, load))
 
-def get_user_posts(user: User, db: Session):
+
+def window_page(window: PostWindow, limit: int, after: Optional[str] = None) -> Optional[PostPage]:
+    """
+    Cuts one keyset page out of a window, exactly as `user_posts_statement` would select it.
+
+    Args:
+        window (PostWindow): The user's window.
+        limit (int): Maximum number of posts on the page.
+        after (Optional[str]): Cursor returned with the previous page, or None for the first page.
+
+    Returns:
+        Optional[PostPage]: The page, or None if it reaches past an incomplete window.
+
+    Raises:
+        HTTPException: If the cursor is malformed (status code 400).
+    """
+    start = 0
+    if after is not None:
+        cursor = decode_cursor(after)
+        start = next(
+            (index for index, post in enumerate(window.posts) if (post.created_at, post.id) < cursor),
+            len(window.posts),
+        )
+    posts = window.posts[start:start + limit + 1]
+    if len(posts) <= limit and not window.complete:
+        return None
+    return build_page(posts, limit, window.version)
+
+
+def get_user_posts(user: User, db: Session, limit: int, after: Optional[str] = None) -> PostPage:
     """
-    Retrieves the posts of a given user.
+    Retrieves one page of the posts of a given user.
 
-    This function first checks the cache for the user's posts:
-    1. If cached posts are found, they are returned immediately.
-    2. If no cached posts are found, the posts are queried from the database.
-    3. After retrieving the posts, they are cached for future use.
+    Posts are paginated with a keyset cursor, so the cost of a request does not
+    depend on how many posts the user has:
+    1. If the requested page is cached, it is returned immediately.
+    2. Otherwise the page is queried from the database; concurrent requests for
+       the same page wait for one query instead of each running it.
+    3. The page is cached under the user's group, so a single invalidation drops every page.
+    A page that expired moments ago is served while it is refreshed in the
+    background (see `CacheBackend.get_or_load`).
 
     Args:
         user (User): The user whose posts need to be fetched.
         db (Session): The SQLAlchemy session object used to interact with the database.
+        limit (int): Maximum number of posts on the page.
+        after (Optional[str]): Cursor returned with the previous page, or None for the first page.
 
     Returns:
-        list: A list of the user's posts.
+        PostPage: The posts on the page and the cursor of the next page.
 
     Raises:
-        None
+        HTTPException: If the cursor is malformed (status code 400).
+    """
+    def load(session: Session) -> PostPage:
+        if settings.POSTS_CACHE_WRITE_THROUGH:
+            page = window_page(get_post_window(user, session), limit, after)
+            if page is not None:
+                return page
+        # The version is read first, so the page is at least as new as the version it is tagged with
+        version = session.scalar(posts_version_statement(user.id)) or 0
+        posts = session.scalars(user_posts_statement(user.id, limit, after)).all()
+        return build_page(posts, limit, version)
+
+    return cache.get_or_load((user.id, limit, after), lambda: load(db), refresh=lambda: in_new_session(user.id, load))
+
+
+def build_summary_page(rows: list, limit: int, version: Optional[int] = None) -> PostPage:
+    """
+    Turns the rows selected by `user_post_summaries_statement` into a page of PostSummary models.
+    """
+    return summarize_page(build_page(rows, limit, version))
+
+
+def summarize_page(page: PostPage) -> PostPage:
+    """
+    Converts the items of a page (summary rows or full posts) into PostSummary models.
     """
-    # Try to get posts from the cache
-    cached = cache.get(user.id)
-    if cached is not None:
-        return cached
+    return page._replace(items=summaries_adapter.validate_python(page.items, from_attributes=True))
 
-    # If not cached, fetch the posts from the database
-    posts = db.query(Post).filter(Post.user_id == user.id).order_by(Post.created_at.desc()).all()
 
-    # Cache the retrieved posts for future use
-    cache.set(user.id, posts)
+def get_user_post_summaries(user: User, db: Session, limit: int, after: Optional[str] = None) -> PostPage:
+    """
+    Retrieves one page of a user's posts as summaries, without their text.
+
+    Pages are cached in the user's cache group next to the full pages, and are
+    invalidated with them.
+
+    Args:
+        user (User): The user whose posts need to be fetched.
+        db (Session): The SQLAlchemy session object used to interact with the database.
+        limit (int): Maximum number of posts on the page.
+        after (Optional[str]): Cursor returned with the previous page, or None for the first page.
+
+    Returns:
+        PostPage: PostSummary items on the page and the cursor of the next page.
+
+    Raises:
+        HTTPException: If the cursor is malformed (status code 400).
+    """
+    def load(session: Session) -> PostPage:
+        if settings.POSTS_CACHE_WRITE_THROUGH:
+            page = window_page(get_post_window(user, session), limit, after)
+            if page is not None:
+                return summarize_page(page)
+        version = session.scalar(posts_version_statement(user.id)) or 0
+        rows = session.execute(user_post_summaries_statement(user.id, limit, after)).all()
+        return build_summary_page(rows, limit, version)
+
+    key = (user.id, "summary", limit, after)
+    return cache.get_or_load(key, lambda: load(db), refresh=lambda: in_new_session(user.id, load))
+
+
+def get_post(user: User, post_id: int, db: Session) -> Post:
+    """
+    Retrieves one post of a user, including its full text.
+
+    Args:
+        user (User): The owner of the post.
+        post_id (int): The ID of the post.
+        db (Session): The SQLAlchemy session object used to interact with the database.
+
+    Returns:
+        Post: The post with its text loaded.
+
+    Raises:
+        HTTPException: If the post is not found or does not belong to the user (status code 404).
+    """
+    def load(session: Session) -> Post:
+        post = session.scalar(post_statement(user.id, post_id))
+        if not post:
+            raise HTTPException(status_code=404, detail="Post not found")
+        return post
+
+    key = (user.id, "post", post_id)
+    return cache.get_or_load(key, lambda: load(db), refresh=lambda: in_new_session(user.id, load))
+
+
+def post_statement(user_id: int, post_id: int) -> Select:
+    """
+    Builds the query for one post of a user with its text. Shared by the sync and async services.
+    """
+    return select(Post).options(undefer(Post.text)).where(Post.id == post_id, Post.user_id == user_id)
+
+
+def user_posts_stream_statement(user_id: int, after: Optional[str] = None, fields: Optional[frozenset] = None) -> Select:
+    """
+    Builds the query streaming all of a user's posts, newest first, from the
+    `after` cursor on. Only columns are selected, never ORM entities, so no
+    identity map grows while the stream is consumed.
+
+    Args:
+        user_id (int): The owner of the posts.
+        after (Optional[str]): Cursor to start after, or None to stream from the newest post.
+        fields (Optional[frozenset]): Summary fields as returned by `parse_fields`, or None for full posts.
+
+    Returns:
+        Select: The statement selecting the rows to stream.
+
+    Raises:
+        HTTPException: If the cursor is malformed (status code 400).
+    """
+    if fields is None:
+        statement = select(Post.id, Post.text, Post.created_at)
+    else:
+        statement = select(Post.id, Post.created_at, Post.preview, Post.text_length)
+    statement = _keyset_order(statement.where(Post.user_id == user_id), after)
+    # yield_per fetches through a server-side cursor (stream_results) in fixed-size batches
+    return statement.execution_options(yield_per=settings.POSTS_STREAM_BATCH_SIZE)
+
+
+def ndjson_lines(rows: list, fields: Optional[frozenset] = None) -> bytes:
+    """
+    Serializes rows of `user_posts_stream_statement` as newline-delimited JSON,
+    one PostOut (or PostSummary restricted to `fields`) per line.
+    """
+    adapter, include = (post_adapter, None) if fields is None else (summary_adapter, set(fields))
+    return b"".join(
+        adapter.dump_json(adapter.validate_python(row, from_attributes=True), include=include) + b"\n"
+        for row in rows
+    )
+
+
+def stream_user_posts(statement: Select, user_id: int, fields: Optional[frozenset] = None) -> Iterator[bytes]:
+    """
+    Streams the rows of `user_posts_stream_statement` as NDJSON chunks.
+
+    Runs with its own session, because the body is produced after the request's
+    dependencies (and their session) may already have been closed. Only one batch
+    of POSTS_STREAM_BATCH_SIZE rows is held in memory at a time, whatever the
+    number of posts. The session, and its connection, stay open until the stream ends.
+
+    Args:
+        statement (Select): The statement built by `user_posts_stream_statement`.
+        user_id (int): The owner of the posts, for read replica stickiness.
+        fields (Optional[frozenset]): Summary fields, or None for full posts.
+
+    Yields:
+        bytes: NDJSON lines of one batch of posts.
+    """
+    with new_session(user_id) as db:
+        for rows in db.execute(statement).partitions():
+            yield ndjson_lines(rows, fields)
+
+
+def render_page(page: PostPage) -> RenderedPage:
+    """
+    Serializes a page into its final JSON body. Compressed copies are added
+    later, per codec, by `page_encoding`. Shared by the sync and async services.
+
+    Args:
+        page (PostPage): The page to serialize.
+
+    Returns:
+        RenderedPage: The response body of the page and the cursor of the next page.
+    """
+    body = posts_adapter.dump_json(posts_adapter.validate_python(page.items, from_attributes=True))
+    return RenderedPage(body=body, encodings={}, next_cursor=page.next_cursor, version=page.version)
+
+
+def page_codecs(rendered: RenderedPage) -> list[str]:
+    """
+    Returns the codecs a rendered page is sent in from the cache: the response
+    codecs, or none if compression or precompression is disabled or the body is
+    smaller than RESPONSE_COMPRESSION_MIN_BYTES.
+    """
+    if (
+        not settings.RESPONSE_COMPRESSION
+        or not settings.RESPONSE_CACHE_PRECOMPRESS
+        or len(rendered.body) < settings.RESPONSE_COMPRESSION_MIN_BYTES
+    ):
+        return []
+    return response_codecs()
+
+
+def page_encoding(rendered: RenderedPage, codec: str) -> bytes:
+    """
+    Returns the body of a rendered page compressed with `codec`. The copy is
+    made with the (slower, denser) cache level the first time a client
+    negotiates the codec, and kept with the cached page, so later hits send it
+    as is and codecs no client asks for are never compressed.
+
+    Args:
+        rendered (RenderedPage): The cached page.
+        codec (str): One of `page_codecs(rendered)`.
+
+    Returns:
+        bytes: The compressed body.
+    """
+    body = rendered.encodings.get(codec)
+    if body is None:
+        body = rendered.encodings[codec] = compress(rendered.body, codec, cache_levels[codec])
+    return body
+
+
+def get_user_posts_rendered(user: User, db: Session, limit: int, after: Optional[str] = None) -> RenderedPage:
+    """
+    Retrieves one page of a user's posts as a ready-to-send JSON body.
+
+    Used in the "rendered" cache mode: the cache holds response bytes instead of
+    ORM objects, so a hit skips Pydantic validation and JSON encoding entirely.
+    Entries live in the user's cache group and are invalidated with it.
+
+    Args:
+        user (User): The user whose posts need to be fetched.
+        db (Session): The SQLAlchemy session object used to interact with the database.
+        limit (int): Maximum number of posts on the page.
+        after (Optional[str]): Cursor returned with the previous page, or None for the first page.
+
+    Returns:
+        RenderedPage: The response body of the page and the cursor of the next page.
+
+    Raises:
+        HTTPException: If the cursor is malformed (status code 400).
+    """
+    def load(session: Session) -> RenderedPage:
+        if settings.POSTS_CACHE_WRITE_THROUGH:
+            page = window_page(get_post_window(user, session), limit, after)
+            if page is not None:
+                return render_page(page)
+        version = session.scalar(posts_version_statement(user.id)) or 0
+        posts = session.scalars(user_posts_statement(user.id, limit, after)).all()
+        return render_page(build_page(posts, limit, version))
 
-    # Return the list of posts
-    return posts
+    key = (user.id, "rendered", limit, after)
+    return cache.get_or_load(key, lambda: load(db), refresh=lambda: in_new_session(user.id, load))
 
 
 def delete_post(user: User, post_id: int, db: Session):
@@ -84,8 +992,8 @@ def delete_post(user: User, post_id: int, db: Session):
     This function performs the following steps:
     1. Checks if the post exists and if it belongs to the specified user.
     2. If the post is found, it is deleted from the database.
-    3. The database transaction is committed.
-    4. Invalidates the user's cache to refresh the data for future requests.
+    3. The user's posts version is bumped and the database transaction is committed.
+    4. Removes the post from the user's cache (see `prepare_cache_update`).
 
     Args:
         user (User): The user attempting to delete the post.
@@ -106,7 +1014,10 @@ def delete_post(user: User, post_id: int, db: Session):
 
     # Delete the post from the database
     db.delete(post)
+    search_backend.posts_deleted(db, user.id, [post_id])
+    bump_posts_version(db, [user.id])
+    update_cache = prepare_cache_update(db, [user.id], deleted_ids=[post_id])
     db.commit()
 
-    # Invalidate the user's cache to ensure it is updated
-    cache.invalidate(user.id)
+    # Remove the post from the user's cache now that the delete is visible
+    update_cache()
@@ -0,0 +1,414 @@
+import base64
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from threading import Thread
+from typing import NamedTuple, Optional
+from sqlalchemy import Result, event, select, text
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from models.post_model import Post, PostVersion
+from models.user_model import User
+from schemas.post_schema import PostSearchResult
+from core.config import settings
+from core.database import engine, new_session
+from core.search import DocumentIndex, InvertedIndex, scan, tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class SearchPage(NamedTuple):
+    """
+    One page of search results.
+
+    Attributes:
+        items (list[PostSearchResult]): Matching posts, best match first.
+        next_cursor (Optional[str]): Opaque cursor for the following page, or None on the last page.
+    """
+    items: list
+    next_cursor: Optional[str]
+
+
+def query_terms(query: str) -> list[str]:
+    """
+    Turns a search query into its distinct terms, in order of appearance.
+
+    Args:
+        query (str): The query as typed by the client.
+
+    Returns:
+        list[str]: At most SEARCH_MAX_QUERY_TERMS distinct terms.
+
+    Raises:
+        HTTPException: If the query contains no searchable word (status code 400).
+    """
+    terms = list(dict.fromkeys(tokenize(query)))[:settings.SEARCH_MAX_QUERY_TERMS]
+    if not terms:
+        raise HTTPException(status_code=400, detail="Search query contains no searchable words")
+    return terms
+
+
+def encode_offset(offset: int) -> str:
+    """
+    Encodes the position of the next page of search results into an opaque cursor.
+    """
+    return base64.urlsafe_b64encode(json.dumps([offset]).encode()).decode().rstrip("=")
+
+
+def decode_offset(cursor: Optional[str]) -> int:
+    """
+    Decodes a cursor produced by `encode_offset`; no cursor means the first page.
+
+    Raises:
+        HTTPException: If the cursor is malformed (status code 400).
+    """
+    if cursor is None:
+        return 0
+    try:
+        (offset,) = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(offset, int) or offset < 0:
+            raise ValueError(offset)
+        return offset
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+class SearchBackend(ABC):
+    """
+    A search index over posts. The write paths of `services.post_service`
+    report every created and deleted post to the configured backend, inside
+    the transaction that writes the posts.
+    """
+
+    def start(self):
+        """
+        Prepares the backend when the application starts.
+        """
+
+    def posts_added(self, db: Session, user_id: int, posts: list[tuple[int, str]]):
+        """
+        Indexes posts created in the current transaction of `db`.
+
+        Args:
+            db (Session): The session writing the posts.
+            user_id (int): The owner of the posts.
+            posts (list[tuple[int, str]]): (post ID, text) of each new post.
+        """
+
+    def posts_deleted(self, db: Session, user_id: int, post_ids: list[int]):
+        """
+        Removes posts deleted in the current transaction of `db` from the index.
+        """
+
+    def posts_committed(self, changes: dict[int, tuple[list, list]], versions: dict[int, int]):
+        """
+        Applies the changes recorded in the session info under "search_changes"
+        once their transaction has committed.
+
+        Args:
+            changes (dict[int, tuple[list, list]]): User ID -> (added (post ID, text) pairs, deleted post IDs).
+            versions (dict[int, int]): User ID -> posts version committed with the changes.
+        """
+
+    @abstractmethod
+    def search(self, db: Session, user_id: int, terms: list[str], offset: int, limit: int) -> list[tuple[int, float]]:
+        """
+        Ranks a user's posts against the query terms.
+
+        Args:
+            db (Session): The request's session.
+            user_id (int): The owner of the posts searched.
+            terms (list[str]): Distinct query terms, see `query_terms`.
+            offset (int): Number of best matches to skip.
+            limit (int): Maximum number of matches to return.
+
+        Returns:
+            list[tuple[int, float]]: (post ID, score) pairs, best first.
+        """
+
+
+class MemorySearchBackend(SearchBackend):
+    """
+    Per-process inverted index with BM25 ranking (see `core.search`).
+
+    Each user's index is loaded from the database on first search, stamped
+    with the user's posts version (see `models.post_model.PostVersion`), and
+    kept up to date by the write paths of this process once their transaction
+    commits. Every search compares the stamp with the version row, a primary
+    key lookup; any difference (posts written by another worker) makes the
+    user's index reload. Users are evicted least recently searched first once
+    SEARCH_INDEX_MAX_POSTINGS is reached. Users whose posts alone exceed it are
+    never indexed: their posts are scanned by every search (see `core.search.scan`).
+
+    Attributes:
+        index (InvertedIndex): The users' indexes.
+        oversized (set[int]): Users found to exceed the budget, searched by scanning.
+    """
+
+    def __init__(self, max_postings: int):
+        self.index = InvertedIndex(max_postings)
+        self.oversized: set[int] = set()
+
+    def start(self):
+        """
+        Builds the index in the background, so that startup is not delayed and
+        searches during the warm-up load the users they need themselves.
+        """
+        if settings.SEARCH_INDEX_WARM:
+            logger.info("Warming up the search index in the background")
+            Thread(target=self.rebuild, name="search-index-warm", daemon=True).start()
+
+    def rebuild(self):
+        """
+        Loads users' indexes in user ID order until the memory budget is full.
+        Users already loaded by a search are left as they are.
+        """
+        statement = (
+            select(Post.user_id, Post.id, Post.text)
+            .order_by(Post.user_id, Post.id)
+            .execution_options(yield_per=settings.POSTS_STREAM_BATCH_SIZE)
+        )
+        user_id, current = None, DocumentIndex()
+        started = time.perf_counter()
+        try:
+            with new_session() as db:
+                # Read first: an index holding posts newer than its version is reloaded, never served stale
+                versions = dict(db.execute(select(PostVersion.user_id, PostVersion.version)).all())
+                for owner, post_id, post_text in db.execute(statement):
+                    if owner != user_id:
+                        if user_id is not None and not self._keep(user_id, current):
+                            break
+                        user_id, current = owner, DocumentIndex(versions.get(owner, 0))
+                    current.add(post_id, post_text)
+                else:
+                    if user_id is not None:
+                        self._keep(user_id, current)
+        except Exception:
+            logger.exception("Warming up the search index failed; users are loaded on first search instead")
+            return
+        logger.info(
+            "Search index warmed up in %.0f ms: %d users, %d postings",
+            (time.perf_counter() - started) * 1000, len(self.index), self.index.size,
+        )
+
+    def _keep(self, user_id: int, index: DocumentIndex) -> bool:
+        # Stop warming up once the budget is used, rather than evicting what was just loaded
+        if self.index.size + index.size > self.index.max_postings:
+            return False
+        return self.index.put(user_id, index, replace=False)
+
+    def posts_added(self, db: Session, user_id: int, posts: list[tuple[int, str]]):
+        db.info.setdefault("search_changes", {}).setdefault(user_id, ([], []))[0].extend(posts)
+
+    def posts_deleted(self, db: Session, user_id: int, post_ids: list[int]):
+        db.info.setdefault("search_changes", {}).setdefault(user_id, ([], []))[1].extend(post_ids)
+
+    def posts_committed(self, changes: dict[int, tuple[list, list]], versions: dict[int, int]):
+        for user_id, (added, deleted) in changes.items():
+            self.index.update(user_id, versions.get(user_id, 0), added, deleted)
+
+    def search(self, db: Session, user_id: int, terms: list[str], offset: int, limit: int) -> list[tuple[int, float]]:
+        if user_id in self.oversized:
+            return scan(self.posts(db, user_id), terms)[offset:offset + limit]
+        version = db.scalar(select(PostVersion.version).where(PostVersion.user_id == user_id)) or 0
+        ranked = self.index.search(user_id, terms, version)
+        if ranked is None:
+            user_index = self.load(db, user_id)
+            if user_index is None:
+                self.oversized.add(user_id)
+                ranked = scan(self.posts(db, user_id), terms)
+            else:
+                self.index.put(user_id, user_index)
+                with user_index.lock:
+                    ranked = user_index.search(terms)
+        return ranked[offset:offset + limit]
+
+    def posts(self, db: Session, user_id: int) -> Result:
+        """
+        Streams the (ID, text) of a user's posts from the database.
+        """
+        statement = (
+            select(Post.id, Post.text)
+            .where(Post.user_id == user_id)
+            .execution_options(yield_per=settings.POSTS_STREAM_BATCH_SIZE)
+        )
+        return db.execute(statement)
+
+    def load(self, db: Session, user_id: int) -> Optional[DocumentIndex]:
+        """
+        Builds a user's index from the database.
+
+        Returns:
+            Optional[DocumentIndex]: The index, or None as soon as it grows past the
+                memory budget, as it could never be kept.
+        """
+        # Read first: an index holding posts newer than its version is reloaded, never served stale
+        user_index = DocumentIndex(db.scalar(select(PostVersion.version).where(PostVersion.user_id == user_id)) or 0)
+        with self.posts(db, user_id) as rows:
+            for post_id, post_text in rows:
+                user_index.add(post_id, post_text)
+                if user_index.size > self.index.max_postings:
+                    return None
+        return user_index
+
+
+class SqlSearchBackend(SearchBackend):
+    """
+    Full-text search in the database, over a `post_search` table holding an
+    uncompressed copy of each post's text (the posts table stores it compressed).
+
+    On MySQL it is an InnoDB table with a FULLTEXT index, searched in natural
+    language mode; note that InnoDB ignores words shorter than
+    innodb_ft_min_token_size (3 by default) and its stopwords. On SQLite it is
+    an FTS5 table ranked with bm25(). Rows are written in the transaction that
+    creates the posts and removed with them by a foreign key (MySQL) or a
+    trigger (SQLite). Existing posts are indexed by
+    ``python -m core.migrations backfill-search``.
+    """
+
+    SCHEMA = {
+        "mysql": [
+            "CREATE TABLE IF NOT EXISTS post_search ("
+            " post_id INTEGER NOT NULL PRIMARY KEY,"
+            " user_id INTEGER NOT NULL,"
+            " body MEDIUMTEXT NOT NULL,"
+            " KEY ix_post_search_user_id (user_id),"
+            " FULLTEXT KEY ix_post_search_body (body),"
+            " CONSTRAINT fk_post_search_post_id FOREIGN KEY (post_id) REFERENCES posts (id) ON DELETE CASCADE"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4",
+        ],
+        "sqlite": [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS post_search USING fts5(body, user_id, tokenize='unicode61')",
+            "CREATE TRIGGER IF NOT EXISTS post_search_delete AFTER DELETE ON posts"
+            " BEGIN DELETE FROM post_search WHERE rowid = old.id; END",
+        ],
+    }
+
+    INSERT = {
+        "mysql": text("INSERT IGNORE INTO post_search (post_id, user_id, body) VALUES (:post_id, :user_id, :body)"),
+        "sqlite": text("INSERT INTO post_search (rowid, user_id, body) VALUES (:post_id, :user_id, :body)"),
+    }
+
+    # User filter and ranking run inside the full-text engine; both return the best matches first
+    SEARCH = {
+        "mysql": text(
+            "SELECT post_id, MATCH (body) AGAINST (:query IN NATURAL LANGUAGE MODE) AS score FROM post_search"
+            " WHERE user_id = :user_id AND MATCH (body) AGAINST (:query IN NATURAL LANGUAGE MODE)"
+            " ORDER BY score DESC, post_id DESC LIMIT :limit OFFSET :offset"
+        ),
+        "sqlite": text(
+            "SELECT rowid, -bm25(post_search, 1.0, 0.0) AS score FROM post_search"
+            " WHERE post_search MATCH :query ORDER BY score DESC, rowid DESC LIMIT :limit OFFSET :offset"
+        ),
+    }
+
+    def start(self):
+        """
+        Creates the search table if it does not exist yet.
+
+        Raises:
+            RuntimeError: If the database is neither MySQL nor SQLite.
+        """
+        if engine.dialect.name not in self.SCHEMA:
+            raise RuntimeError(f"SEARCH_BACKEND=sql does not support {engine.dialect.name}; use SEARCH_BACKEND=memory")
+        with engine.begin() as connection:
+            for statement in self.SCHEMA[engine.dialect.name]:
+                connection.execute(text(statement))
+
+    def posts_added(self, db: Session, user_id: int, posts: list[tuple[int, str]]):
+        statement = self.INSERT[db.get_bind().dialect.name]
+        db.execute(statement, [{"post_id": post_id, "user_id": user_id, "body": body} for post_id, body in posts])
+
+    def search(self, db: Session, user_id: int, terms: list[str], offset: int, limit: int) -> list[tuple[int, float]]:
+        dialect = db.get_bind().dialect.name
+        if dialect == "sqlite":
+            # Terms are \w+ tokens, so quoting them is enough to keep FTS5 operators out
+            words = " OR ".join(f'"{term}"' for term in terms)
+            query = f'user_id : "{user_id}" AND body : ({words})'
+        else:
+            query = " ".join(terms)
+        rows = db.execute(self.SEARCH[dialect], {"query": query, "user_id": user_id, "limit": limit, "offset": offset})
+        return [(post_id, float(score)) for post_id, score in rows]
+
+
+def create_backend(name: str) -> SearchBackend:
+    """
+    Creates the search backend selected by SEARCH_BACKEND.
+
+    Raises:
+        ValueError: If the name is unknown.
+    """
+    if name == "memory":
+        return MemorySearchBackend(settings.SEARCH_INDEX_MAX_POSTINGS)
+    if name == "sql":
+        return SqlSearchBackend()
+    raise ValueError(f"Unknown SEARCH_BACKEND: {name}")
+
+
+# Shared by all requests of a worker process
+search_backend = create_backend(settings.SEARCH_BACKEND)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_search_changes(session: Session):
+    """
+    Applies the index changes of the committed transaction, with the posts
+    versions `services.post_service.bump_posts_version` set in it.
+    """
+    changes = session.info.pop("search_changes", None)
+    versions = session.info.pop("posts_versions", {})
+    if not changes:
+        return
+    try:
+        search_backend.posts_committed(changes, versions)
+    except Exception:
+        # The commit stands; an index left at its old version is reloaded on its next search
+        logger.exception("Updating the search index after a commit failed")
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_search_changes(session: Session):
+    """
+    Discards the index changes of a transaction that was rolled back.
+    """
+    session.info.pop("search_changes", None)
+    session.info.pop("posts_versions", None)
+
+
+def search_posts(user: User, query: str, db: Session, limit: int, after: Optional[str] = None) -> SearchPage:
+    """
+    Retrieves one page of a user's posts matching a query, best match first.
+
+    Matches are ranked by the search backend, then their summary columns are
+    read in one query; posts deleted since they were ranked are left out.
+
+    Args:
+        user (User): The user whose posts are searched.
+        query (str): Words to look for; posts containing any of them match.
+        db (Session): The SQLAlchemy session object used to interact with the database.
+        limit (int): Maximum number of results on the page.
+        after (Optional[str]): Cursor returned with the previous page, or None for the first page.
+
+    Returns:
+        SearchPage: The results on the page and the cursor of the next page.
+
+    Raises:
+        HTTPException: If the query has no searchable words or the cursor is malformed (status code 400).
+    """
+    terms = query_terms(query)
+    offset = decode_offset(after)
+    ranked = search_backend.search(db, user.id, terms, offset, limit + 1)
+
+    matches = ranked[:limit]
+    rows = {
+        row.id: row for row in db.execute(
+            select(Post.id, Post.created_at, Post.preview, Post.text_length)
+            .where(Post.id.in_([post_id for post_id, _ in matches]), Post.user_id == user.id)
+        )
+    }
+    items = [
+        PostSearchResult(**rows[post_id]._mapping, score=score) for post_id, score in matches if post_id in rows
+    ]
+    next_cursor = encode_offset(offset + limit) if len(ranked) > limit else None
+    return SearchPage(items=items, next_cursor=next_cursor)
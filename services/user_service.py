@@ -1,7 +1,7 @@
 from sqlalchemy.orm import Session
 from models.user_model import User
 from schemas.user_schema import UserCreate, UserLogin
-from core.auth import get_password_hash, verify_password, create_access_token
+from core.auth import get_password_hash, verify_and_update_password, create_access_token
 from fastapi import HTTPException, status
 
 
@@ -51,7 +51,8 @@ def login_user(user_data: UserLogin, db: Session) -> str:
     This function checks if the user's credentials (email and password) are valid:
     1. It checks whether the email exists in the database.
     2. If the email exists, it verifies the password using `verify_password`.
-    3. If both are valid, it generates and returns a JWT access token for the user.
+    3. If the stored hash uses an outdated bcrypt cost, it is transparently replaced.
+    4. If both are valid, it generates and returns a JWT access token for the user.
 
     Args:
         user_data (UserLogin): The data provided for the user login (email and password).
@@ -67,8 +68,16 @@ def login_user(user_data: UserLogin, db: Session) -> str:
     user = db.query(User).filter(User.email == user_data.email).first()
 
     # If no user is found or password doesn't match, raise unauthorized error
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    valid, new_hash = verify_and_update_password(user_data.password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+
+    # Rehash with the current bcrypt cost while the plain password is at hand
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
 
     # Return an access token for the authenticated user
     return create_access_token({"user_id": user.id, "email": user.email})